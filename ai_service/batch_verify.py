@@ -0,0 +1,273 @@
+"""
+Bulk/offline verification: rescans a media library (e.g. after a model
+update) on a process pool, one loaded DeepfakeGuardProcess per worker.
+
+Inputs are directories (walked recursively), glob patterns, single files and
+--manifest lists (one path per line, or JSONL with "file_path"/"file").
+Reports stream out as JSONL in completion order, one {"file": ..., **report,
+"elapsed_ms": ...} per line. With --out, files already in the output are
+skipped, so an interrupted scan resumes where it stopped; lines with an
+"error" (engine failure, crashed worker) are retried.
+
+Usage: python batch_verify.py library/ "uploads/**/*.mp4" [--manifest files.txt] [--out results.jsonl] [--workers N]
+       [--threads N] [--cache PATH | --no-cache]
+"""
+import sys
+import os
+import json
+import glob
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+
+# Ensure we can import from core/
+sys.path.append(os.path.dirname(__file__))
+
+from config import (
+    BATCH_WORKERS, BATCH_ORT_THREADS, BATCH_IN_FLIGHT_PER_WORKER, BATCH_PROGRESS_INTERVAL_S, MEDIA_EXTENSIONS,
+    BATCH_VERDICT_CACHE_PATH
+)
+
+# Thread pools are sized when the libraries load, so the pins go into the
+# workers' environment before they start (numpy/OpenCV/ONNX Runtime are only
+# imported inside the workers). The frame pipeline's crop workers and FFmpeg's
+# decoder threads count too: each defaults to one per core.
+THREAD_ENV = (
+    "AI_ORT_INTRA_THREADS", "AI_PIPELINE_WORKERS", "AI_DECODE_THREADS",
+    "OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"
+)
+
+# --- Inputs ---
+
+def is_media(path):
+    return os.path.splitext(path)[1].lower() in MEDIA_EXTENSIONS
+
+def walk_media(root):
+    for directory, subdirs, files in os.walk(root):
+        subdirs.sort()
+        for name in sorted(files):
+            if is_media(name):
+                yield os.path.join(directory, name)
+
+def read_manifest(path):
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("{"):
+                entry = json.loads(line)
+                line = entry.get("file_path") or entry.get("file")
+                if not line:
+                    continue
+            yield line
+
+def iter_inputs(inputs, manifests):
+    """
+    Media paths from all inputs, lazily (a library of millions of files is
+    never listed in memory), each path once.
+    """
+    seen = set()
+    sources = [read_manifest(m) for m in manifests]
+    for item in inputs:
+        if os.path.isdir(item):
+            sources.append(walk_media(item))
+        elif glob.has_magic(item):
+            sources.append(p for p in sorted(glob.iglob(item, recursive=True)) if os.path.isfile(p))
+        else:
+            sources.append([item])
+    for source in sources:
+        for path in source:
+            path = os.path.abspath(path)
+            if path not in seen:
+                seen.add(path)
+                yield path
+
+def completed_files(out_path):
+    """
+    Files with a report in an existing output (resume). Error lines and a
+    truncated last line (killed mid-write) do not count.
+    """
+    done = set()
+    if not os.path.exists(out_path):
+        return done
+    with open(out_path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if "error" not in record and "file" in record:
+                done.add(record["file"])
+    return done
+
+# --- Workers ---
+
+_guard = None
+_deadline_s = None
+
+def init_worker(time_budget_s, cache_path):
+    global _guard, _deadline_s
+    # stdout carries the JSONL when no --out is given; pipeline logging goes to stderr
+    sys.stdout = sys.stderr
+    import cv2
+    from main import DeepfakeGuardProcess
+
+    cv2.setNumThreads(int(os.environ["AI_ORT_INTRA_THREADS"]))
+    _guard = DeepfakeGuardProcess(cache_path=cache_path)
+    _deadline_s = time_budget_s
+
+def verify_file(path):
+    from main import fail_closed_report
+
+    started = time.monotonic()
+    try:
+        deadline = started + _deadline_s if _deadline_s else None
+        record = dict(_guard.run(path, deadline))
+    except Exception as e:
+        # FAIL-CLOSED, and retried on resume
+        record = fail_closed_report([f"engine_error: {str(e)}", "fail_closed"])
+        record["error"] = str(e)
+    record["elapsed_ms"] = round((time.monotonic() - started) * 1000, 1)
+    return record
+
+# --- Driver ---
+
+class Progress:
+    def __init__(self, interval_s=BATCH_PROGRESS_INTERVAL_S):
+        self.started = time.monotonic()
+        self.interval_s = interval_s
+        self.last = self.started
+        self.done = 0
+        self.skipped = 0
+        self.errors = 0
+        self.verdicts = {}
+
+    def record(self, record):
+        self.done += 1
+        if "error" in record:
+            self.errors += 1
+        self.verdicts[record.get("verdict")] = self.verdicts.get(record.get("verdict"), 0) + 1
+        now = time.monotonic()
+        if now - self.last >= self.interval_s:
+            self.last = now
+            self.report()
+
+    def report(self, final=False):
+        elapsed = time.monotonic() - self.started
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        verdicts = ", ".join(f"{v}: {n}" for v, n in sorted(self.verdicts.items(), key=lambda item: str(item[0])))
+        label = "Finished" if final else "Progress"
+        print(f"[BATCH] {label}: {self.done} verified ({verdicts or 'none'}), {self.skipped} skipped, "
+              f"{self.errors} errors, {rate:.2f} files/s, {elapsed:.0f}s", file=sys.stderr, flush=True)
+
+def new_pool(workers, time_budget_s, cache_path):
+    return ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_worker, initargs=(time_budget_s, cache_path)
+    )
+
+def run_batch(paths, out, workers, time_budget_s=None, cache_path=BATCH_VERDICT_CACHE_PATH, done=frozenset()):
+    """
+    Verifies paths on a pool of workers, writing one JSON line per file to
+    out as results complete. cache_path: the workers' verdict cache (None:
+    uncached). At most workers x BATCH_IN_FLIGHT_PER_WORKER
+    files are queued at a time. A crashed worker (OOM kill, native fault)
+    fails only its in-flight files, which get error lines; the pool is
+    rebuilt and the scan goes on.
+    """
+    progress = Progress()
+    window = workers * BATCH_IN_FLIGHT_PER_WORKER
+    pool = new_pool(workers, time_budget_s, cache_path)
+    pending = {}  # future -> path
+    paths = iter(paths)
+    exhausted = False
+    try:
+        while pending or not exhausted:
+            while not exhausted and len(pending) < window:
+                path = next(paths, None)
+                if path is None:
+                    exhausted = True
+                elif path in done:
+                    progress.skipped += 1
+                else:
+                    pending[pool.submit(verify_file, path)] = path
+
+            if not pending:
+                continue
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            broken = False
+            for future in finished:
+                path = pending.pop(future)
+                try:
+                    record = future.result()
+                except BrokenProcessPool:
+                    broken = True
+                    from main import fail_closed_report
+                    record = fail_closed_report(["engine_error: worker crashed", "fail_closed"])
+                    record["error"] = "worker_crashed"
+                out.write(json.dumps(dict({"file": path}, **record)) + "\n")
+                out.flush()
+                progress.record(record)
+            if broken:
+                print("[BATCH] Worker crashed, restarting the pool", file=sys.stderr)
+                pool.shutdown(wait=False, cancel_futures=True)
+                # Everything still queued went down with the pool: resubmit it
+                requeue = list(pending.values())
+                pending.clear()
+                pool = new_pool(workers, time_budget_s, cache_path)
+                for path in requeue:
+                    pending[pool.submit(verify_file, path)] = path
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+        progress.report(final=True)
+    return progress
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="DeepfakeGuard bulk/offline verification")
+    parser.add_argument("inputs", nargs="*", help="Directories, glob patterns or files")
+    parser.add_argument("--manifest", action="append", default=[], help="File with one path per line (or JSONL)")
+    parser.add_argument("--out", help="JSONL output; resumes if it exists (default: stdout)")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS)
+    parser.add_argument("--threads", type=int, default=BATCH_ORT_THREADS,
+                        help="ONNX Runtime/OpenCV/pipeline/decode threads per worker")
+    parser.add_argument("--time-budget-ms", type=float, help="Per-file deadline (default: none, full quality)")
+    parser.add_argument("--cache", default=BATCH_VERDICT_CACHE_PATH,
+                        help="Verdict cache of the scan (default: separate from the production cache)")
+    parser.add_argument("--no-cache", action="store_true", help="Do not read or write a verdict cache")
+    args = parser.parse_args()
+
+    if not args.inputs and not args.manifest:
+        parser.error("no inputs")
+
+    for name in THREAD_ENV:
+        os.environ[name] = str(args.threads)
+    os.environ["AI_ORT_INTER_THREADS"] = "1"
+    os.environ.setdefault("OPENCV_FFMPEG_CAPTURE_OPTIONS", f"threads;{args.threads}")
+
+    done = completed_files(args.out) if args.out else set()
+    if done:
+        print(f"[BATCH] Resuming: {len(done)} files already verified in {args.out}", file=sys.stderr)
+
+    out = sys.stdout
+    if args.out:
+        out = open(args.out, "a")
+        if out.tell() > 0:
+            with open(args.out, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    out.write("\n")  # terminate a line cut off by a kill
+    try:
+        progress = run_batch(
+            iter_inputs(args.inputs, args.manifest), out, max(1, args.workers),
+            args.time_budget_ms / 1000.0 if args.time_budget_ms else None, None if args.no_cache else args.cache, done
+        )
+    except KeyboardInterrupt:
+        print("[BATCH] Interrupted; run again with the same --out to resume", file=sys.stderr)
+        sys.exit(130)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    sys.exit(1 if progress.errors else 0)
@@ -0,0 +1,161 @@
+"""
+Burst benchmark for server-mode admission control: starts server.py, sends
+a burst of video uploads followed by image uploads (raw bytes, concurrent,
+with the backend's time budget) and reports per-class latency and
+fail-closed counts, plus the server's admission stats. Run once with
+admission on and once with --no-admission to compare image latency while
+videos are processing.
+
+Media defaults to the corpus's largest video and smallest image; pass
+--video/--image for heavier inputs (e.g. a 30 s 4K clip).
+
+Usage: python benchmarks/bench_admission.py [--corpus benchmarks/corpus] [--video F] [--image F]
+       [--videos 6] [--images 20] [--image-gap-ms 100] [--time-budget-ms 13000] [--no-admission] [--json]
+"""
+import sys
+import os
+import json
+import time
+import socket
+import argparse
+import threading
+import subprocess
+import http.client
+
+AI_SERVICE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), "corpus")
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def request(port, method, path, body=None, timeout=60):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=timeout)
+    try:
+        headers = {"Content-Type": "application/octet-stream"} if body is not None else {}
+        conn.request(method, path, body=body, headers=headers)
+        response = conn.getresponse()
+        return response.status, json.loads(response.read() or b"{}")
+    finally:
+        conn.close()
+
+def wait_ready(port, proc, timeout=120):
+    started = time.monotonic()
+    while time.monotonic() - started < timeout:
+        if proc.poll() is not None:
+            raise RuntimeError("server exited")
+        try:
+            if request(port, "GET", "/ready", timeout=2)[0] == 200:
+                return
+        except (OSError, ValueError):
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("server not ready")
+
+def percentile(values, p):
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))], 1)
+
+def pick_media(corpus):
+    with open(os.path.join(corpus, "manifest.json")) as f:
+        files = json.load(f)["files"]
+    videos = [e for e in files if e["kind"] == "video"]
+    images = [e for e in files if e["kind"] == "image"]
+    video = max(videos, key=lambda e: e["width"] * e["height"]) if videos else None
+    image = min(images, key=lambda e: e["width"] * e["height"]) if images else None
+    return (os.path.join(corpus, video["path"]) if video else None,
+            os.path.join(corpus, image["path"]) if image else None)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Admission control burst benchmark (server mode)")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--video")
+    parser.add_argument("--image")
+    parser.add_argument("--videos", type=int, default=6)
+    parser.add_argument("--images", type=int, default=20)
+    parser.add_argument("--image-gap-ms", type=float, default=100, help="Spacing of the image requests")
+    parser.add_argument("--time-budget-ms", type=float, default=13000)
+    parser.add_argument("--no-admission", action="store_true", help="AI_ADMISSION=0 (previous behaviour)")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    video, image = args.video, args.image
+    if video is None or image is None:
+        corpus_video, corpus_image = pick_media(args.corpus)
+        video, image = video or corpus_video, image or corpus_image
+    with open(video, "rb") as f:
+        video_bytes = f.read()
+    with open(image, "rb") as f:
+        image_bytes = f.read()
+
+    port = free_port()
+    env = dict(os.environ, AI_VERDICT_CACHE="0", AI_ADMISSION="0" if args.no_admission else "1")
+    proc = subprocess.Popen([sys.executable, os.path.join(AI_SERVICE, "server.py"), "--port", str(port)],
+                            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, cwd=AI_SERVICE)
+    try:
+        wait_ready(port, proc)
+        request(port, "POST", f"/verify?time_budget_ms={args.time_budget_ms}", image_bytes)  # warm-up
+
+        results = {"video": [], "image": []}
+        lock = threading.Lock()
+
+        def send(cls, body):
+            started = time.perf_counter()
+            try:
+                status, report = request(port, "POST", f"/verify?time_budget_ms={args.time_budget_ms}", body,
+                                         timeout=args.time_budget_ms / 1000 + 30)
+            except (OSError, ValueError) as e:
+                status, report = None, {"signals": [f"client_error: {e}"]}
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            with lock:
+                results[cls].append((elapsed_ms, status, report))
+
+        threads = [threading.Thread(target=send, args=("video", video_bytes)) for _ in range(args.videos)]
+        for t in threads:
+            t.start()
+        time.sleep(0.05)
+        for _ in range(args.images):
+            t = threading.Thread(target=send, args=("image", image_bytes))
+            t.start()
+            threads.append(t)
+            time.sleep(args.image_gap_ms / 1000)
+        for t in threads:
+            t.join()
+        stats = request(port, "GET", "/stats")[1]
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    summary = {"admission": not args.no_admission, "video": video, "image": image, "classes": {}}
+    for cls, runs in results.items():
+        latencies = [ms for ms, _, _ in runs]
+        late = [ms for ms in latencies if ms > args.time_budget_ms + 2000]  # the backend's kill timer
+        shed = [r for _, status, r in runs if status == 429]
+        degraded = [r for _, status, r in runs if any(str(s).startswith("deadline_") for s in r.get("signals", []))]
+        summary["classes"][cls] = {
+            "requests": len(runs),
+            "p50_ms": percentile(latencies, 50),
+            "p95_ms": percentile(latencies, 95),
+            "max_ms": percentile(latencies, 100),
+            "shed": len(shed),
+            "deadline_degraded": len(degraded),
+            "past_backend_timeout": len(late),
+        }
+    summary["server_admission"] = stats.get("admission")
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        sys.exit(0)
+    print(f"admission {'on' if summary['admission'] else 'off'}: video={os.path.basename(video)} "
+          f"image={os.path.basename(image)}")
+    for cls, row in summary["classes"].items():
+        print(f"  {cls:<6} n={row['requests']:<3} p50 {row['p50_ms']} ms  p95 {row['p95_ms']} ms  "
+              f"max {row['max_ms']} ms  shed {row['shed']}  degraded {row['deadline_degraded']}  "
+              f"past timeout {row['past_backend_timeout']}")
+    if summary["server_admission"]:
+        for cls, row in summary["server_admission"]["classes"].items():
+            if row["admitted"] or row["shed_queue_full"] or row["shed_deadline"]:
+                print(f"  server {cls}: {json.dumps(row)}")
@@ -0,0 +1,87 @@
+"""
+Face detection benchmark: full-resolution Haar (reference) vs downscaled
+search, cross-frame ROI tracking and the YuNet DNN backend.
+Reports frames/sec, faces/sec and recall: the share of frames where the
+reference found a face and the mode's chosen box matches one of the
+reference boxes (IoU >= 0.5).
+
+Usage: python benchmarks/bench_detector.py clip.mp4 [photo.jpg ...] [--max-side 640]
+"""
+import sys
+import os
+import time
+import json
+import argparse
+
+import cv2
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from config import YUNET_MODEL_PATH, DETECTION_MAX_SIDE
+from core.extractor import FrameExtractor
+from core.detector import FaceAnalyzer, box_iou as iou
+
+def load_frames(path):
+    frames, _ = FrameExtractor(selection="uniform").extract_frames(path)
+    if not frames:
+        img = cv2.imread(path)
+        frames = [img] if img is not None else []
+    return frames
+
+def run_mode(analyzer, clips):
+    boxes = []
+    start = time.perf_counter()
+    for frames in clips:
+        track = analyzer.new_track()
+        boxes.append([analyzer.detect(frame, track) for frame in frames])
+    elapsed = time.perf_counter() - start
+    return boxes, elapsed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("media", nargs="+")
+    parser.add_argument("--max-side", type=int, default=DETECTION_MAX_SIDE)
+    parser.add_argument("--json", action="store_true", help="Print JSON instead of a table")
+    args = parser.parse_args()
+
+    clips = [load_frames(path) for path in args.media]
+    total_frames = sum(len(frames) for frames in clips)
+
+    modes = [
+        ("haar-full", FaceAnalyzer("haar", max_side=0, tracking=False)),
+        ("haar-downscaled", FaceAnalyzer("haar", max_side=args.max_side, tracking=False)),
+        ("haar-downscaled-tracked", FaceAnalyzer("haar", max_side=args.max_side, tracking=True)),
+    ]
+    if os.path.exists(YUNET_MODEL_PATH):
+        modes += [
+            ("yunet-downscaled", FaceAnalyzer("yunet", max_side=args.max_side, tracking=False)),
+            ("yunet-downscaled-tracked", FaceAnalyzer("yunet", max_side=args.max_side, tracking=True)),
+        ]
+    else:
+        print(f"(yunet skipped: {YUNET_MODEL_PATH} not found)", file=sys.stderr)
+
+    # All boxes found at full resolution, per frame
+    full_res = FaceAnalyzer("haar", max_side=0, tracking=False)
+    reference = [[full_res.detector.detect(frame) for frame in frames] for frames in clips]
+
+    results = []
+    for name, analyzer in modes:
+        boxes, elapsed = run_mode(analyzer, clips)
+        found = sum(box is not None for clip in boxes for box in clip)
+        ref_faces = [(r, c) for rc, cc in zip(reference, boxes) for r, c in zip(rc, cc) if r]
+        hits = sum(1 for r, c in ref_faces if c is not None and max(iou(b, c) for b in r) >= 0.5)
+        results.append({
+            "mode": name,
+            "frames_per_sec": round(total_frames / elapsed, 2),
+            "faces_per_sec": round(found / elapsed, 2),
+            "faces_found": found,
+            "recall_vs_haar_full": round(hits / len(ref_faces), 3) if ref_faces else None
+        })
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'mode':<28}{'frames/s':>10}{'faces/s':>10}{'faces':>8}{'recall':>8}")
+        for r in results:
+            print(f"{r['mode']:<28}{r['frames_per_sec']:>10}{r['faces_per_sec']:>10}"
+                  f"{r['faces_found']:>8}{str(r['recall_vs_haar_full']):>8}")
@@ -0,0 +1,57 @@
+"""
+Frame sampler benchmark: decode time per clip, per-second seeking vs
+sequential grab()/retrieve() vs "auto" (GOP-measured switch).
+
+Usage: python benchmarks/bench_extractor.py clip1.mp4 [clip2.mov ...] [--repeats 5]
+"""
+import sys
+import os
+import time
+import json
+import random
+import argparse
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from core.extractor import FrameExtractor
+
+def time_sampler(sampler, path, repeats):
+    extractor = FrameExtractor(sampler=sampler)
+    timings = []
+    frames = 0
+    for i in range(repeats):
+        random.seed(i)  # Same jitter for every sampler
+        start = time.perf_counter()
+        result, _ = extractor.extract_frames(path)
+        timings.append((time.perf_counter() - start) * 1000)
+        frames = len(result)
+    timings.sort()
+    return {"median_ms": round(timings[len(timings) // 2], 2), "frames": frames}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("clips", nargs="+")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="Print JSON instead of a table")
+    args = parser.parse_args()
+
+    results = []
+    for path in args.clips:
+        seek = time_sampler("seek", path, args.repeats)
+        sequential = time_sampler("sequential", path, args.repeats)
+        auto = time_sampler("auto", path, args.repeats)
+        results.append({
+            "clip": os.path.basename(path),
+            "seek": seek,
+            "sequential": sequential,
+            "auto": auto,
+            "speedup": round(seek["median_ms"] / max(sequential["median_ms"], 1e-6), 2)
+        })
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'clip':<32}{'seek ms':>10}{'seq ms':>10}{'auto ms':>10}{'frames':>8}{'seq speedup':>13}")
+        for r in results:
+            print(f"{r['clip']:<32}{r['seek']['median_ms']:>10}{r['sequential']['median_ms']:>10}"
+                  f"{r['auto']['median_ms']:>10}{r['sequential']['frames']:>8}{r['speedup']:>12}x")
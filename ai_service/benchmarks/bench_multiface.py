@@ -0,0 +1,63 @@
+"""
+Multi-face verification cost: end-to-end DeepfakeGuardProcess.run time
+with 1 face per frame vs up to N faces per frame. Every face crop goes
+through one predict_batch call, so N faces should cost far less than N
+single-face runs.
+
+Usage: python benchmarks/bench_multiface.py group_clip.mp4 [group.jpg ...] [--faces 1 2 4] [--repeats 3]
+"""
+import sys
+import os
+import time
+import json
+import argparse
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from main import DeepfakeGuardProcess
+from core.pipeline import FramePipeline
+
+def time_run(guard, path, repeats):
+    timings = []
+    report = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        report = guard.run(path)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return timings[len(timings) // 2], report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("media", nargs="+")
+    parser.add_argument("--faces", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--json", action="store_true", help="Print JSON instead of a table")
+    args = parser.parse_args()
+
+    guard = DeepfakeGuardProcess()
+    results = []
+    for path in args.media:
+        baseline_ms = None
+        for n in args.faces:
+            guard.pipeline = FramePipeline(guard.face_analyzer, guard.artifact_analyzer, max_faces=n)
+            median_ms, report = time_run(guard, path, args.repeats)
+            identities = len(report.get("faces", [])) or (0 if "no_clear_faces_detected" in report["signals"] else 1)
+            if baseline_ms is None:
+                baseline_ms = median_ms
+            results.append({
+                "media": os.path.basename(path),
+                "max_faces": n,
+                "identities": identities,
+                "median_ms": round(median_ms, 1),
+                "cost_vs_single": round(median_ms / baseline_ms, 2),
+                "cost_per_identity_vs_single": round(median_ms / baseline_ms / max(identities, 1), 2)
+            })
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'media':<28}{'max':>5}{'ids':>5}{'ms':>10}{'x single':>10}{'x/identity':>12}")
+        for r in results:
+            print(f"{r['media']:<28}{r['max_faces']:>5}{r['identities']:>5}{r['median_ms']:>10}"
+                  f"{r['cost_vs_single']:>10}{r['cost_per_identity_vs_single']:>12}")
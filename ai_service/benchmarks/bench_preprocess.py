@@ -0,0 +1,80 @@
+"""
+EfficientNet preprocessing microbenchmark: per-crop preprocess() +
+np.concatenate + session.run (previous path) vs BatchPreprocessor.fill
+into a preallocated NCHW buffer + IO-bound run_batch.
+
+Usage: python benchmarks/bench_preprocess.py [--batch-sizes 1 8 32] [--crop-size 0] [--repeats 20]
+(--crop-size 0 = random native face sizes, resized inside the preprocessor)
+"""
+import sys
+import os
+import time
+import json
+import argparse
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from config import MODEL_PATH
+from core.models import EfficientNetONNXDetector
+
+def make_crops(n, crop_size, rng):
+    crops = []
+    for _ in range(n):
+        side = crop_size or int(rng.integers(80, 480))
+        crops.append((rng.random((side, side, 3)) * 255).astype(np.uint8))
+    return crops
+
+def median_us(fn, repeats):
+    fn()  # warm-up: buffer allocation, ORT arenas
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1e6)
+    timings.sort()
+    return timings[len(timings) // 2]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--crop-size", type=int, default=0)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--json", action="store_true", help="Print JSON instead of a table")
+    args = parser.parse_args()
+
+    detector = EfficientNetONNXDetector(MODEL_PATH)
+    rng = np.random.default_rng(0)
+
+    results = []
+    for n in args.batch_sizes:
+        crops = make_crops(n, args.crop_size, rng)
+
+        legacy = lambda: np.concatenate([detector.preprocess(c) for c in crops], axis=0)
+        fused = lambda: detector.batch_preprocessor.fill(crops)
+        max_abs_diff = float(np.max(np.abs(legacy() - fused())))
+
+        row = {
+            "batch": n,
+            "preprocess_legacy_us_per_crop": round(median_us(legacy, args.repeats) / n, 1),
+            "preprocess_fused_us_per_crop": round(median_us(fused, args.repeats) / n, 1),
+            "max_abs_diff": max_abs_diff
+        }
+
+        if detector.session is not None:
+            row["infer_legacy_us_per_crop"] = round(median_us(
+                lambda: detector.session.run(None, {detector.input_name: legacy()}), args.repeats) / n, 1)
+            row["infer_fused_iobinding_us_per_crop"] = round(median_us(
+                lambda: detector.run_batch(detector.batch_preprocessor.fill(crops)), args.repeats) / n, 1)
+        results.append(row)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'batch':>6}{'prep old us':>13}{'prep new us':>13}{'prep+infer old':>16}{'prep+infer new':>16}{'max diff':>11}")
+        for r in results:
+            print(f"{r['batch']:>6}{r['preprocess_legacy_us_per_crop']:>13}{r['preprocess_fused_us_per_crop']:>13}"
+                  f"{str(r.get('infer_legacy_us_per_crop', '-')):>16}{str(r.get('infer_fused_iobinding_us_per_crop', '-')):>16}"
+                  f"{r['max_abs_diff']:>11.1e}")
+        print("(microseconds per crop)")
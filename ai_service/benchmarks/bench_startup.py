@@ -0,0 +1,109 @@
+"""
+CLI startup benchmark: wall time of one-shot `python main.py <file>` runs per
+outcome, with the `python -X importtime` breakdown (self time summed per
+top-level package) and which engine modules each outcome loaded.
+
+Outcomes: missing file, decode error (random bytes), no faces and scored
+(corpus images with 0 and 1 faces). The fail-closed ones should exit before
+ONNX Runtime and SciPy load; missing file before NumPy/OpenCV too. Runs use
+AI_VERDICT_CACHE=0 and a closed server port, so every run does the full
+local verification.
+
+Usage: python benchmarks/bench_startup.py [--corpus benchmarks/corpus] [--repeats 5] [--top 8] [--json]
+"""
+import sys
+import os
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+from statistics import median
+
+AI_SERVICE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), "corpus")
+ENGINE_MODULES = ["numpy", "cv2", "scipy", "onnxruntime", "PIL", "sqlite3"]
+
+def parse_importtime(stderr):
+    """
+    {top-level package: self time in ms} from -X importtime output.
+    """
+    packages = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|", 2)
+        try:
+            self_us = int(self_us)
+        except ValueError:
+            continue  # header line
+        package = name.strip().split(".")[0]
+        packages[package] = packages.get(package, 0.0) + self_us / 1000.0
+    return packages
+
+def run_case(path, repeats, env):
+    walls, imports = [], []
+    report = None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", os.path.join(AI_SERVICE, "main.py"), path],
+            capture_output=True, text=True, env=env, cwd=AI_SERVICE
+        )
+        walls.append((time.perf_counter() - started) * 1000)
+        imports.append(parse_importtime(proc.stderr))
+        lines = [l for l in proc.stdout.splitlines() if l.startswith("{")]
+        report = json.loads(lines[-1]) if lines else None
+    # Breakdown of the median-wall run
+    breakdown = imports[sorted(range(repeats), key=walls.__getitem__)[repeats // 2]]
+    return {
+        "wall_ms_p50": round(median(walls), 1),
+        "wall_ms_min": round(min(walls), 1),
+        "import_ms": round(sum(breakdown.values()), 1),
+        "engine_modules": [m for m in ENGINE_MODULES if m in breakdown],
+        "packages_ms": {k: round(v, 1) for k, v in sorted(breakdown.items(), key=lambda kv: -kv[1])},
+        "verdict": report and report.get("verdict"),
+        "signals": report and sorted(report.get("signals", [])),
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CLI startup / import-time benchmark")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--top", type=int, default=8, help="Packages listed per outcome")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    env = dict(os.environ, AI_VERDICT_CACHE="0", AI_SERVICE_PORT="1", PYTHONDONTWRITEBYTECODE="1")
+    tmp = tempfile.mkdtemp(prefix="bench_startup_")
+    garbage = os.path.join(tmp, "garbage.mp4")
+    with open(garbage, "wb") as f:
+        f.write(os.urandom(64 * 1024))
+    cases = {"missing_file": os.path.join(tmp, "missing.jpg"), "decode_error": garbage}
+
+    manifest_path = os.path.join(args.corpus, "manifest.json")
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            images = [e for e in json.load(f)["files"] if e["kind"] == "image"]
+        for case, faces in (("no_faces", 0), ("scored", 1)):
+            entry = next((e for e in images if e["faces"] == faces), None)
+            if entry is not None:
+                cases[case] = os.path.join(args.corpus, entry["path"])
+    else:
+        print(f"[BENCH] No corpus at {args.corpus} (generate_corpus.py): no_faces/scored skipped", file=sys.stderr)
+
+    results = {case: run_case(path, args.repeats, env) for case, path in cases.items()}
+    for path in os.listdir(tmp):
+        os.unlink(os.path.join(tmp, path))
+    os.rmdir(tmp)
+
+    if args.json:
+        print(json.dumps({"python": sys.version.split()[0], "repeats": args.repeats, "cases": results}, indent=2))
+        sys.exit(0)
+
+    for case, result in results.items():
+        print(f"{case:<13} wall p50 {result['wall_ms_p50']:7.1f} ms (min {result['wall_ms_min']:.1f}), "
+              f"imports {result['import_ms']:6.1f} ms -> {result['verdict']} {result['signals']}")
+        print(f"{'':<13} engine modules: {', '.join(result['engine_modules']) or 'none'}")
+        top = list(result["packages_ms"].items())[:args.top]
+        print(f"{'':<13} " + ", ".join(f"{name} {ms:.1f}" for name, ms in top))
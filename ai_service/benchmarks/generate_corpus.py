@@ -0,0 +1,272 @@
+"""
+Deterministic synthetic media corpus for the benchmark suite: images and
+videos with drawn (Haar-detectable) faces at several resolutions, durations,
+codecs/GOP lengths and face counts, plus a placeholder ONNX model with the
+EfficientNet-B0 input shape and a comparable amount of compute.
+
+H.264 clips need an ffmpeg binary (PATH, $FFMPEG or the imageio-ffmpeg
+package) and are skipped without one; the placeholder model needs the
+`onnx` package. Frames are identical for a given seed; encoded bytes can
+differ between OpenCV/ffmpeg builds, so the manifest records both versions.
+
+Usage: python benchmarks/generate_corpus.py [--out benchmarks/corpus] [--profile quick|full] [--seed 0]
+"""
+import sys
+import os
+import json
+import shutil
+import argparse
+import subprocess
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from config import FACE_CROP_SIZE
+
+GENERATOR_VERSION = 1
+DEFAULT_OUT = os.path.join(os.path.dirname(__file__), "corpus")
+FPS = 25
+
+# name, (width, height), faces
+IMAGES = {
+    "quick": [
+        ("img_640x480_1f.jpg", (640, 480), 1),
+        ("img_1280x720_3f.jpg", (1280, 720), 3),
+        ("img_1280x720_0f.png", (1280, 720), 0),
+    ],
+    "full": [
+        ("img_640x480_1f.jpg", (640, 480), 1),
+        ("img_1280x720_1f.png", (1280, 720), 1),
+        ("img_1280x720_3f.jpg", (1280, 720), 3),
+        ("img_1280x720_0f.png", (1280, 720), 0),
+        ("img_1920x1080_1f.jpg", (1920, 1080), 1),
+        ("img_3840x2160_1f.jpg", (3840, 2160), 1),
+        ("img_3840x2160_3f.jpg", (3840, 2160), 3),
+    ],
+}
+
+# name, (width, height), seconds, codec, gop, faces, scene cuts
+VIDEOS = {
+    "quick": [
+        ("vid_640x360_mp4v_1f.mp4", (640, 360), 4, "mp4v", None, 1, 0),
+        ("vid_1280x720_h264g12_1f.mp4", (1280, 720), 6, "h264", 12, 1, 0),
+        ("vid_1280x720_h264g50_cuts.mp4", (1280, 720), 8, "h264", 50, 1, 3),
+    ],
+    "full": [
+        ("vid_640x360_mp4v_1f.mp4", (640, 360), 4, "mp4v", None, 1, 0),
+        ("vid_1280x720_mp4v_1f.mp4", (1280, 720), 8, "mp4v", None, 1, 0),
+        ("vid_1280x720_mjpg_1f.avi", (1280, 720), 4, "MJPG", None, 1, 0),
+        ("vid_1280x720_h264g12_1f.mp4", (1280, 720), 8, "h264", 12, 1, 0),
+        ("vid_1280x720_h264g250_1f.mp4", (1280, 720), 30, "h264", 250, 1, 0),
+        ("vid_1280x720_h264g50_cuts.mp4", (1280, 720), 12, "h264", 50, 1, 4),
+        ("vid_1920x1080_h264g50_3f.mp4", (1920, 1080), 8, "h264", 50, 3, 0),
+        ("vid_1920x1080_h264g50_0f.mp4", (1920, 1080), 4, "h264", 50, 0, 0),
+        ("vid_3840x2160_h264g50_1f.mp4", (3840, 2160), 6, "h264", 50, 1, 0),
+    ],
+}
+
+def find_ffmpeg():
+    path = os.environ.get("FFMPEG") or shutil.which("ffmpeg")
+    if path:
+        return path
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except (ImportError, RuntimeError):
+        return None
+
+def draw_face(img, cx, cy, size, tone):
+    """
+    Frontal cartoon face that OpenCV's Haar cascade detects: dark brows and
+    pupils over lighter cheeks, nose bridge, mouth.
+    """
+    s = size
+    cv2.ellipse(img, (cx, cy), (int(s * 0.42), int(s * 0.55)), 0, 0, 360, tone, -1)
+    cv2.ellipse(img, (cx, cy - int(s * 0.35)), (int(s * 0.45), int(s * 0.25)), 0, 180, 360, (30, 30, 40), -1)
+    for side in (-1, 1):
+        ex, ey = cx + side * int(s * 0.17), cy - int(s * 0.08)
+        cv2.ellipse(img, (ex, ey - int(s * 0.09)), (int(s * 0.11), int(s * 0.03)), 0, 0, 360, (40, 40, 50), -1)
+        cv2.ellipse(img, (ex, ey), (int(s * 0.09), int(s * 0.045)), 0, 0, 360, (245, 245, 245), -1)
+        cv2.circle(img, (ex, ey), int(s * 0.04), (30, 20, 20), -1)
+    shade = tuple(int(t * 0.75) for t in tone)
+    cv2.line(img, (cx, cy - int(s * 0.02)), (cx - int(s * 0.04), cy + int(s * 0.13)), shade, max(1, s // 40))
+    cv2.ellipse(img, (cx, cy + int(s * 0.27)), (int(s * 0.15), int(s * 0.05)), 0, 0, 360, (60, 60, 150), -1)
+
+class Scene:
+    """
+    One shot: background, a few moving shapes and faces drifting slowly,
+    all derived from the seeded generator.
+    """
+    def __init__(self, rng, size, faces):
+        w, h = size
+        self.size = size
+        top, bottom = rng.integers(40, 200, 3), rng.integers(40, 200, 3)
+        ramp = np.linspace(0.0, 1.0, h, dtype=np.float32)[:, None, None]
+        self.background = np.repeat((top * (1 - ramp) + bottom * ramp).astype(np.uint8), w, axis=1)
+        self.shapes = [
+            (rng.uniform(0, w), rng.uniform(0, h), rng.uniform(0.02, 0.08) * min(w, h),
+             tuple(int(c) for c in rng.integers(0, 255, 3)), rng.uniform(-2, 2, 2))
+            for _ in range(4)
+        ]
+        face_size = min(w, h) * (0.45 if faces == 1 else 0.22)
+        self.faces = []
+        for i in range(faces):
+            x = w * (i + 1) / (faces + 1) if faces > 1 else w * rng.uniform(0.4, 0.6)
+            y = h * rng.uniform(0.45, 0.55)
+            tone = tuple(int(t) for t in np.array([150, 170, 200]) + rng.integers(-20, 20, 3))
+            self.faces.append((x, y, face_size * rng.uniform(0.85, 1.15), tone, rng.uniform(0, 2 * np.pi)))
+
+    def render(self, t, noise):
+        img = self.background.copy()
+        w, h = self.size
+        for x, y, r, color, (vx, vy) in self.shapes:
+            cv2.circle(img, (int(x + vx * t * 20) % w, int(y + vy * t * 20) % h), int(r), color, -1)
+        for x, y, size, tone, phase in self.faces:
+            dx = 0.03 * w * np.sin(0.8 * t + phase)
+            dy = 0.02 * h * np.cos(0.6 * t + phase)
+            draw_face(img, int(x + dx), int(y + dy), int(size), tone)
+        # Sensor-like noise: cycled tiles, so 4K frames stay cheap to make
+        return cv2.add(img, noise, dtype=cv2.CV_8U)
+
+def noise_bank(rng, size, count=4):
+    w, h = size
+    return [rng.integers(0, 6, (h, w, 3), dtype=np.uint8) for _ in range(count)]
+
+def render_frames(seed, size, seconds, faces, cuts):
+    rng = np.random.default_rng(seed)
+    noise = noise_bank(rng, size)
+    total = int(seconds * FPS)
+    shots = max(1, cuts + 1)
+    scenes = [Scene(rng, size, faces) for _ in range(shots)]
+    for i in range(total):
+        t = i / FPS
+        scene = scenes[min(shots - 1, i * shots // total)]
+        yield scene.render(t, noise[i % len(noise)])
+
+def write_opencv(path, frames, size, codec):
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*codec), FPS, size)
+    if not writer.isOpened():
+        raise RuntimeError(f"OpenCV cannot encode {codec}")
+    try:
+        for frame in frames:
+            writer.write(frame)
+    finally:
+        writer.release()
+
+def write_h264(path, frames, size, gop, ffmpeg):
+    w, h = size
+    command = [
+        ffmpeg, "-y", "-loglevel", "error",
+        "-f", "rawvideo", "-pix_fmt", "bgr24", "-s", f"{w}x{h}", "-r", str(FPS), "-i", "-",
+        "-c:v", "libx264", "-preset", "veryfast", "-g", str(gop), "-pix_fmt", "yuv420p", path
+    ]
+    process = subprocess.Popen(command, stdin=subprocess.PIPE)
+    try:
+        for frame in frames:
+            process.stdin.write(frame.tobytes())
+    finally:
+        process.stdin.close()
+        if process.wait() != 0:
+            raise RuntimeError(f"ffmpeg exited with {process.returncode}")
+
+def write_placeholder_model(path, seed):
+    """
+    Conv stack from 224x224x3 to one sigmoid score, ~0.25 GMACs per crop
+    (EfficientNet-B0: ~0.39), input/output names and shapes as the real model.
+    """
+    from onnx import helper, numpy_helper, TensorProto, save, checker
+
+    rng = np.random.default_rng(seed)
+    channels = [3, 32, 64, 128, 256, 512]
+    nodes, weights = [], []
+    previous = "input"
+    for i, (cin, cout) in enumerate(zip(channels, channels[1:])):
+        w = rng.normal(0, np.sqrt(2.0 / (cin * 9)), (cout, cin, 3, 3)).astype(np.float32)
+        weights.append(numpy_helper.from_array(w, f"conv{i}_w"))
+        nodes.append(helper.make_node("Conv", [previous, f"conv{i}_w"], [f"conv{i}"], pads=[1, 1, 1, 1], strides=[2, 2]))
+        nodes.append(helper.make_node("Relu", [f"conv{i}"], [f"relu{i}"]))
+        previous = f"relu{i}"
+    fc = (rng.normal(0, 1.0, (channels[-1], 1)) / channels[-1]).astype(np.float32)
+    weights.append(numpy_helper.from_array(fc, "fc_w"))
+    nodes += [
+        helper.make_node("GlobalAveragePool", [previous], ["pooled"]),
+        helper.make_node("Flatten", ["pooled"], ["features"]),
+        helper.make_node("MatMul", ["features", "fc_w"], ["logit"]),
+        helper.make_node("Sigmoid", ["logit"], ["output"]),
+    ]
+    graph = helper.make_graph(
+        nodes, "placeholder_efficientnet_b0",
+        [helper.make_tensor_value_info("input", TensorProto.FLOAT, ["N", 3, FACE_CROP_SIZE, FACE_CROP_SIZE])],
+        [helper.make_tensor_value_info("output", TensorProto.FLOAT, ["N", 1])],
+        weights
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+    model.ir_version = 8
+    checker.check_model(model)
+    save(model, path)
+
+def generate(out, profile, seed):
+    os.makedirs(out, exist_ok=True)
+    ffmpeg = find_ffmpeg()
+    manifest = {
+        "generator_version": GENERATOR_VERSION,
+        "seed": seed,
+        "profile": profile,
+        "opencv": cv2.__version__,
+        "ffmpeg": ffmpeg,
+        "files": [],
+        "skipped": [],
+        "model": None,
+    }
+
+    for index, (name, size, faces) in enumerate(IMAGES[profile]):
+        rng = np.random.default_rng(seed * 1000 + index)
+        image = Scene(rng, size, faces).render(0.0, noise_bank(rng, size, 1)[0])
+        cv2.imwrite(os.path.join(out, name), image)
+        manifest["files"].append({"path": name, "kind": "image", "width": size[0], "height": size[1], "faces": faces})
+        print(f"[CORPUS] {name}")
+
+    for index, (name, size, seconds, codec, gop, faces, cuts) in enumerate(VIDEOS[profile]):
+        path = os.path.join(out, name)
+        frames = render_frames(seed * 1000 + 500 + index, size, seconds, faces, cuts)
+        try:
+            if codec == "h264":
+                if ffmpeg is None:
+                    raise RuntimeError("no ffmpeg binary")
+                write_h264(path, frames, size, gop, ffmpeg)
+            else:
+                write_opencv(path, frames, size, codec)
+        except (RuntimeError, OSError) as e:
+            manifest["skipped"].append({"path": name, "reason": str(e)})
+            print(f"[CORPUS] Skipped {name}: {e}")
+            continue
+        manifest["files"].append({
+            "path": name, "kind": "video", "width": size[0], "height": size[1], "seconds": seconds,
+            "fps": FPS, "codec": codec, "gop": gop, "faces": faces, "cuts": cuts
+        })
+        print(f"[CORPUS] {name}")
+
+    model_name = "placeholder_efficientnet_b0.onnx"
+    try:
+        write_placeholder_model(os.path.join(out, model_name), seed)
+        manifest["model"] = model_name
+        print(f"[CORPUS] {model_name}")
+    except ImportError:
+        manifest["skipped"].append({"path": model_name, "reason": "onnx package not installed (pip install onnx)"})
+        print("[CORPUS] Skipped placeholder model: pip install onnx")
+
+    with open(os.path.join(out, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--out", default=DEFAULT_OUT)
+    parser.add_argument("--profile", choices=sorted(IMAGES), default="full")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    manifest = generate(args.out, args.profile, args.seed)
+    print(f"[CORPUS] {len(manifest['files'])} files in {args.out} ({len(manifest['skipped'])} skipped)")
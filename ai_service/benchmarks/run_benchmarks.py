@@ -0,0 +1,450 @@
+"""
+Benchmark suite over the synthetic corpus: p50/p95/p99 latency, throughput and peak memory per component and end to end.
+
+Each component runs in its own subprocess so peak RSS is attributable:
+FrameExtractor (per file), FaceAnalyzer (per frame), EfficientNetONNXDetector
+(per batch), ArtifactAnalyzer (per batch), context_verify (per caption), the
+caption ClaimMatcher (per batch of captions, backfill throughput) and
+DeepfakeGuardProcess.run (per file, verdict cache off, with per-stage
+percentiles from StageTimings). Results are JSON with the commit and library
+versions, so runs on two commits can be compared:
+
+    python benchmarks/generate_corpus.py --profile quick
+    python benchmarks/run_benchmarks.py --out before.json
+    (check out the change)
+    python benchmarks/run_benchmarks.py --out after.json --compare before.json
+
+--compare exits with status 1 when a p50/p95 latency grew by more than
+--tolerance (and --min-delta-ms), or when an end-to-end verdict changed.
+
+Usage: python benchmarks/run_benchmarks.py [--corpus benchmarks/corpus] [--components a,b] [--repeats 3] [--out results.json] [--compare baseline.json]
+"""
+import sys
+import os
+import json
+import time
+import random
+import argparse
+import platform
+import subprocess
+import tempfile
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), "corpus")
+RESULTS_VERSION = 1
+PERCENTILES = (50, 95, 99)
+
+# Captions for context_verify: short/no-claim, dated claims, breaking/disaster wording
+CAPTIONS = [
+    "Lovely afternoon at the park",
+    "Breaking: massive earthquake hits the city centre today, buildings collapsed",
+    "This photo was taken yesterday at the protest downtown, 100% real footage",
+    "Flood waters rising in the valley this morning, confirmed by officials",
+    "Throwback to our trip in 2019, still the best holiday ever with the whole family",
+    "URGENT!!! Share before they delete it: the government is hiding the truth about the fire",
+]
+
+def corpus_files(corpus, manifest, kind=None):
+    return [
+        dict(entry, path=os.path.join(corpus, entry["path"]))
+        for entry in manifest["files"] if kind is None or entry["kind"] == kind
+    ]
+
+def load_media(path, kind):
+    """
+    Frames as the verification pipeline samples them (decoded once, untimed).
+    """
+    import cv2
+    from core.extractor import FrameExtractor
+
+    if kind == "image":
+        return [cv2.imread(path)]
+    random.seed(0)
+    frames, _ = FrameExtractor().extract_frames(path)
+    return frames
+
+def series(unit, samples_ms, items, wall_s, **extra):
+    return dict(extra, unit=unit, samples_ms=samples_ms, items=items, wall_s=wall_s)
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+# --- Components (each runs in a fresh worker process) ---
+
+def bench_frame_extractor(corpus, manifest, model_path, repeats):
+    from core.extractor import FrameExtractor
+
+    extractor = FrameExtractor()
+    samples, frames = [], 0
+    videos = corpus_files(corpus, manifest, "video")
+    extractor.extract_frames(videos[0]["path"])  # warm-up
+    start = time.perf_counter()
+    for i in range(repeats):
+        for video in videos:
+            random.seed(i)  # Same jitter on every commit
+            (result, _), ms = timed(extractor.extract_frames, video["path"])
+            samples.append(ms)
+            frames += len(result)
+    return {"frame_extractor": series("file", samples, len(samples), time.perf_counter() - start,
+                                      frames_per_file=round(frames / max(1, len(samples)), 1))}
+
+def bench_face_analyzer(corpus, manifest, model_path, repeats):
+    from config import MAX_FACES_PER_FRAME
+    from core.detector import FaceAnalyzer
+
+    analyzer = FaceAnalyzer()
+    media = [load_media(entry["path"], entry["kind"]) for entry in corpus_files(corpus, manifest)]
+    analyzer.detect_faces(media[0][0], analyzer.new_track(), MAX_FACES_PER_FRAME)  # warm-up
+    samples, faces = [], 0
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for frames in media:
+            track = analyzer.new_track()  # tracking state per file, as in a request
+            for frame in frames:
+                result, ms = timed(analyzer.detect_faces, frame, track, MAX_FACES_PER_FRAME)
+                samples.append(ms)
+                faces += len(result)
+    return {"face_analyzer": series("frame", samples, len(samples), time.perf_counter() - start,
+                                    faces_per_frame=round(faces / max(1, len(samples)), 2))}
+
+def face_crops(corpus, manifest, limit=64):
+    """
+    (fixed-size crop, rois) for faces found in the corpus, as the pipeline makes them.
+    """
+    import cv2
+    from config import FACE_CROP_SIZE
+    from core.detector import FaceAnalyzer
+
+    analyzer = FaceAnalyzer()
+    crops = []
+    for entry in corpus_files(corpus, manifest):
+        for frame in load_media(entry["path"], entry["kind"]):
+            for _, box in analyzer.detect_faces(frame, None, 4):
+                face, rois = analyzer.crop_rois(frame, box)
+                crops.append((cv2.resize(face, (FACE_CROP_SIZE, FACE_CROP_SIZE), interpolation=cv2.INTER_AREA), rois))
+                if len(crops) >= limit:
+                    return crops
+    return crops
+
+def batches(items, size, count):
+    """
+    count batches of size items, cycling through items.
+    """
+    return [[items[(b * size + i) % len(items)] for i in range(size)] for b in range(count)]
+
+def bench_efficientnet(corpus, manifest, model_path, repeats):
+    from config import CASCADE_CHUNK, BATCH_MAX_SIZE
+    from core.models import EfficientNetONNXDetector
+
+    model = EfficientNetONNXDetector(model_path)
+    crops = [crop for crop, _ in face_crops(corpus, manifest)]
+    results = {}
+    for size in sorted({1, CASCADE_CHUNK, BATCH_MAX_SIZE}):
+        work = batches(crops, size, max(4, 64 // size) * repeats)
+        model.predict_batch(work[0])  # warm-up for this shape
+        samples = []
+        start = time.perf_counter()
+        for batch in work:
+            samples.append(timed(model.predict_batch, batch)[1])
+        results[f"efficientnet[batch={size}]"] = series("batch", samples, len(work) * size, time.perf_counter() - start)
+    return results
+
+def bench_artifact_analyzer(corpus, manifest, model_path, repeats):
+    from config import CASCADE_CHUNK
+    from core.heuristics import ArtifactAnalyzer
+
+    analyzer = ArtifactAnalyzer()
+    rois = [r for _, r in face_crops(corpus, manifest)]
+    results = {}
+    for size in sorted({1, CASCADE_CHUNK}):
+        work = batches(rois, size, max(8, 64 // size) * repeats)
+        analyzer.analyze_batch(work[0])  # warm-up
+        samples = []
+        start = time.perf_counter()
+        for batch in work:
+            samples.append(timed(analyzer.analyze_batch, batch)[1])
+        results[f"artifact_analyzer[batch={size}]"] = series("batch", samples, len(work) * size, time.perf_counter() - start)
+    return results
+
+def bench_context_verify(corpus, manifest, model_path, repeats):
+    from context_verify import verify_context
+    from core.instrumentation import StageTimings
+
+    media = [entry["path"] for entry in corpus_files(corpus, manifest)]
+    samples, errors, stages = [], {}, {}
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for i, caption in enumerate(CAPTIONS):
+            timings = StageTimings()
+            began = time.perf_counter()
+            try:
+                verify_context(caption, media[i % len(media)], timings)
+            except Exception as e:  # recorded, so a fix or a breakage shows up in the results
+                key = f"{type(e).__name__}: {e}"
+                errors[key] = errors.get(key, 0) + 1
+            samples.append((time.perf_counter() - began) * 1000)
+            for stage, ms in timings.summary()["stages_ms"].items():
+                stages.setdefault(stage, []).append(ms)
+    return {"context_verify": series("caption", samples, len(samples), time.perf_counter() - start,
+                                     errors=errors, stages=stages)}
+
+def bench_claim_matcher(corpus, manifest, model_path, repeats):
+    from core.claims import CLAIM_MATCHER
+
+    batch = CAPTIONS * 100
+    samples = []
+    start = time.perf_counter()
+    for _ in range(repeats * 10):
+        _, ms = timed(CLAIM_MATCHER.scan_many, batch)
+        samples.append(ms)
+    return {f"claim_matcher[batch={len(batch)}]": series("batch", samples, len(batch) * len(samples),
+                                                         time.perf_counter() - start)}
+
+def bench_end_to_end(corpus, manifest, model_path, repeats):
+    from main import DeepfakeGuardProcess
+    from core.instrumentation import StageTimings
+
+    guard = DeepfakeGuardProcess(model_path=model_path)
+    guard.cache = None  # measure the pipeline, not the verdict store
+    files = corpus_files(corpus, manifest)
+    guard.run(files[0]["path"])  # warm-up
+    samples, stages, verdicts = [], {}, {}
+    start = time.perf_counter()
+    for i in range(repeats):
+        for entry in files:
+            random.seed(i)
+            timings = StageTimings()
+            report, ms = timed(guard.run, entry["path"], None, timings)
+            samples.append(ms)
+            for stage, stage_ms in report["timings"]["stages_ms"].items():
+                stages.setdefault(stage, []).append(stage_ms)
+            verdicts.setdefault(os.path.basename(entry["path"]), report["verdict"])
+    return {"end_to_end": series("file", samples, len(samples), time.perf_counter() - start,
+                                 stages=stages, verdicts=verdicts)}
+
+COMPONENTS = {
+    "frame_extractor": bench_frame_extractor,
+    "face_analyzer": bench_face_analyzer,
+    "efficientnet": bench_efficientnet,
+    "artifact_analyzer": bench_artifact_analyzer,
+    "context_verify": bench_context_verify,
+    "claim_matcher": bench_claim_matcher,
+    "end_to_end": bench_end_to_end,
+}
+
+# --- Summaries ---
+
+def percentiles(samples_ms):
+    if not samples_ms:
+        return {f"p{p}_ms": None for p in PERCENTILES}
+    values = np.percentile(samples_ms, PERCENTILES)
+    return {f"p{p}_ms": round(float(v), 2) for p, v in zip(PERCENTILES, values)}
+
+def summarize(raw, peak_rss_mb):
+    summary = {"unit": raw["unit"], "count": len(raw["samples_ms"])}
+    summary.update(percentiles(raw["samples_ms"]))
+    summary["mean_ms"] = round(float(np.mean(raw["samples_ms"])), 2) if raw["samples_ms"] else None
+    summary["throughput_per_s"] = round(raw["items"] / raw["wall_s"], 2) if raw["wall_s"] > 0 else None
+    summary["peak_rss_mb"] = peak_rss_mb
+    for key, value in raw.items():
+        if key in ("unit", "samples_ms", "items", "wall_s"):
+            continue
+        if key == "stages":
+            value = {stage: percentiles(ms) for stage, ms in sorted(value.items())}
+        summary[key] = value
+    return summary
+
+def run_worker(name, corpus, model_path, repeats, result_file):
+    from core.instrumentation import peak_rss_mb
+
+    with open(os.path.join(corpus, "manifest.json")) as f:
+        manifest = json.load(f)
+    raw = COMPONENTS[name](corpus, manifest, model_path, repeats)
+    peak = peak_rss_mb()
+    with open(result_file, "w") as f:
+        json.dump({key: summarize(value, peak) for key, value in raw.items()}, f)
+
+def run_component(name, corpus, model_path, repeats, verbose):
+    """
+    One component in a fresh interpreter: its peak RSS is its own.
+    """
+    fd, result_file = tempfile.mkstemp(suffix=".json")
+    os.close(fd)
+    env = dict(os.environ, AI_VERDICT_CACHE="0")
+    command = [sys.executable, os.path.abspath(__file__), "--worker", name, "--corpus", corpus,
+               "--model", model_path, "--repeats", str(repeats), "--result-file", result_file]
+    try:
+        process = subprocess.run(command, env=env, stdout=None if verbose else subprocess.DEVNULL,
+                                 stderr=None if verbose else subprocess.PIPE, text=True)
+        if process.returncode != 0:
+            tail = (process.stderr or "").strip().splitlines()[-5:]
+            return {name: {"error": f"worker exited with {process.returncode}", "stderr": tail}}
+        with open(result_file) as f:
+            return json.load(f)
+    finally:
+        os.remove(result_file)
+
+def git_revision():
+    root = os.path.join(os.path.dirname(__file__), "..")
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=root, capture_output=True, text=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=root,
+                               capture_output=True, text=True).stdout.strip() != ""
+    except OSError:
+        return None, None
+    return commit or None, dirty
+
+def library_versions():
+    versions = {"python": platform.python_version(), "numpy": np.__version__}
+    for module in ("cv2", "onnxruntime", "scipy"):
+        try:
+            versions[module] = __import__(module).__version__
+        except ImportError:
+            versions[module] = None
+    return versions
+
+def run_meta(corpus, manifest, model_path, repeats):
+    import config
+
+    commit, dirty = git_revision()
+    return {
+        "results_version": RESULTS_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_commit": commit,
+        "git_dirty": dirty,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "versions": library_versions(),
+        "corpus": {key: manifest.get(key) for key in ("generator_version", "seed", "profile")},
+        "corpus_files": len(manifest["files"]),
+        "model": os.path.basename(model_path),
+        "model_bytes": os.path.getsize(model_path) if os.path.exists(model_path) else None,
+        "repeats": repeats,
+        "config": {
+            "frame_selection": config.FRAME_SELECTION,
+            "frame_sampler": config.FRAME_SAMPLER,
+            "max_faces_per_frame": config.MAX_FACES_PER_FRAME,
+            "face_detector": config.FACE_DETECTOR_BACKEND,
+            "cascade": config.CASCADE_ENABLED,
+            "pipeline_workers": config.PIPELINE_WORKERS,
+        },
+    }
+
+# --- Comparison ---
+
+def compare(results, baseline, tolerance, min_delta_ms):
+    """
+    Regressions of results against baseline: latency up by more than
+    tolerance (fraction) and min_delta_ms, or an end-to-end verdict changed.
+    Prints a table and returns the list of regressions.
+    """
+    regressions = []
+    print(f"\n{'series':<32}{'metric':<10}{'baseline':>12}{'current':>12}{'change':>9}")
+    for name, current in results["results"].items():
+        previous = baseline.get("results", {}).get(name)
+        if previous is None or "error" in current or "error" in previous:
+            continue
+        for metric in ("p50_ms", "p95_ms", "p99_ms"):
+            old, new = previous.get(metric), current.get(metric)
+            if not old or new is None:
+                continue
+            change = new / old - 1
+            flag = ""
+            if metric != "p99_ms" and change > tolerance and new - old > min_delta_ms:
+                regressions.append(f"{name} {metric}: {old} -> {new} ms ({change:+.0%})")
+                flag = "  REGRESSION"
+            print(f"{name:<32}{metric:<10}{old:>12}{new:>12}{change:>+9.0%}{flag}")
+        for media, verdict in current.get("verdicts", {}).items():
+            before = previous.get("verdicts", {}).get(media)
+            if before is not None and before != verdict:
+                regressions.append(f"{name} verdict changed for {media}: {before} -> {verdict}")
+        if previous.get("errors") != current.get("errors"):
+            print(f"{name:<32}errors    {sum(previous.get('errors', {}).values()):>12}{sum(current.get('errors', {}).values()):>12}")
+    return regressions
+
+def print_table(results):
+    print(f"{'series':<32}{'unit':<8}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'per s':>10}{'peak MB':>10}")
+    for name, r in results["results"].items():
+        if "error" in r:
+            print(f"{name:<32}ERROR {r['error']}")
+            continue
+        print(f"{name:<32}{r['unit']:<8}{r['count']:>6}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}"
+              f"{r['throughput_per_s']:>10}{r['peak_rss_mb']:>10}")
+        for stage, p in r.get("stages", {}).items():
+            print(f"  {stage:<38}{p['p50_ms']:>10}{p['p95_ms']:>10}{p['p99_ms']:>10}")
+        if r.get("errors"):
+            for error, n in r["errors"].items():
+                print(f"  error x{n}: {error}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--components", default=",".join(COMPONENTS), help="Comma-separated subset of: " + ", ".join(COMPONENTS))
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--model", help="ONNX model (default: the corpus placeholder, else the served model)")
+    parser.add_argument("--out", help="Write results JSON here")
+    parser.add_argument("--compare", help="Baseline results JSON to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed p50/p95 slowdown (fraction)")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="Ignore slowdowns smaller than this")
+    parser.add_argument("--json", action="store_true", help="Print JSON instead of a table")
+    parser.add_argument("--verbose", action="store_true", help="Show the components' own logging")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--result-file", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.corpus, args.model, args.repeats, args.result_file)
+        sys.exit(0)
+
+    manifest_path = os.path.join(args.corpus, "manifest.json")
+    if not os.path.exists(manifest_path):
+        sys.exit(f"No corpus at {args.corpus}; run benchmarks/generate_corpus.py first")
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+
+    model_path = args.model
+    if model_path is None:
+        if manifest.get("model"):
+            model_path = os.path.join(args.corpus, manifest["model"])
+        else:
+            from config import ACTIVE_MODEL_PATH
+            model_path = ACTIVE_MODEL_PATH
+    model_path = os.path.abspath(model_path)
+
+    components = [c.strip() for c in args.components.split(",") if c.strip()]
+    unknown = [c for c in components if c not in COMPONENTS]
+    if unknown:
+        sys.exit(f"Unknown components: {', '.join(unknown)}")
+
+    results = {"meta": run_meta(args.corpus, manifest, model_path, args.repeats), "results": {}}
+    for name in components:
+        if not args.json:
+            print(f"[BENCH] {name}...", flush=True)
+        results["results"].update(run_component(name, os.path.abspath(args.corpus), model_path, args.repeats, args.verbose))
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_table(results)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get("meta", {}).get("corpus") != results["meta"]["corpus"]:
+            print("[BENCH] Warning: baseline was measured on a different corpus")
+        regressions = compare(results, baseline, args.tolerance, args.min_delta_ms)
+        if regressions:
+            print("\nRegressions:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("\nNo regressions")
@@ -0,0 +1,87 @@
+import json
+import os
+import time
+import socket
+import http.client
+from urllib.parse import urlencode
+
+from config import SERVER_HOST, SERVER_PORT, SERVER_CONNECT_TIMEOUT, SERVER_REQUEST_TIMEOUT, SERVER_DEADLINE_GRACE_S
+
+def _fail_closed(signals):
+    from main import fail_closed_report
+    return fail_closed_report(signals + ["fail_closed"])
+
+def verify_remote(file_path=None, deadline=None, timings=False, profile=False, data=None, shm=None, shm_size=None,
+                  caption=None, host=SERVER_HOST, port=SERVER_PORT):
+    """
+    Forward a verification request to the running server (server.py).
+    The media is one of: file_path, data (the media bytes, sent as the
+    request body) or shm (name of a shared-memory segment the server reads,
+    shm_size bytes long).
+    deadline: optional time.monotonic() timestamp, sent as the time left;
+    the wait for the answer ends SERVER_DEADLINE_GRACE_S after it.
+    timings, profile: ask for the timings block / a server-side cProfile dump.
+    caption: run the context check too (combined report, see
+    DeepfakeGuardProcess.run_with_context).
+    Returns None when no server is reachable, the request could not be sent
+    or the server has no engine loaded yet (503 engine_not_ready: starting
+    up, or its load failed), so the caller can fall back to in-process
+    verification. Otherwise the server owns the answer: a late or failed response
+    gives a fail-closed report, not a second verification the Node caller
+    has no time left for.
+    """
+    try:
+        sock = socket.create_connection((host, port), timeout=SERVER_CONNECT_TIMEOUT)
+    except OSError:
+        return None
+
+    def time_left():
+        if deadline is None:
+            return SERVER_REQUEST_TIMEOUT
+        return max(0.0, deadline - time.monotonic()) + SERVER_DEADLINE_GRACE_S
+
+    conn = http.client.HTTPConnection(host, port)
+    conn.sock = sock
+    sock.settimeout(time_left())
+    try:
+        request = {}
+        if deadline is not None:
+            request["time_budget_ms"] = max(0.0, (deadline - time.monotonic()) * 1000)
+        if timings:
+            request["timings"] = True
+        if profile:
+            request["profile"] = True
+        if caption is not None:
+            request["caption"] = caption
+        if data is not None:
+            # Raw bytes in the body, options in the query string
+            query = urlencode({k: int(v) if v is True else v for k, v in request.items()})
+            conn.request("POST", f"/verify?{query}", body=data, headers={"Content-Type": "application/octet-stream"})
+        else:
+            if shm is not None:
+                request["shm"] = shm
+                request["shm_size"] = shm_size
+            else:
+                request["file_path"] = os.path.abspath(file_path)
+            body = json.dumps(request)
+            conn.request("POST", "/verify", body=body, headers={"Content-Type": "application/json"})
+    except (OSError, http.client.HTTPException):
+        conn.close()
+        return None
+
+    try:
+        sock.settimeout(time_left())
+        response = conn.getresponse()
+        # Errors (400/413/429 shed) carry a fail-closed report too
+        report = json.loads(response.read())
+        if response.status == 503 and "engine_not_ready" in report.get("signals", []):
+            return None  # answered before any work: verify in-process
+        if response.status != 200 and report.get("verdict") != "REJECTED":
+            return _fail_closed([f"server_error: HTTP {response.status}"])
+        return report
+    except socket.timeout:
+        return _fail_closed(["server_timeout"])
+    except (OSError, ValueError, AttributeError, http.client.HTTPException) as e:
+        return _fail_closed([f"server_error: {str(e)}"])
+    finally:
+        conn.close()
@@ -16,7 +16,199 @@ THRESHOLD_UNSAFE = 0.40
 # --- PERFORMANCE CONFIG ---
 MAX_FRAMES = 32
 FRAME_SAMPLE_RATE = 1  # 1 FPS
+# "sequential" walks the stream with grab() and retrieves only sampled frames,
+# "seek" sets CAP_PROP_POS_MSEC per sample, "auto" walks sequentially and
+# switches to seeking once it measures a GOP short enough to make seeks cheaper.
+FRAME_SAMPLER = os.environ.get("AI_FRAME_SAMPLER", "auto")
+SEEK_ASSUMED_GOP_FRAMES = 250  # x264 default keyint, used when picture types are unavailable
+
+# --- ADAPTIVE FRAME SELECTION ---
+# "adaptive" keeps frames where the content changed (scene cuts, keyframes,
+# motion) instead of a fixed 1 FPS grid; "uniform" is the 1 FPS sampler above.
+FRAME_SELECTION = os.environ.get("AI_FRAME_SELECTION", "adaptive")
+ADAPTIVE_FRAME_BUDGET = 16        # max frames per request
+ADAPTIVE_TIME_BUDGET_MS = 4000    # max time spent decoding/selecting
+ADAPTIVE_CANDIDATE_FPS = 2        # thumbnails compared per second of video
+ADAPTIVE_CHANGE_THRESHOLD = 0.08  # mean abs thumbnail diff (0-1) that counts as new content
+ADAPTIVE_MAX_GAP_S = 3.0          # coverage floor on static clips
+
+# --- STREAMING PIPELINE ---
+# Frames are decoded on a background thread and turned into fixed-size face
+# crops on a small worker pool; full frames are dropped as soon as possible.
+PIPELINE_WORKERS = int(os.environ.get("AI_PIPELINE_WORKERS", str(min(4, os.cpu_count() or 1))))
+PIPELINE_QUEUE_SIZE = 2      # decoded frames waiting for a worker
+DECODE_THREADS = int(os.environ.get("AI_DECODE_THREADS", "0"))  # FFmpeg threads per capture, 0 = one per core
+FACE_CROP_SIZE = 224         # EfficientNet-B0 input size
+
+# --- FACE DETECTION ---
+# "haar" (built in to OpenCV) or "yunet" (OpenCV DNN detector, needs YUNET_MODEL_PATH)
+FACE_DETECTOR_BACKEND = os.environ.get("AI_FACE_DETECTOR", "haar")
+DETECTION_MAX_SIDE = 960     # detect on a copy downscaled to this longer side (0 = full res)
+FACE_TRACKING = True         # search around the previous face box before a full-frame scan
+TRACK_PADDING = 0.5          # search window padding, as a fraction of the face box
+# Faces verified per frame (largest first). Each is tracked as its own identity
+# and the riskiest identity decides the verdict. 1 = largest face only.
+MAX_FACES_PER_FRAME = int(os.environ.get("AI_MAX_FACES", "1"))
+TRACK_MIN_IOU = 0.2          # min overlap to keep a face identity between frames
+
+# --- LARGE STILL IMAGES ---
+# JPEGs bigger than the detection resolution are never decoded at full size:
+# a DCT-scaled preview (IMREAD_REDUCED_*) is hashed and face-detected, then the
+# faces are cut from a second scaled decode, the coarsest that keeps every face
+# at least IMAGE_CROP_MIN_SIDE px for EfficientNet and the artifact heuristics
+# (0 = cut faces from the full-resolution decode).
+IMAGE_REDUCED_DECODE = os.environ.get("AI_IMAGE_REDUCED_DECODE", "1") == "1"
+IMAGE_CROP_MIN_SIDE = 2 * FACE_CROP_SIZE
+
+# --- SERVER MODE ---
+# Long-lived verification server (server.py). The CLI (main.py) forwards to it
+# when it is reachable and falls back to in-process verification otherwise.
+SERVER_HOST = os.environ.get("AI_SERVICE_HOST", "127.0.0.1")
+SERVER_PORT = int(os.environ.get("AI_SERVICE_PORT", "8765"))
+SERVER_CONNECT_TIMEOUT = 0.25  # seconds, before falling back to in-process
+SERVER_REQUEST_TIMEOUT = 15.0  # seconds, for requests without a deadline
+SERVER_DEADLINE_GRACE_S = 1.0  # wait past the deadline for the answer; the Node caller kills at budget + 2 s
+SERVER_MAX_BODY_BYTES = int(os.environ.get("AI_MAX_BODY_MB", "200")) * 1024 * 1024  # media sent as the request body
+
+# --- ADMISSION CONTROL (server mode) ---
+# Each request is probed for a cost estimate (file size; duration and
+# resolution from the MP4/MOV headers, else cv2.VideoCapture properties)
+# and run shortest-job-first on ADMISSION_SLOTS concurrent verifications.
+# Jobs estimated under ADMISSION_FAST_LANE_S take the priority lane, which
+# also owns ADMISSION_FAST_RESERVED slots the slow lane cannot use, so images
+# do not queue behind videos. A job that could not start ADMISSION_MIN_RUN_S before
+# its deadline, or finds its lane's queue full, is shed (HTTP 429,
+# fail-closed report) instead of timing out later. GET /stats and /metrics
+# show queue waits and sheds per job class.
+ADMISSION_ENABLED = os.environ.get("AI_ADMISSION", "1") == "1"
+ADMISSION_SLOTS = int(os.environ.get("AI_ADMISSION_SLOTS", str(max(2, os.cpu_count() or 1))))
+ADMISSION_FAST_RESERVED = int(os.environ.get("AI_ADMISSION_FAST_RESERVED", "1"))
+ADMISSION_FAST_LANE_S = float(os.environ.get("AI_ADMISSION_FAST_LANE_S", "1.0"))
+ADMISSION_MAX_QUEUE = int(os.environ.get("AI_ADMISSION_MAX_QUEUE", "64"))  # waiting jobs per lane
+ADMISSION_MIN_RUN_S = 1.0          # least useful run time left at start (stages degrade to fit)
+ADMISSION_EST_IMAGE_S = 0.35       # starting estimates: per image, plus per MB of file
+ADMISSION_EST_IMAGE_MB_S = 0.05
+ADMISSION_EST_VIDEO_S = 1.0        # per video, plus per megapixel-second of video
+ADMISSION_EST_VIDEO_MPIX_S = 0.01
+ADMISSION_COST_SMOOTHING = 0.2     # weight of the newest observed/estimated ratio per class
+
+# --- COMBINED VERIFICATION ---
+# A call with a caption (main.py --caption, "caption" in /verify) runs the
+# context check (context_verify.py) on a thread pool while the deepfake
+# check runs, sharing the parsed container metadata; one merged report.
+CONTEXT_WORKERS = int(os.environ.get("AI_CONTEXT_WORKERS", "4"))
+
+# --- CROSS-REQUEST MICRO-BATCHING (server mode) ---
+# Face crops from concurrent verifications are merged into one session.run,
+# flushed at BATCH_MAX_SIZE crops or after BATCH_MAX_WAIT_MS.
+BATCH_MAX_SIZE = int(os.environ.get("AI_BATCH_MAX_SIZE", "32"))
+BATCH_MAX_WAIT_MS = float(os.environ.get("AI_BATCH_MAX_WAIT_MS", "5"))
+
+# --- ONNX RUNTIME SESSION ---
+# Pin thread counts when several workers share a node, so they do not
+# oversubscribe the cores (0 = let ONNX Runtime decide).
+ORT_INTRA_OP_THREADS = int(os.environ.get("AI_ORT_INTRA_THREADS", "0"))
+ORT_INTER_OP_THREADS = int(os.environ.get("AI_ORT_INTER_THREADS", "0"))
+ORT_EXECUTION_MODE = os.environ.get("AI_ORT_EXECUTION_MODE", "sequential")  # "sequential" | "parallel"
+ORT_GRAPH_OPT_LEVEL = os.environ.get("AI_ORT_GRAPH_OPT", "all")  # "disabled" | "basic" | "extended" | "all"
+# Optimised graph is serialised to ORT_CACHE_DIR on first load and reused
+# afterwards, keyed on the model file (mtime, size), the optimisation level and
+# the onnxruntime version. It is specific to the node's CPU: delete it after
+# hardware changes. An unwritable dir only costs the graph rewrite per load.
+ORT_CACHE_OPTIMIZED_MODEL = os.environ.get("AI_ORT_CACHE_OPTIMIZED", "1") == "1"
+ORT_CACHE_DIR = os.environ.get("AI_ORT_CACHE_DIR", os.path.join(os.path.dirname(__file__), "cache", "ort"))
+ORT_WARMUP_RUNS = 1
+
+# --- CASCADE SCORING ---
+# Faces are scored by EfficientNet a chunk at a time, most informative frames
+# first; scoring (and, with uniform sampling, decoding) stops as soon as bounds
+# on the fused score leave only one possible verdict.
+CASCADE_ENABLED = os.environ.get("AI_CASCADE", "1") == "1"
+CASCADE_CHUNK = 4  # crops per EfficientNet call between bound checks
+
+# --- DEADLINE ---
+# The Node caller kills the verifier after 15 s and a kill is a fail-closed
+# rejection. Stages are scheduled against the caller's time budget instead:
+# fewer frames, lower detection resolution, partial inference, each listed in
+# the report signals ("deadline_*"). Degraded reports are never cached.
+VERIFY_TIME_BUDGET_S = float(os.environ.get("AI_TIME_BUDGET_S", "12"))  # CLI/server default
+DEADLINE_FINISH_RESERVE_S = 0.3    # fusion, report and exit
+DEADLINE_EST_FRAME_S = 0.15        # starting estimate: decode + detect + heuristics per frame
+DEADLINE_EST_CROP_S = 0.03         # starting estimate: EfficientNet per face crop
+DEADLINE_COST_SMOOTHING = 0.3      # weight of the newest measurement in the running estimates
+DEADLINE_LOW_DETECTION_SIDE = 480  # detection resolution once frames fall behind
+
+# --- INSTRUMENTATION ---
+# Per-stage timings are recorded on every request; the report carries them as a
+# "timings" block with --timings (CLI) or "timings": true (server), and server
+# mode aggregates them for GET /metrics. "profile": true / --profile dumps a
+# cProfile of the request to PROFILE_DIR.
+REPORT_TIMINGS = os.environ.get("AI_REPORT_TIMINGS", "0") == "1"
+METRICS_STAGE_BUCKETS_S = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 15.0)
+METRICS_BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+# --- BATCH VERIFICATION ---
+# batch_verify.py (offline rescans): one worker process per core, each with its
+# own model, and ONNX Runtime/OpenCV, the frame pipeline and FFmpeg decoding
+# pinned to BATCH_ORT_THREADS per worker so workers x threads does not
+# oversubscribe the cores. Rescans use their own verdict cache, so they neither
+# read the production cache nor evict its entries.
+BATCH_WORKERS = os.cpu_count() or 1
+BATCH_ORT_THREADS = 1
+BATCH_IN_FLIGHT_PER_WORKER = 2  # files queued ahead per worker
+BATCH_PROGRESS_INTERVAL_S = 5.0
+MEDIA_EXTENSIONS = (
+    ".jpg", ".jpeg", ".png", ".webp", ".bmp", ".tif", ".tiff",
+    ".mp4", ".mov", ".m4v", ".avi", ".mkv", ".webm"
+)
+
+# --- VERDICT CACHE ---
+# Exact layer: sha256 of the file -> stored report (byte-identical re-uploads).
+# Near-duplicate layer: 64-bit dHash of sampled frames -> stored per-face scores,
+# so re-encoded/resized copies skip detection and inference for matching frames.
+# A perceptual hash cannot tell a face swap from the original, so by default only
+# frames of REJECTED media are reused (fail-closed); "all" also reuses approved media.
+VERDICT_CACHE_ENABLED = os.environ.get("AI_VERDICT_CACHE", "1") == "1"
+NEAR_DUP_REUSE = os.environ.get("AI_NEAR_DUP_REUSE", "rejected")  # "rejected" | "all" | "off"
+NEAR_DUP_MAX_DISTANCE = 4          # max Hamming distance (of 64 bits) between frame hashes
+VERDICT_CACHE_MAX_REPORTS = 50000  # LRU bound, exact layer
+VERDICT_CACHE_MAX_FRAMES = 200000  # LRU bound, near-duplicate layer
+VERDICT_CACHE_TTL_S = 7 * 24 * 3600
+
+# --- SIGNAL STORE ---
+# Optional record of every verification's per-frame raw signals (model score,
+# artifact rule outcomes and measurements, metadata score/signals) in columnar
+# binary files, so rescore.py can replay new fusion weights and thresholds over
+# the whole library without rerunning the pipeline. Each process appends to its
+# own segment directory under SIGNAL_STORE_DIR.
+SIGNAL_STORE_ENABLED = os.environ.get("AI_SIGNAL_STORE", "0") == "1"
+SIGNAL_STORE_DIR = os.environ.get("AI_SIGNAL_STORE_DIR", os.path.join(os.path.dirname(__file__), "signals"))
+
+# --- TRUSTED BULLETINS ---
+# Local index of trusted news/bulletin reports for the context source check.
+# Reports arrive as JSONL files dropped into BULLETIN_FEED_DIR (one report per
+# line: id, published, source, title, text, locations); new lines are ingested
+# incrementally into an sqlite inverted index (normalised keywords and
+# locations, bucketed by hour) that every context_verify process shares.
+# "Breaking" claims only match reports from the last BULLETIN_RECENT_WINDOW_S;
+# reports older than BULLETIN_RETENTION_S are evicted.
+BULLETIN_FEED_DIR = os.environ.get("AI_BULLETIN_FEED_DIR", os.path.join(os.path.dirname(__file__), "bulletins"))
+BULLETIN_BUCKET_S = 3600
+BULLETIN_RECENT_WINDOW_S = 48 * 3600
+BULLETIN_RETENTION_S = 14 * 24 * 3600
+BULLETIN_MAX_REPORTS = 200000      # hard bound on top of retention: oldest buckets go first
+BULLETIN_MIN_SHARED_TERMS = 2      # keywords in common (or one keyword + one location)
+BULLETIN_REFRESH_INTERVAL_S = 5.0  # long-running processes re-check the feed at most this often
 
 # --- PATHS ---
 MODEL_PATH = os.path.join(os.path.dirname(__file__), "models", "efficientnet_b0_v1.onnx")
+# INT8 model produced by tools/quantize_model.py, used on CPU-only nodes with AI_USE_INT8=1
+QUANTIZED_MODEL_PATH = os.path.join(os.path.dirname(__file__), "models", "efficientnet_b0_v1.int8.onnx")
+USE_QUANTIZED_MODEL = os.environ.get("AI_USE_INT8", "0") == "1"
+ACTIVE_MODEL_PATH = QUANTIZED_MODEL_PATH if USE_QUANTIZED_MODEL and os.path.exists(QUANTIZED_MODEL_PATH) else MODEL_PATH
+YUNET_MODEL_PATH = os.path.join(os.path.dirname(__file__), "models", "face_detection_yunet_2023mar.onnx")
+VERDICT_CACHE_PATH = os.path.join(os.path.dirname(__file__), "cache", "verdicts.sqlite3")
+BATCH_VERDICT_CACHE_PATH = os.path.join(os.path.dirname(__file__), "cache", "batch_verdicts.sqlite3")
+BULLETIN_INDEX_PATH = os.path.join(os.path.dirname(__file__), "cache", "bulletins.sqlite3")
+PROFILE_DIR = os.environ.get("AI_PROFILE_DIR", os.path.join(os.path.dirname(__file__), "profiles"))
 os.makedirs(os.path.dirname(MODEL_PATH), exist_ok=True)
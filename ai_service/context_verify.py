@@ -2,67 +2,57 @@ import sys
 import json
 import os
 import time
-import re
+import sqlite3
+import threading
 from datetime import datetime
 
-# Optional: lightweight NLP snapshots or mock source check
-TRUSTED_SOURCES_MOCK = [
-    "earthquake.gov", "weather.service", "official.news", "confirmed.report"
-]
+from core.bulletins import open_bulletin_index
+from core.claims import CLAIM_MATCHER
+from core.instrumentation import StageTimings
+from core.metadata import read_metadata, age_hours as media_age_hours
+
+_bulletin_index = False  # opened on first use (None = unavailable)
+_bulletin_lock = threading.Lock()  # combined calls run this module on a thread pool
 
 def extract_claims(text):
     """
     Step 1: Claim Extraction (NLP/Rule-based)
     Extracts factual assertions.
     """
-    # Simple regex for breaking news patterns
-    breaking_patterns = [
-        r"(?i)breaking", r"(?i)just in", r"(?i)happening now", r"(?i)confirmed",
-        r"(?i)massive", r"(?i)hits", r"(?i)killed", r"(?i)dead"
-    ]
-    
-    claims = []
-    for p in breaking_patterns:
-        if re.search(p, text):
-            claims.append(f"High-urgency claim: {re.findall(p, text)[0]}")
-            
-    # Look for location/event patterns
+    # Breaking news phrases, from the precompiled matcher (core/claims.py)
     # (In prod, use spaCy or small BERT on ONNX)
-    return claims
+    return CLAIM_MATCHER.scan(text).claims
 
 def classify_claim_type(text):
     """
     Step 2: Claim Type Classification
     """
-    categories = {
-        "disaster": [r"earthquake", r"flood", r"fire", r"storm", r"hurricane"],
-        "politics": [r"election", r"president", r"protest", r"senate", r"vote"],
-        "health": [r"virus", r"outbreak", r"vaccine", r"pandemic"],
-        "breaking": [r"breaking", r"live now", r"alert"]
-    }
-    
-    for cat, patterns in categories.items():
-        for p in patterns:
-            if re.search(p, text.lower()):
-                return cat
-    return "general"
+    return CLAIM_MATCHER.scan(text).claim_type
 
-def check_temporal_consistency(caption, media_path):
+def check_temporal_consistency(caption, media_path, is_breaking_claim=None, metadata=None):
     """
     Step 3: Temporal & Context Check (CRITICAL)
     Compares media creation age with caption 'now' claims.
+    is_breaking_claim: CaptionScan.current_claim when the caption was already scanned.
+    metadata: MediaMetadata already parsed by the caller (combined call); then
+    media_path may be None (in-memory upload).
     """
-    is_breaking_claim = any(x in caption.lower() for x in ["today", "now", "breaking", "just in", "happening"])
+    if is_breaking_claim is None:
+        is_breaking_claim = CLAIM_MATCHER.scan(caption).current_claim
     
     try:
-        # Get file creation time
-        stat = os.stat(media_path)
-        # Using modification time as creation time (OS dependent, but good proxy)
-        creation_time = datetime.fromtimestamp(stat.st_mtime)
-        now = datetime.now()
-        
-        # Age in hours
-        age_hours = (now - creation_time).total_seconds() / 3600
+        # Creation time embedded by the capture device (EXIF DateTimeOriginal,
+        # MP4 mvhd / QuickTime creationdate); an upload's mtime is the upload time
+        if metadata is None:
+            metadata = read_metadata(media_path)
+        age_hours = media_age_hours(metadata)
+        if age_hours is None and media_path is None:
+            # In-memory upload without an embedded time: received just now
+            age_hours = 0.0
+        elif age_hours is None:
+            # No embedded time: fall back to the file's modification time
+            creation_time = datetime.fromtimestamp(os.stat(media_path).st_mtime)
+            age_hours = (datetime.now() - creation_time).total_seconds() / 3600
         
         if is_breaking_claim and age_hours > 24:
             return 1.0, f"Context Mismatch: Media is {int(age_hours)}h old, but caption claims it is current/breaking."
@@ -74,51 +64,82 @@ def check_temporal_consistency(caption, media_path):
 def check_patterns(text):
     """
     Step 5: Known Misinfo Patterns
+    Emotional urgency and absolute claim markers.
     """
-    score = 0.0
-    reasons = []
-    
-    # Emotional urgency
-    if re.search(r"!!+|MUST WATCH|UNBELIEVABLE|SHOCKING", text):
-        score += 0.3
-        reasons.append("Sensationalist language patterns")
-        
-    # Absolute claims
-    if re.search(r"(?i)everyone", r"(?i)confirmed by all", r"(?i)100% true"):
-        score += 0.2
-        reasons.append("Suspicious absolute claim markers")
-        
-    return score, reasons
+    scan = CLAIM_MATCHER.scan(text)
+    return scan.pattern_score, scan.pattern_reasons
 
-def verify_context(caption, media_path):
+def check_trusted_sources(caption, recent):
+    """
+    Step 4: Source Check
+    Reports about the claimed event in the local trusted-bulletin index
+    (core/bulletins.py, fed from BULLETIN_FEED_DIR). recent: breaking claims
+    only match reports from the last BULLETIN_RECENT_WINDOW_S.
+    """
+    global _bulletin_index
+    with _bulletin_lock:
+        if _bulletin_index is False:
+            _bulletin_index = open_bulletin_index()
+    index = _bulletin_index
+    if index is None:
+        return []
+    try:
+        index.refresh()
+        return index.find(caption, recent=recent)
+    except sqlite3.Error as e:
+        print(f"[BULLETINS] WARNING: lookup failed ({e})", file=sys.stderr)
+        return []
+
+def verify_context(caption, media_path, timings=None, metadata=None):
     """
     Scoring & Decision
+    timings: optional StageTimings; per-scorer wall times are added to the
+    result as "timings".
+    metadata: MediaMetadata the caller already parsed (see check_temporal_consistency).
     """
+    recorder = timings if timings is not None else StageTimings()
+    result = _verify_context(caption, media_path, recorder, metadata)
+    recorder.finish()
+    if timings is not None:
+        result["timings"] = timings.summary()
+    return result
+
+def _verify_context(caption, media_path, timings, metadata=None):
     start_time = time.time()
     reasons = []
     
     # 1. Claim Check
-    claims = extract_claims(caption)
+    # (one pass over the caption: claims, claim type and misinfo patterns)
+    with timings.stage("claims"):
+        scan = CLAIM_MATCHER.scan(caption)
+    claims = scan.claims
+    timings.count("claims", len(claims))
     if not claims and len(caption.split()) < 10:
         # Too short/no claims = allow
         return {"verdict": "ALLOW", "score": 0.0, "reasons": []}
     
     # 2. Temporal Consistency (High Weight)
-    temp_score, temp_reason = check_temporal_consistency(caption, media_path)
+    with timings.stage("temporal"):
+        temp_score, temp_reason = check_temporal_consistency(caption, media_path, scan.current_claim, metadata)
     if temp_reason:
         reasons.append(temp_reason)
         
     # 3. Pattern Check
-    pattern_score, pattern_reasons = check_patterns(caption)
-    reasons.extend(pattern_reasons)
+    pattern_score = scan.pattern_score
+    reasons.extend(scan.pattern_reasons)
     
-    # 4. Source Check (Mocked for Demo)
-    # If it's a disaster claim but we don't 'know' about it
+    # 4. Source Check
+    # If it's a disaster claim but no trusted bulletin reports it
     source_score = 0.0
-    claim_type = classify_claim_type(caption)
-    if claim_type in ["disaster", "breaking"] and temp_score > 0.5:
-        source_score = 0.6
-        reasons.append(f"Unverified {claim_type} claim: No matching reports from trusted bulletins.")
+    claim_type = scan.claim_type
+    bulletins = []
+    if claim_type in ["disaster", "breaking"]:
+        with timings.stage("sources"):
+            bulletins = check_trusted_sources(caption, scan.current_claim or claim_type == "breaking")
+        timings.count("bulletins", len(bulletins))
+        if not bulletins and temp_score > 0.5:
+            source_score = 0.6
+            reasons.append(f"Unverified {claim_type} claim: No matching reports from trusted bulletins.")
 
     # Weighted Scoring
     # fake_news_score = 0.4*Temporal + 0.4*Source + 0.2*Pattern
@@ -138,20 +159,55 @@ def verify_context(caption, media_path):
         "reasons": reasons,
         "metadata": {
             "claim_type": claim_type,
+            "trusted_reports": [{"source": b["source"], "title": b["title"], "url": b["url"]} for b in bulletins],
             "processing_time_ms": int((time.time() - start_time) * 1000)
         }
     }
 
+def scan_captions(lines, out):
+    """
+    Backfill mode: claims, claim type and pattern hits for many captions
+    (no media), one JSON line each. Input lines are captions, or JSONL with
+    a "caption" field (other fields are passed through).
+    """
+    records = []
+    for line in lines:
+        line = line.rstrip("\n")
+        if not line:
+            continue
+        records.append(json.loads(line) if line.startswith("{") else {"caption": line})
+        if len(records) >= 1000:
+            _write_scans(records, out)
+            records = []
+    _write_scans(records, out)
+
+def _write_scans(records, out):
+    scans = CLAIM_MATCHER.scan_many([r.get("caption") or "" for r in records])
+    out.writelines(json.dumps(dict(r, **scan.as_dict())) + "\n" for r, scan in zip(records, scans))
+
 if __name__ == "__main__":
-    if len(sys.argv) < 3:
+    # context_verify.py <caption> <file> [--timings]
+    # context_verify.py --batch [captions.txt|captions.jsonl]   (default: stdin)
+    args = sys.argv[1:]
+    if args and args[0] == "--batch":
+        if len(args) > 1:
+            with open(args[1], encoding="utf-8") as f:
+                scan_captions(f, sys.stdout)
+        else:
+            scan_captions(sys.stdin, sys.stdout)
+        sys.exit(0)
+    report_timings = "--timings" in args
+    if report_timings:
+        args.remove("--timings")
+    if len(args) < 2:
         print(json.dumps({"verdict": "ERROR", "score": 1.0, "reasons": ["Missing caption or file path"]}))
         sys.exit(1)
         
-    caption = sys.argv[1]
-    file_path = sys.argv[2]
+    caption = args[0]
+    file_path = args[1]
     
     try:
-        result = verify_context(caption, file_path)
+        result = verify_context(caption, file_path, StageTimings() if report_timings else None)
         print(json.dumps(result))
     except Exception as e:
         print(json.dumps({"verdict": "ERROR", "score": 1.0, "reasons": [str(e)]}))
@@ -0,0 +1,304 @@
+import sys
+import time
+import heapq
+import itertools
+import threading
+
+import cv2
+
+from config import (
+    ADMISSION_SLOTS, ADMISSION_FAST_RESERVED, ADMISSION_FAST_LANE_S, ADMISSION_MAX_QUEUE, ADMISSION_MIN_RUN_S,
+    ADMISSION_EST_IMAGE_S, ADMISSION_EST_IMAGE_MB_S, ADMISSION_EST_VIDEO_S, ADMISSION_EST_VIDEO_MPIX_S,
+    ADMISSION_COST_SMOOTHING, METRICS_STAGE_BUCKETS_S
+)
+from core.instrumentation import Histogram
+
+JOB_CLASSES = ("image", "video", "other")  # "other": no image header, no decodable video stream
+OUTCOMES = ("admitted", "completed", "shed_queue_full", "shed_deadline", "expired")
+UNKNOWN_DURATION_S = 10.0  # streams that do not report a frame count
+
+QUEUED, RUNNING, DONE, SHED = "queued", "running", "done", "shed"
+
+class JobEstimate:
+    """
+    What the probes found and the predicted service time (seconds).
+    """
+    __slots__ = ("job_class", "size", "duration_s", "width", "height", "units", "cost_s")
+
+    def __init__(self, job_class, size, duration_s=None, width=None, height=None, units=0.0, cost_s=0.0):
+        self.job_class = job_class
+        self.size = size
+        self.duration_s = duration_s
+        self.width = width
+        self.height = height
+        self.units = units
+        self.cost_s = cost_s
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+class CostModel:
+    """
+    Service time of a verification from cheap probes, before it runs:
+    base + rate * units per job class, units = MB of file (images, other) or
+    megapixel-seconds of video, scaled by a per-class correction learned
+    from the service times observed on this node.
+    """
+    def __init__(self):
+        self.base = {"image": ADMISSION_EST_IMAGE_S, "video": ADMISSION_EST_VIDEO_S, "other": ADMISSION_EST_IMAGE_S}
+        self.rate = {"image": ADMISSION_EST_IMAGE_MB_S, "video": ADMISSION_EST_VIDEO_MPIX_S,
+                     "other": ADMISSION_EST_IMAGE_MB_S}
+        self.scale = dict.fromkeys(JOB_CLASSES, 1.0)
+        self.lock = threading.Lock()
+
+    def estimate(self, source):
+        """
+        JobEstimate for a MediaSource: the sniffed type and size, and for
+        videos the duration and resolution from the container headers
+        (nothing is decoded). Raises OSError if the media cannot be read.
+        """
+        size = source.size()
+        if source.kind == "image":
+            estimate = JobEstimate("image", size, units=size / 1e6)
+        else:
+            probed = self._probe_video(source)
+            if probed is None:
+                estimate = JobEstimate("other", size, units=size / 1e6)
+            else:
+                duration_s, width, height = probed
+                units = width * height / 1e6 * (duration_s if duration_s is not None else UNKNOWN_DURATION_S)
+                estimate = JobEstimate("video", size, duration_s, width, height, units)
+        cls = estimate.job_class
+        with self.lock:
+            estimate.cost_s = self.scale[cls] * (self.base[cls] + self.rate[cls] * estimate.units)
+        return estimate
+
+    def _probe_video(self, source):
+        # MP4/MOV: from the header parse the checks reuse (no copy of the upload)
+        meta = source.metadata()
+        if meta.width and meta.height:
+            return meta.duration_s, meta.width, meta.height
+        # Other containers: ask the demuxer (the source's memfd is reused by run())
+        cap = source.open_video()
+        try:
+            if not cap.isOpened():
+                return None
+            width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+            height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            if width <= 0 or height <= 0:
+                return None
+            frame_count = cap.get(cv2.CAP_PROP_FRAME_COUNT)
+            fps = cap.get(cv2.CAP_PROP_FPS)
+            duration_s = frame_count / fps if frame_count > 0 and fps > 0 else None
+            return duration_s, width, height
+        finally:
+            cap.release()
+
+    def observe(self, estimate, service_s):
+        """
+        Fold one measured service time into its class's correction.
+        """
+        cls = estimate.job_class
+        raw = self.base[cls] + self.rate[cls] * estimate.units
+        ratio = min(10.0, max(0.1, service_s / raw))  # one outlier moves the scale a bounded step
+        with self.lock:
+            self.scale[cls] += ADMISSION_COST_SMOOTHING * (ratio - self.scale[cls])
+
+class Ticket:
+    __slots__ = ("estimate", "deadline", "lane", "seq", "submitted", "started", "state", "outcome")
+
+    def __init__(self, estimate, deadline, lane, seq):
+        self.estimate = estimate
+        self.deadline = deadline
+        self.lane = lane
+        self.seq = seq
+        self.submitted = time.monotonic()
+        self.started = None
+        self.state = QUEUED
+        self.outcome = None  # shed reason: "queue_full", "deadline", "expired"
+
+class AdmissionController:
+    """
+    Admission and shortest-job-first dispatch of verifications over a fixed
+    number of slots (server mode; callers block in wait() until theirs runs).
+
+    Two lanes, each a heap on the estimated cost: "fast" (estimate up to
+    fast_lane_s, i.e. images and short clips) is always dispatched first and
+    is the only lane allowed into the last fast_reserved free slots, so a
+    burst of videos cannot hold every slot. A job is shed at submit when its
+    lane's queue is full or when the predicted start (queued and running work
+    ahead of it, simulated over the slots) leaves less than min_run_s before
+    its deadline; a job still queued min_run_s before its deadline expires.
+    Jobs predicted to start in time but finish late are admitted: the stage
+    scheduler degrades them to fit.
+    """
+    def __init__(self, slots=ADMISSION_SLOTS, fast_reserved=ADMISSION_FAST_RESERVED,
+                 fast_lane_s=ADMISSION_FAST_LANE_S, max_queue=ADMISSION_MAX_QUEUE,
+                 min_run_s=ADMISSION_MIN_RUN_S, costs=None):
+        self.slots = max(1, int(slots))
+        self.fast_reserved = min(max(0, int(fast_reserved)), self.slots - 1)
+        self.fast_lane_s = fast_lane_s
+        self.max_queue = max(1, int(max_queue))
+        self.min_run_s = min_run_s
+        self.costs = costs if costs is not None else CostModel()
+
+        self._cond = threading.Condition()
+        self._lanes = {"fast": [], "slow": []}  # heaps of (cost_s, seq, ticket); shed entries skipped lazily
+        self._queued = {"fast": 0, "slow": 0}
+        self._running = set()
+        self._seq = itertools.count()
+        self.queue_wait = {cls: Histogram(METRICS_STAGE_BUCKETS_S) for cls in JOB_CLASSES}
+        self.max_wait_s = dict.fromkeys(JOB_CLASSES, 0.0)
+        self.counts = {cls: dict.fromkeys(OUTCOMES, 0) for cls in JOB_CLASSES}
+
+    def submit(self, estimate, deadline):
+        """
+        Queue a job (time.monotonic() deadline); the ticket is already shed
+        when it cannot be admitted.
+        """
+        lane = "fast" if estimate.cost_s <= self.fast_lane_s else "slow"
+        ticket = Ticket(estimate, deadline, lane, next(self._seq))
+        with self._cond:
+            now = time.monotonic()
+            if self._queued[lane] >= self.max_queue:
+                self._shed(ticket, "queue_full")
+            elif now + self._predicted_wait(ticket, now) > deadline - self.min_run_s:
+                self._shed(ticket, "deadline")
+            else:
+                heapq.heappush(self._lanes[lane], (estimate.cost_s, ticket.seq, ticket))
+                self._queued[lane] += 1
+                self.counts[estimate.job_class]["admitted"] += 1
+                self._dispatch(now)
+        return ticket
+
+    def wait(self, ticket):
+        """
+        Block until the job holds a slot (True) or was shed/expired (False).
+        """
+        with self._cond:
+            while ticket.state == QUEUED:
+                left = ticket.deadline - self.min_run_s - time.monotonic()
+                if left <= 0:
+                    self._queued[ticket.lane] -= 1
+                    self._shed(ticket, "expired")
+                    break
+                self._cond.wait(left)
+            return ticket.state == RUNNING
+
+    def done(self, ticket, observe=True):
+        """
+        Release the job's slot. observe: feed its service time to the cost
+        model (not for answers that skipped the work, e.g. verdict cache hits).
+        """
+        now = time.monotonic()
+        with self._cond:
+            if ticket.state != RUNNING:
+                return
+            self._running.discard(ticket)
+            ticket.state = DONE
+            self.counts[ticket.estimate.job_class]["completed"] += 1
+            self._dispatch(now)
+        if observe:
+            self.costs.observe(ticket.estimate, now - ticket.started)
+
+    def _shed(self, ticket, reason):
+        ticket.state = SHED
+        ticket.outcome = reason
+        self.counts[ticket.estimate.job_class]["expired" if reason == "expired" else f"shed_{reason}"] += 1
+        print(f"[ADMISSION] Shed {ticket.estimate.job_class} job ({reason}, "
+              f"est {ticket.estimate.cost_s:.2f}s, queued {self._queued['fast']}+{self._queued['slow']})",
+              file=sys.stderr)
+
+    def _pop(self, lane, now):
+        heap = self._lanes[lane]
+        while heap:
+            ticket = heapq.heappop(heap)[2]
+            if ticket.state != QUEUED:
+                continue  # expired in wait(), already uncounted
+            self._queued[lane] -= 1
+            if ticket.deadline - now < self.min_run_s:
+                self._shed(ticket, "expired")
+                continue
+            return ticket
+        return None
+
+    def _dispatch(self, now):
+        while len(self._running) < self.slots:
+            ticket = self._pop("fast", now)
+            if ticket is None and len(self._running) < self.slots - self.fast_reserved:
+                ticket = self._pop("slow", now)
+            if ticket is None:
+                break
+            ticket.state = RUNNING
+            ticket.started = now
+            self._running.add(ticket)
+            waited = now - ticket.submitted
+            cls = ticket.estimate.job_class
+            self.queue_wait[cls].observe(waited)
+            self.max_wait_s[cls] = max(self.max_wait_s[cls], waited)
+        self._cond.notify_all()
+
+    def _predicted_wait(self, ticket, now):
+        """
+        Seconds until the ticket would start: the running jobs' remaining
+        estimates and the queued jobs that dispatch before it, placed on the
+        slots in dispatch order (later arrivals ignored). A slow-lane job
+        needs fast_reserved slots left free besides its own.
+        """
+        free = sorted(
+            [max(0.0, t.estimate.cost_s - (now - t.started)) for t in self._running] +
+            [0.0] * (self.slots - len(self._running))
+        )
+        key = (ticket.estimate.cost_s, ticket.seq)
+        ahead = [(0, e[0], e[1]) for e in self._lanes["fast"] if e[2].state == QUEUED and
+                 (ticket.lane == "slow" or (e[0], e[1]) < key)]
+        if ticket.lane == "slow":
+            ahead += [(1, e[0], e[1]) for e in self._lanes["slow"] if e[2].state == QUEUED and (e[0], e[1]) < key]
+        for lane, cost_s, _ in sorted(ahead):
+            i = self.fast_reserved if lane else 0
+            free[i] += cost_s
+            free.sort()
+        return free[self.fast_reserved if ticket.lane == "slow" else 0]
+
+    # --- Reporting ---
+    def stats(self):
+        with self._cond:
+            return {
+                "slots": self.slots,
+                "fast_reserved": self.fast_reserved,
+                "running": {lane: sum(1 for t in self._running if t.lane == lane) for lane in ("fast", "slow")},
+                "queued": dict(self._queued),
+                "classes": {
+                    cls: dict(
+                        self.counts[cls],
+                        queue_wait_count=self.queue_wait[cls].count,
+                        queue_wait_mean_s=round(self.queue_wait[cls].sum / self.queue_wait[cls].count, 4)
+                        if self.queue_wait[cls].count else 0.0,
+                        queue_wait_max_s=round(self.max_wait_s[cls], 4),
+                        cost_scale=round(self.costs.scale[cls], 3),
+                    )
+                    for cls in JOB_CLASSES
+                },
+            }
+
+    def render(self):
+        """
+        Prometheus text lines, appended to GET /metrics.
+        """
+        lines = []
+        with self._cond:
+            lines.append("# TYPE deepfakeguard_admission_jobs_total counter")
+            for cls in JOB_CLASSES:
+                for outcome in OUTCOMES:
+                    lines.append(f'deepfakeguard_admission_jobs_total{{class="{cls}",outcome="{outcome}"}} '
+                                 f'{self.counts[cls][outcome]}')
+            lines.append("# TYPE deepfakeguard_admission_queue_wait_seconds histogram")
+            for cls in JOB_CLASSES:
+                lines.extend(self.queue_wait[cls].render("deepfakeguard_admission_queue_wait_seconds",
+                                                         f'class="{cls}"'))
+            lines.append("# TYPE deepfakeguard_admission_queued gauge")
+            for lane in ("fast", "slow"):
+                lines.append(f'deepfakeguard_admission_queued{{lane="{lane}"}} {self._queued[lane]}')
+            lines.append("# TYPE deepfakeguard_admission_running gauge")
+            lines.append(f"deepfakeguard_admission_running {len(self._running)}")
+        return lines
@@ -0,0 +1,132 @@
+import sys
+import threading
+import queue
+import time
+import numpy as np
+
+from config import BATCH_MAX_SIZE, BATCH_MAX_WAIT_MS
+
+class BatchHistogram:
+    """
+    Fixed-bucket counter (power-of-two upper bounds) for batch sizes and queue depths.
+    """
+    def __init__(self, max_value):
+        self.bounds = [1]
+        while self.bounds[-1] < max_value:
+            self.bounds.append(self.bounds[-1] * 2)
+        self.counts = [0] * (len(self.bounds) + 1)  # last bucket = overflow
+        self.total = 0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.bounds):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.total += value
+        self.count += 1
+
+    def snapshot(self):
+        buckets = {f"le_{b}": c for b, c in zip(self.bounds, self.counts)}
+        buckets["overflow"] = self.counts[-1]
+        return {
+            "buckets": buckets,
+            "count": self.count,
+            "mean": round(self.total / self.count, 3) if self.count else 0.0
+        }
+
+class _PendingRequest:
+    def __init__(self, size):
+        self.scores = [1.0] * size  # FAIL-CLOSED until filled
+        self.remaining = size
+        self.done = threading.Event()
+
+class MicroBatcher:
+    """
+    Dynamic micro-batching in front of EfficientNetONNXDetector.
+    Face crops from concurrent verifications are queued individually and a
+    single worker thread drains them into one session.run per batch, flushing
+    at max_batch crops or after max_wait_ms, whichever comes first.
+    Each caller blocks until its own scores are back, in submission order.
+    """
+    def __init__(self, model, max_batch=BATCH_MAX_SIZE, max_wait_ms=BATCH_MAX_WAIT_MS):
+        self.model = model
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max(0.0, max_wait_ms / 1000.0)
+
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self.batch_sizes = BatchHistogram(self.max_batch)
+        self.queue_depths = BatchHistogram(self.max_batch * 4)
+        self.batches_run = 0
+        self.crops_scored = 0
+
+        self._worker = threading.Thread(target=self._run_worker, name="micro-batcher", daemon=True)
+        self._worker.start()
+
+    def predict_batch(self, face_crops_bgr):
+        """
+        Same contract as EfficientNetONNXDetector.predict_batch.
+        """
+        if not face_crops_bgr:
+            return []
+
+        pending = _PendingRequest(len(face_crops_bgr))
+        for index, crop in enumerate(face_crops_bgr):
+            self._queue.put((crop, pending, index))
+        pending.done.wait()
+        return pending.scores
+
+    def predict(self, face_crop_bgr):
+        return self.predict_batch([face_crop_bgr])[0]
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.monotonic()
+            try:
+                if timeout <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run_worker(self):
+        while True:
+            batch = self._collect()
+            depth = self._queue.qsize()
+
+            try:
+                scores = self.model.predict_batch([crop for crop, _, _ in batch])
+            except Exception as e:
+                print(f"[AI-MODEL] Micro-batch error: {e}", file=sys.stderr)
+                scores = [1.0] * len(batch)  # FAIL-CLOSED
+
+            with self._stats_lock:
+                self.batch_sizes.observe(len(batch))
+                self.queue_depths.observe(depth)
+                self.batches_run += 1
+                self.crops_scored += len(batch)
+
+            for (_, pending, index), score in zip(batch, scores):
+                pending.scores[index] = float(np.clip(score, 0.0, 1.0))
+                pending.remaining -= 1  # only touched by this worker thread
+                if pending.remaining == 0:
+                    pending.done.set()
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "max_batch": self.max_batch,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "queue_depth": self._queue.qsize(),
+                "batches_run": self.batches_run,
+                "crops_scored": self.crops_scored,
+                "batch_size_histogram": self.batch_sizes.snapshot(),
+                "queue_depth_histogram": self.queue_depths.snapshot()
+            }
@@ -0,0 +1,321 @@
+import os
+import re
+import sys
+import json
+import time
+import sqlite3
+import threading
+import unicodedata
+
+from config import (
+    BULLETIN_FEED_DIR, BULLETIN_INDEX_PATH, BULLETIN_BUCKET_S, BULLETIN_RECENT_WINDOW_S,
+    BULLETIN_RETENTION_S, BULLETIN_MAX_REPORTS, BULLETIN_MIN_SHARED_TERMS, BULLETIN_REFRESH_INTERVAL_S
+)
+from core.metadata import parse_time
+
+TOKEN_RE = re.compile(r"\w+")
+STOPWORDS = frozenset(
+    "the and for are was were with from this that these those have has had been into onto over under "
+    "about after before just now today breaking news live video photo footage report reports reported "
+    "says said its their there here what when where who will would could should than then very more "
+    "most some any all our your his her they them you not but out off via new hit hits massive confirmed "
+    "near rising happening right".split()
+)
+MAX_LOCATION_WORDS = 3  # location phrases are matched as caption n-grams up to this length
+KIND_KEYWORD = 0
+KIND_LOCATION = 1
+
+def normalize_tokens(text):
+    """
+    Lowercase, accent-free word tokens.
+    """
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).lower()
+    return TOKEN_RE.findall(text)
+
+def keyword(token):
+    """
+    Index form of a keyword token, or None for stopwords/short tokens.
+    Trailing plural s is dropped ("floods" -> "flood").
+    """
+    if len(token) < 3 or token in STOPWORDS:
+        return None
+    if len(token) > 4 and token.endswith("s") and not token.endswith("ss"):
+        token = token[:-1]
+    return token
+
+def location_term(name):
+    words = normalize_tokens(name)
+    return " ".join(words) if words and len(words) <= MAX_LOCATION_WORDS else None
+
+def caption_terms(caption):
+    """
+    Query terms of a caption: its keywords and every 1..3-word n-gram (for
+    location names, which are indexed unstemmed).
+    """
+    tokens = normalize_tokens(caption)
+    terms = {k for k in map(keyword, tokens) if k}
+    for n in range(1, MAX_LOCATION_WORDS + 1):
+        for i in range(len(tokens) - n + 1):
+            terms.add(" ".join(tokens[i:i + n]))
+    return terms
+
+def report_terms(report):
+    """
+    {term: kind} for a feed report. Words of its locations are indexed as
+    locations only, so one place name cannot count as keyword + location.
+    """
+    terms = {}
+    locations = report.get("locations") or []
+    if isinstance(locations, str):
+        locations = [locations]
+    location_words = set()
+    for name in locations:
+        term = location_term(name)
+        if term:
+            terms[term] = KIND_LOCATION
+            location_words.update(term.split())
+    text = " ".join(str(report.get(k) or "") for k in ("title", "text", "summary"))
+    keywords = report.get("keywords") or []
+    if isinstance(keywords, str):
+        keywords = [keywords]
+    for token in normalize_tokens(text + " " + " ".join(keywords)):
+        if token in location_words:
+            continue
+        term = keyword(token)
+        if term and term not in terms:
+            terms[term] = KIND_KEYWORD
+    return terms
+
+class BulletinIndex:
+    """
+    Inverted index of trusted reports (sqlite, shared by threads and by the
+    context_verify processes): postings (term, hour bucket, report), so a
+    lookup reads only the postings of the caption's terms in the buckets of
+    its time window. refresh() ingests new feed lines incrementally (per-file
+    byte offsets, a partly written last line waits for the next refresh) and
+    evicts reports past retention, then the oldest beyond BULLETIN_MAX_REPORTS.
+    """
+    def __init__(self, path=BULLETIN_INDEX_PATH, feed_dir=BULLETIN_FEED_DIR, bucket_s=BULLETIN_BUCKET_S,
+                 retention_s=BULLETIN_RETENTION_S, max_reports=BULLETIN_MAX_REPORTS):
+        self.feed_dir = feed_dir
+        self.bucket_s = bucket_s
+        self.retention_s = retention_s
+        self.max_reports = max_reports
+        self.lock = threading.Lock()
+        self.refreshed_at = 0.0
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.db = sqlite3.connect(path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        with self.lock:
+            self._setup()
+
+    def _setup(self):
+        db = self.db
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS reports ("
+            "id INTEGER PRIMARY KEY, key TEXT UNIQUE NOT NULL, published REAL NOT NULL, "
+            "bucket INTEGER NOT NULL, source TEXT, title TEXT, url TEXT)"
+        )
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS postings ("
+            "term TEXT NOT NULL, bucket INTEGER NOT NULL, report INTEGER NOT NULL, kind INTEGER NOT NULL, "
+            "PRIMARY KEY (term, bucket, report)) WITHOUT ROWID"
+        )
+        db.execute("CREATE INDEX IF NOT EXISTS postings_report ON postings (report)")
+        db.execute("CREATE INDEX IF NOT EXISTS reports_bucket ON reports (bucket)")
+        db.execute("CREATE TABLE IF NOT EXISTS feed_files (path TEXT PRIMARY KEY, offset INTEGER NOT NULL, inode INTEGER NOT NULL)")
+
+    # --- Ingestion ---
+
+    def _add(self, report, now):
+        published = report.get("published")
+        if isinstance(published, (int, float)):
+            published = float(published)
+        else:
+            published = parse_time(str(published)) if published else None
+        if published is None:
+            published = now
+        if published < now - self.retention_s:
+            return False
+        key = str(report.get("id") or report.get("url") or f"{report.get('source')}|{report.get('title')}|{published}")
+        bucket = int(published // self.bucket_s)
+        cursor = self.db.execute(
+            "INSERT OR IGNORE INTO reports (key, published, bucket, source, title, url) VALUES (?, ?, ?, ?, ?, ?)",
+            (key, published, bucket, report.get("source"), report.get("title"), report.get("url"))
+        )
+        if not cursor.rowcount:
+            return False  # already indexed
+        report_id = cursor.lastrowid
+        self.db.executemany(
+            "INSERT OR IGNORE INTO postings (term, bucket, report, kind) VALUES (?, ?, ?, ?)",
+            [(term, bucket, report_id, kind) for term, kind in report_terms(report).items()]
+        )
+        return True
+
+    def ingest_lines(self, lines, now=None):
+        """
+        Index JSON report lines (one transaction). Returns the number added.
+        """
+        now = time.time() if now is None else now
+        added = 0
+        with self.lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                for line in lines:
+                    added += self._ingest_line(line, now)
+                self.db.execute("COMMIT")
+            except sqlite3.Error:
+                self.db.execute("ROLLBACK")
+                raise
+        return added
+
+    def _ingest_line(self, line, now):
+        line = line.strip()
+        if not line:
+            return 0
+        try:
+            report = json.loads(line)
+        except ValueError:
+            return 0
+        return int(isinstance(report, dict) and self._add(report, now))
+
+    def _feed_files(self):
+        if not os.path.isdir(self.feed_dir):
+            return []
+        return sorted(
+            os.path.join(self.feed_dir, name) for name in os.listdir(self.feed_dir)
+            if name.endswith((".jsonl", ".json"))
+        )
+
+    def refresh(self, now=None, force=False):
+        """
+        Ingest lines appended to the feed files since the last refresh (any
+        process), then evict. Throttled to BULLETIN_REFRESH_INTERVAL_S unless
+        force. Returns the number of reports added.
+        """
+        now = time.time() if now is None else now
+        if not force and now - self.refreshed_at < BULLETIN_REFRESH_INTERVAL_S:
+            return 0
+        self.refreshed_at = now
+        added = 0
+        with self.lock:
+            offsets = {p: (o, i) for p, o, i in self.db.execute("SELECT path, offset, inode FROM feed_files")}
+            pending = []
+            for path in self._feed_files():
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                offset, inode = offsets.get(path, (0, stat.st_ino))
+                if inode != stat.st_ino or stat.st_size < offset:
+                    offset = 0  # replaced or truncated: read from the start (ids dedupe)
+                if stat.st_size > offset or path not in offsets:
+                    pending.append((path, stat.st_ino))
+            if not pending and not self._needs_eviction(now):
+                return 0
+
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                # Re-read the offsets inside the transaction: another process may have ingested meanwhile
+                offsets = {p: (o, i) for p, o, i in self.db.execute("SELECT path, offset, inode FROM feed_files")}
+                for path, inode in pending:
+                    offset, known_inode = offsets.get(path, (0, inode))
+                    if known_inode != inode:
+                        offset = 0
+                    try:
+                        with open(path, "rb") as f:
+                            if os.fstat(f.fileno()).st_size < offset:
+                                offset = 0
+                            f.seek(offset)
+                            data = f.read()
+                    except OSError:
+                        continue
+                    end = data.rfind(b"\n") + 1  # complete lines only
+                    for line in data[:end].decode("utf-8", "replace").splitlines():
+                        added += self._ingest_line(line, now)
+                    self.db.execute(
+                        "INSERT OR REPLACE INTO feed_files (path, offset, inode) VALUES (?, ?, ?)",
+                        (path, offset + end, inode)
+                    )
+                self._evict(now)
+                self.db.execute("COMMIT")
+            except sqlite3.Error:
+                self.db.execute("ROLLBACK")
+                raise
+        return added
+
+    def _needs_eviction(self, now):
+        row = self.db.execute("SELECT MIN(bucket), COUNT(*) FROM reports").fetchone()
+        return row[0] is not None and (row[0] < self._oldest_bucket(now) or row[1] > self.max_reports)
+
+    def _oldest_bucket(self, now):
+        return int((now - self.retention_s) // self.bucket_s)
+
+    def _evict(self, now):
+        stale = "SELECT id FROM reports WHERE bucket < ?"
+        self.db.execute(f"DELETE FROM postings WHERE report IN ({stale})", (self._oldest_bucket(now),))
+        self.db.execute("DELETE FROM reports WHERE bucket < ?", (self._oldest_bucket(now),))
+        excess = self.db.execute("SELECT COUNT(*) FROM reports").fetchone()[0] - self.max_reports
+        if excess > 0:
+            oldest = "SELECT id FROM reports ORDER BY published LIMIT ?"
+            self.db.execute(f"DELETE FROM postings WHERE report IN ({oldest})", (excess,))
+            self.db.execute(f"DELETE FROM reports WHERE id IN ({oldest})", (excess,))
+
+    # --- Lookup ---
+
+    def find(self, caption, recent=False, now=None, limit=3, min_shared=BULLETIN_MIN_SHARED_TERMS):
+        """
+        Trusted reports matching the caption, best first: [{"source", "title",
+        "url", "published", "keywords", "locations"}]. A report matches with
+        min_shared keywords in common, or one keyword and one location.
+        recent: only reports from the last BULLETIN_RECENT_WINDOW_S (breaking
+        claims); otherwise everything retained.
+        """
+        now = time.time() if now is None else now
+        since = now - (BULLETIN_RECENT_WINDOW_S if recent else self.retention_s)
+        terms = list(caption_terms(caption))
+        if not terms:
+            return []
+        placeholders = ",".join("?" * len(terms))
+        with self.lock:
+            # Count shared terms per report from the postings alone; only the
+            # reports that pass are joined for their details
+            rows = self.db.execute(
+                "SELECT m.keywords, m.locations, r.published, r.source, r.title, r.url FROM ("
+                "  SELECT report, SUM(kind = 0) AS keywords, SUM(kind = 1) AS locations FROM postings"
+                f"  WHERE term IN ({placeholders}) AND bucket >= ? GROUP BY report"
+                "  HAVING keywords >= ? OR (keywords >= 1 AND locations >= 1)"
+                ") m JOIN reports r ON r.id = m.report",
+                terms + [int(since // self.bucket_s), min_shared]
+            ).fetchall()
+        matches = [row for row in rows if row[2] >= since]
+        matches.sort(key=lambda row: (row[0] + row[1], row[2]), reverse=True)
+        return [
+            {"source": source, "title": title, "url": url, "published": published,
+             "keywords": keywords, "locations": locations}
+            for keywords, locations, published, source, title, url in matches[:limit]
+        ]
+
+    def stats(self):
+        with self.lock:
+            reports, oldest, newest = self.db.execute(
+                "SELECT COUNT(*), MIN(published), MAX(published) FROM reports"
+            ).fetchone()
+            postings = self.db.execute("SELECT COUNT(*) FROM postings").fetchone()[0]
+        return {"reports": reports, "postings": postings, "oldest": oldest, "newest": newest}
+
+def open_bulletin_index():
+    """
+    BulletinIndex refreshed from the feed, or None if the index cannot be
+    opened (the source check then reports no matching bulletins).
+    """
+    try:
+        index = BulletinIndex()
+        index.refresh()
+        return index
+    except (sqlite3.Error, OSError) as e:
+        # stdout carries the verifier's JSON
+        print(f"[BULLETINS] WARNING: bulletin index unavailable ({e})", file=sys.stderr)
+        return None
@@ -0,0 +1,298 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from itertools import combinations
+
+import cv2
+import numpy as np
+
+import config
+from config import (
+    VERDICT_CACHE_PATH, NEAR_DUP_MAX_DISTANCE, VERDICT_CACHE_MAX_REPORTS,
+    VERDICT_CACHE_MAX_FRAMES, VERDICT_CACHE_TTL_S
+)
+
+DHASH_SAMPLE_SIDE = 128  # frames are decimated to about this short side before hashing
+DHASH_MARGIN = 2         # grey levels; flat areas hash to 0 instead of flipping on codec noise
+DHASH_MIN_BITS = 6       # fewer set bits = blank/flat frame, never used for near-duplicates
+HASH_CHUNKS = 4          # multi-index hashing: 4 x 16-bit substrings of the 64-bit hash
+CHUNK_BITS = 16
+
+# Settings that shape a report. Changing any of them (or the model weights)
+# invalidates every cached verdict.
+FINGERPRINT_SETTINGS = (
+    "WEIGHT_MODEL", "WEIGHT_ARTIFACT", "WEIGHT_TEMPORAL", "WEIGHT_METADATA",
+    "THRESHOLD_REJECT", "THRESHOLD_UNSAFE", "MAX_FRAMES", "FRAME_SELECTION",
+    "ADAPTIVE_FRAME_BUDGET", "MAX_FACES_PER_FRAME", "FACE_DETECTOR_BACKEND",
+    "FACE_CROP_SIZE", "NEAR_DUP_REUSE"
+)
+
+def dhash(image):
+    """
+    64-bit difference hash (9x8 grey thumbnail, left < right per pixel).
+    Stable under re-encoding and resizing. The frame is decimated first:
+    an area resize straight from 4K to 9x8 costs ~30 ms, this ~0.5 ms.
+    """
+    h, w = image.shape[:2]
+    step = max(1, min(h, w) // DHASH_SAMPLE_SIDE)
+    small = cv2.resize(image[::step, ::step], (9, 8), interpolation=cv2.INTER_AREA)
+    if small.ndim == 3:
+        small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    small = small.astype(np.int16)
+    return int.from_bytes(np.packbits(small[:, 1:] > small[:, :-1] + DHASH_MARGIN).tobytes(), "big")
+
+def informative(frame_hash):
+    return bin(frame_hash).count("1") >= DHASH_MIN_BITS
+
+def file_digest(file_path):
+    sha = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+def config_fingerprint(model_path):
+    """
+    Changes whenever the model weights or a report-shaping setting does.
+    The weights are identified by path, size and mtime rather than by their
+    content, so a CLI process does not read the whole model just to open the
+    cache; a replaced model file always gets a new mtime.
+    """
+    sha = hashlib.sha256()
+    try:
+        st = os.stat(model_path)
+        sha.update(f"{os.path.realpath(model_path)}:{st.st_size}:{st.st_mtime_ns}".encode())
+    except OSError:
+        sha.update(model_path.encode())
+    settings = {name: getattr(config, name) for name in FINGERPRINT_SETTINGS}
+    sha.update(json.dumps(settings, sort_keys=True).encode())
+    return sha.hexdigest()
+
+def _chunks(frame_hash):
+    return [(frame_hash >> (CHUNK_BITS * i)) & 0xFFFF for i in range(HASH_CHUNKS)]
+
+def _within(chunk, radius):
+    """
+    Every 16-bit value within Hamming distance radius of chunk.
+    """
+    values = [chunk]
+    for r in range(1, radius + 1):
+        for bits in combinations(range(CHUNK_BITS), r):
+            flipped = chunk
+            for bit in bits:
+                flipped ^= 1 << bit
+            values.append(flipped)
+    return values
+
+def _signed(frame_hash):
+    # sqlite INTEGER is a signed 64-bit value
+    return frame_hash - (1 << 64) if frame_hash >= (1 << 63) else frame_hash
+
+class VerdictCache:
+    """
+    Persistent two-layer verdict cache (sqlite, safe to share between threads
+    and between CLI processes).
+      reports: content digest -> report                         (exact layer)
+      frames:  frame dHash -> per-face scores for that frame     (near-duplicate layer)
+    Frame hashes are found by multi-index hashing: each 16-bit chunk of the hash
+    is an indexed column, and two hashes within distance r share at least one
+    chunk within r // 4 bits, so a lookup probes a few chunk values per column
+    and checks the full distance on the rows returned.
+    Every row carries the fingerprint (model and fusion settings) it was
+    computed under and lookups only see rows with their own, so processes on
+    different models can share one store without wiping each other; rows of a
+    retired fingerprint age out through the TTL and LRU bounds.
+    Entries expire after ttl_s; beyond the size bounds the least recently used
+    go first.
+    """
+    def __init__(self, fingerprint, path=VERDICT_CACHE_PATH, max_reports=VERDICT_CACHE_MAX_REPORTS,
+                 max_frames=VERDICT_CACHE_MAX_FRAMES, ttl_s=VERDICT_CACHE_TTL_S,
+                 max_distance=NEAR_DUP_MAX_DISTANCE):
+        self.max_reports = max_reports
+        self.max_frames = max_frames
+        self.ttl_s = ttl_s
+        self.max_distance = max_distance
+        self.fingerprint = fingerprint
+        self.lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.db = sqlite3.connect(path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        with self.lock:
+            self._setup()
+
+    def _setup(self):
+        db = self.db
+        db.execute("PRAGMA journal_mode=WAL")
+        # Stores from before per-row fingerprints kept a single one in a meta
+        # table; their rows cannot be attributed, so they are dropped once.
+        if db.execute("SELECT 1 FROM sqlite_master WHERE name = 'meta'").fetchone():
+            db.execute("BEGIN IMMEDIATE")
+            for table in ("meta", "reports", "frames"):
+                db.execute(f"DROP TABLE IF EXISTS {table}")
+            db.execute("COMMIT")
+            print("[CACHE] Old verdict cache layout, cached verdicts dropped", file=sys.stderr)
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS reports ("
+            "fingerprint TEXT NOT NULL, digest TEXT NOT NULL, report TEXT NOT NULL, "
+            "created REAL NOT NULL, last_used REAL NOT NULL, PRIMARY KEY (fingerprint, digest))"
+        )
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS frames ("
+            "id INTEGER PRIMARY KEY, fingerprint TEXT NOT NULL, media TEXT NOT NULL, frame_hash INTEGER NOT NULL, "
+            "h0 INTEGER NOT NULL, h1 INTEGER NOT NULL, h2 INTEGER NOT NULL, h3 INTEGER NOT NULL, "
+            "faces TEXT NOT NULL, created REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        for column in ("h0", "h1", "h2", "h3", "media", "last_used"):
+            db.execute(f"CREATE INDEX IF NOT EXISTS frames_{column} ON frames ({column})")
+        db.execute("CREATE INDEX IF NOT EXISTS reports_last_used ON reports (last_used)")
+
+    def _evict(self, table, max_rows, now):
+        self.db.execute(f"DELETE FROM {table} WHERE created < ?", (now - self.ttl_s,))
+        excess = self.db.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] - max_rows
+        if excess > 0:
+            self.db.execute(
+                f"DELETE FROM {table} WHERE rowid IN (SELECT rowid FROM {table} ORDER BY last_used LIMIT ?)",
+                (excess,)
+            )
+
+    def get_report(self, digest):
+        now = time.time()
+        try:
+            with self.lock:
+                row = self.db.execute(
+                    "SELECT report FROM reports WHERE fingerprint = ? AND digest = ? AND created >= ?",
+                    (self.fingerprint, digest, now - self.ttl_s)
+                ).fetchone()
+                if row is None:
+                    return None
+                self.db.execute(
+                    "UPDATE reports SET last_used = ? WHERE fingerprint = ? AND digest = ?",
+                    (now, self.fingerprint, digest)
+                )
+            return json.loads(row[0])
+        except sqlite3.Error as e:
+            print(f"[CACHE] WARNING: report lookup failed ({e})", file=sys.stderr)
+            return None
+
+    def put_report(self, digest, report):
+        now = time.time()
+        try:
+            with self.lock:
+                self.db.execute(
+                    "INSERT OR REPLACE INTO reports (fingerprint, digest, report, created, last_used) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (self.fingerprint, digest, json.dumps(report), now, now)
+                )
+                self._evict("reports", self.max_reports, now)
+        except sqlite3.Error as e:
+            print(f"[CACHE] WARNING: report not stored ({e})", file=sys.stderr)
+
+    def find_frames(self, frame_hash, media=None):
+        """
+        Stored frames within max_distance of frame_hash, closest first, as
+        [(media, faces)]; optionally only those stored for the given media.
+        """
+        now = time.time()
+        radius = self.max_distance // HASH_CHUNKS
+        probes = [_within(chunk, radius) for chunk in _chunks(frame_hash)]
+        where = " OR ".join(
+            f"h{i} IN ({','.join('?' * len(values))})" for i, values in enumerate(probes)
+        )
+        params = [v for values in probes for v in values]
+        try:
+            with self.lock:
+                rows = self.db.execute(
+                    f"SELECT id, media, frame_hash, faces FROM frames "
+                    f"WHERE fingerprint = ? AND created >= ? AND ({where})",
+                    [self.fingerprint, now - self.ttl_s] + params
+                ).fetchall()
+                hits = []
+                for row_id, row_media, row_hash, faces in rows:
+                    distance = bin((row_hash & 0xFFFFFFFFFFFFFFFF) ^ frame_hash).count("1")
+                    if distance <= self.max_distance and (media is None or row_media in media):
+                        hits.append((distance, row_id, row_media, faces))
+                hits.sort()
+                if hits:
+                    self.db.execute(
+                        f"UPDATE frames SET last_used = ? WHERE id IN ({','.join('?' * len(hits))})",
+                        [now] + [row_id for _, row_id, _, _ in hits]
+                    )
+            return [(row_media, json.loads(faces)) for _, _, row_media, faces in hits]
+        except sqlite3.Error as e:
+            print(f"[CACHE] WARNING: near-duplicate lookup failed ({e})", file=sys.stderr)
+            return []
+
+    def put_frames(self, media, frames):
+        """
+        frames: {frame_hash: [[face_id, model_score, artifact_score, artifact_signals], ...]}
+        Replaces whatever was stored for media.
+        """
+        now = time.time()
+        rows = [
+            (self.fingerprint, media, _signed(frame_hash), *_chunks(frame_hash), json.dumps(faces), now, now)
+            for frame_hash, faces in frames.items()
+            if informative(frame_hash)
+        ]
+        try:
+            with self.lock:
+                self.db.execute("BEGIN IMMEDIATE")
+                try:
+                    self.db.execute(
+                        "DELETE FROM frames WHERE fingerprint = ? AND media = ?", (self.fingerprint, media)
+                    )
+                    self.db.executemany(
+                        "INSERT INTO frames (fingerprint, media, frame_hash, h0, h1, h2, h3, faces, created, last_used) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        rows
+                    )
+                    self._evict("frames", self.max_frames, now)
+                    self.db.execute("COMMIT")
+                except sqlite3.Error:
+                    self.db.execute("ROLLBACK")
+                    raise
+        except sqlite3.Error as e:
+            print(f"[CACHE] WARNING: frames not stored ({e})", file=sys.stderr)
+
+class NearDuplicateMatcher:
+    """
+    Per-request near-duplicate lookup. The first informative sampled frame
+    decides which stored media this upload may be a copy of; later frames only
+    reuse scores stored for those media, so one chance match in an unrelated
+    clip is not enough. Blank and flat frames are never matched.
+    """
+    def __init__(self, cache):
+        self.cache = cache
+        self.media = None  # candidate source media (content digests)
+        self.frames_reused = 0
+
+    def lookup(self, frame_hash):
+        """
+        Stored [[face_id, model_score, artifact_score, artifact_signals]] for a
+        matching frame, or None.
+        """
+        if (self.media is not None and not self.media) or not informative(frame_hash):
+            return None
+        hits = self.cache.find_frames(frame_hash, self.media)
+        if self.media is None:
+            self.media = {media for media, _ in hits}
+        elif hits:
+            self.media = {media for media, _ in hits}
+        if not hits:
+            return None
+        self.frames_reused += 1
+        return hits[0][1]
+
+def open_verdict_cache(model_path, path=VERDICT_CACHE_PATH):
+    """
+    VerdictCache for the given model, or None if the store cannot be opened
+    (verification then runs uncached).
+    """
+    try:
+        return VerdictCache(config_fingerprint(model_path), path)
+    except (sqlite3.Error, OSError) as e:
+        print(f"[CACHE] WARNING: verdict cache disabled ({e})", file=sys.stderr)
+        return None
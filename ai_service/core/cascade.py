@@ -0,0 +1,228 @@
+import math
+import time
+
+from config import (
+    WEIGHT_MODEL, WEIGHT_ARTIFACT, WEIGHT_TEMPORAL, WEIGHT_METADATA,
+    THRESHOLD_REJECT, THRESHOLD_UNSAFE, CASCADE_ENABLED, CASCADE_CHUNK
+)
+from core.pipeline import KeptSamples
+
+EPSILON = 1e-9  # float noise between the bounds and the fused score itself
+
+def verdict_band(final_score):
+    """
+    0 = APPROVED, 1 = REJECTED (unsafe), 2 = REJECTED (deepfake)
+    """
+    if final_score >= THRESHOLD_REJECT:
+        return 2
+    if final_score >= THRESHOLD_UNSAFE:
+        return 1
+    return 0
+
+class FaceTally:
+    """
+    Running sums over the kept samples of one face identity.
+    """
+    __slots__ = ("count", "pending", "model_sum", "model_squares", "artifact_sum")
+
+    def __init__(self):
+        self.count = 0
+        self.pending = 0  # samples not scored by EfficientNet yet
+        self.model_sum = 0.0
+        self.model_squares = 0.0
+        self.artifact_sum = 0.0
+
+    def add(self, model_score, artifact_score):
+        self.count += 1
+        self.artifact_sum += artifact_score
+        if model_score is None:
+            self.pending += 1
+        else:
+            self.model_sum += model_score
+            self.model_squares += model_score * model_score
+
+def face_bounds(tally, unknown, meta_score):
+    """
+    (low, high) fused score of one face if `unknown` more samples, with any
+    model and artifact score in [0, 1], join its kept ones (pending samples
+    can still get any model score). Same fusion as DeepfakeGuardProcess._score_face:
+    WEIGHT_MODEL * mean(model) + WEIGHT_ARTIFACT * mean(artifact)
+    + WEIGHT_TEMPORAL * std(model) + WEIGHT_METADATA * metadata.
+    """
+    n = tally.count + unknown
+    free = tally.pending + unknown
+    scored = tally.count - tally.pending
+    s1, s2 = tally.model_sum, tally.model_squares
+
+    model_lo, model_hi = s1 / n, (s1 + free) / n
+    artifact_lo, artifact_hi = tally.artifact_sum / n, (tally.artifact_sum + unknown) / n
+
+    std_lo = std_hi = 0.0
+    if n >= 2:
+        def variance(total, squares):
+            return max(0.0, squares / n - (total / n) ** 2)
+
+        # Variance is convex in each free score, so its maximum puts every free
+        # score at 0 or 1; with j of them at 1 it is concave in j, peaking at n/2 - s1.
+        peak = n / 2 - s1
+        candidates = {0, free, min(free, max(0, math.floor(peak))), min(free, max(0, math.ceil(peak)))}
+        std_hi = math.sqrt(max(variance(s1 + j, s2 + j) for j in candidates))
+        # Its minimum gives every free score the mean of the scored ones
+        if scored:
+            mean = s1 / scored
+            std_lo = math.sqrt(variance(s1 + free * mean, s2 + free * mean * mean))
+
+    meta = WEIGHT_METADATA * meta_score
+    low = WEIGHT_MODEL * model_lo + WEIGHT_ARTIFACT * artifact_lo + WEIGHT_TEMPORAL * std_lo + meta
+    high = WEIGHT_MODEL * model_hi + WEIGHT_ARTIFACT * artifact_hi + WEIGHT_TEMPORAL * std_hi + meta
+    return low, high
+
+def certain_bounds(ranked, scores, budget, max_unknown, single_face, meta_score):
+    """
+    (low, high) of the final verdict score (riskiest face) over every way the
+    run can still end, if they fall in a single verdict band; None as soon as
+    they cannot. ranked: KeptSamples.ranked(); scores: model scores
+    known so far by (frame order, face_id). Up to max_unknown samples from
+    frames not yet analysed can still enter the kept set, each pushing out the
+    lowest-ranked known sample once it is full (frames with an infinite score,
+    the adaptive opening frame, are never pushed out).
+    """
+    protected = sum(1 for frame_score, _, _ in ranked if frame_score == math.inf)
+    low, high = math.inf, -math.inf
+
+    for m in range(min(max_unknown, budget - protected) + 1):
+        tallies = {}
+        for _, order, sample in ranked[:budget - m]:
+            model_score = sample.model_score
+            if model_score is None:
+                model_score = scores.get((order, sample.face_id))
+            tallies.setdefault(sample.face_id, FaceTally()).add(model_score, sample.artifact_score)
+
+        if not tallies and m == 0:
+            # No face at all: fail-closed
+            face_low = face_high = 1.0
+
+        elif single_face:
+            # Every new sample belongs to the one tracked face
+            tally = tallies.get(0) or FaceTally()
+            face_low, face_high = face_bounds(tally, m, meta_score)
+        else:
+            # New samples can join any face identity, or be a new one
+            face_low, face_high = -math.inf, -math.inf
+            for tally in tallies.values():
+                bounds = [face_bounds(tally, u, meta_score) for u in range(m + 1)]
+                face_low = max(face_low, min(b[0] for b in bounds))
+                face_high = max(face_high, max(b[1] for b in bounds))
+            for u in range(1, m + 1):
+                face_high = max(face_high, face_bounds(FaceTally(), u, meta_score)[1])
+
+        low, high = min(low, face_low), max(high, face_high)
+        if verdict_band(low - EPSILON) != verdict_band(high + EPSILON):
+            return None
+    return low, high
+
+class CascadeScorer:
+    """
+    Runs the frame pipeline and EfficientNet incrementally. Kept faces are
+    scored a chunk at a time, the last frames to be dropped from the frame
+    budget first. After each chunk, bounds on the final score are computed
+    over everything still unknown. Scoring stops once both bounds fall in the
+    same verdict band, so a decided verdict is exactly the one a full run gives.
+    """
+    def __init__(self, pipeline, scorer, chunk=CASCADE_CHUNK, early_exit=CASCADE_ENABLED):
+        self.pipeline = pipeline
+        self.scorer = scorer
+        self.chunk = chunk
+        self.early_exit = early_exit
+
+    def _pending(self, kept, scores):
+        return [
+            (order, sample) for _, order, sample in kept.ranked()
+            if sample.model_score is None and (order, sample.face_id) not in scores
+        ]
+
+    def _score(self, pending, scores, schedule=None, timings=None):
+        started = time.monotonic()
+        results = self.scorer.predict_batch([sample.crop for _, sample in pending])
+        for (order, sample), model_score in zip(pending, results):
+            scores[(order, sample.face_id)] = float(model_score)
+        elapsed = time.monotonic() - started
+        if schedule is not None:
+            schedule.inference_done(len(pending), elapsed)
+        if timings is not None:
+            timings.add("inference", elapsed)
+            timings.count("crops_scored", len(pending))
+            timings.batch(len(pending))
+
+    def _decided(self, kept, scores, budget, max_unknown, meta_score):
+        return certain_bounds(
+            kept.ranked(), scores, budget, max_unknown, self.pipeline.max_faces == 1, meta_score
+        )
+
+    def run(self, frames, frame_budget, meta_score, bounded, near_dup=None, schedule=None, timings=None):
+        """
+        frames, frame_budget, near_dup: as for FramePipeline.run.
+        bounded: the source yields at most frame_budget frames (uniform
+        sampling), so decoding itself can stop early; with adaptive selection
+        any later frame could still replace the kept ones.
+        schedule: optional StageScheduler; decoding and scoring stop when the
+        deadline leaves no room for them (at least one chunk is always scored).
+        timings: optional StageTimings.
+        Returns (samples, model_scores, frames_seen, bounds) with only the
+        scored samples, in timestamp order. bounds is the certified
+        (low, high) range of the full-run score after an early exit, else None.
+        """
+        max_faces = self.pipeline.max_faces
+        budget = frame_budget * max_faces
+        kept = KeptSamples(budget)
+        scores = {}  # (frame order, face_id) -> model score
+        frames_seen = 0
+        bounds = None
+        cut = False  # deadline stopped decoding: no certified bounds past this point
+
+        stream = self.pipeline.iter_frame_samples(frames, near_dup, schedule, timings)
+        try:
+            for order, frame_score, samples in stream:
+                frames_seen = order
+                kept.add(samples, frame_score, order)
+                if schedule is not None:
+                    schedule.frame_done()
+                if self.early_exit and bounded:
+                    pending = self._pending(kept, scores)
+                    if len(pending) >= self.chunk:
+                        self._score(pending[:self.chunk], scores, schedule, timings)
+                        remaining = (frame_budget - frames_seen) * max_faces
+                        bounds = self._decided(kept, scores, budget, remaining, meta_score)
+                        if bounds is not None:
+                            break
+                frames_left = frame_budget - frames_seen
+                if schedule is not None and not (bounded and frames_left <= 0):
+                    if not schedule.next_frame(max(1, frames_left), len(self._pending(kept, scores))):
+                        cut = True
+                        break
+        finally:
+            stream.close()
+
+        # Every frame is in: score the rest, most important first
+        chunked = self.early_exit or schedule is not None
+        while bounds is None:
+            pending = self._pending(kept, scores)
+            if not pending:
+                break
+            batch = pending[:self.chunk] if chunked else pending
+            if schedule is not None and len(pending) < len(kept) and not schedule.allow_inference(len(batch)):
+                schedule.degrade("deadline_partial_inference")
+                break
+            self._score(batch, scores, schedule, timings)
+            if self.early_exit and not cut and len(pending) > len(batch):
+                bounds = self._decided(kept, scores, budget, 0, meta_score)
+
+        used = []
+        for _, order, sample in kept.ranked():
+            model_score = sample.model_score
+            if model_score is None:
+                model_score = scores.get((order, sample.face_id))
+            if model_score is not None:
+                used.append((sample, model_score))
+        used.sort(key=lambda item: item[0].timestamp)
+        return [s for s, _ in used], [m for _, m in used], frames_seen, bounds
@@ -0,0 +1,156 @@
+import re
+
+# Caption rules for context_verify. Phrases match as case-insensitive
+# substrings (as the per-pattern re.search calls did); list/dict order is
+# the order claims are reported and categories take priority in.
+BREAKING_PHRASES = ["breaking", "just in", "happening now", "confirmed", "massive", "hits", "killed", "dead"]
+CLAIM_CATEGORIES = {
+    "disaster": ["earthquake", "flood", "fire", "storm", "hurricane"],
+    "politics": ["election", "president", "protest", "senate", "vote"],
+    "health": ["virus", "outbreak", "vaccine", "pandemic"],
+    "breaking": ["breaking", "live now", "alert"],
+}
+# Words claiming the media is current (temporal check)
+CURRENT_PHRASES = ["today", "now", "breaking", "just in", "happening"]
+# Emotional urgency: case-sensitive (shouting)
+SENSATIONAL_PATTERN = r"!!+|MUST WATCH|UNBELIEVABLE|SHOCKING"
+ABSOLUTE_PHRASES = ["everyone", "confirmed by all", "100% true"]
+SENSATIONAL_SCORE = 0.3
+ABSOLUTE_SCORE = 0.2
+
+class CaptionScan:
+    """
+    Everything context_verify needs from a caption, from one scan.
+    """
+    __slots__ = ("claims", "claim_type", "current_claim", "pattern_score", "pattern_reasons")
+
+    def __init__(self, claims, claim_type, current_claim, pattern_score, pattern_reasons):
+        self.claims = claims
+        self.claim_type = claim_type
+        self.current_claim = current_claim
+        self.pattern_score = pattern_score
+        self.pattern_reasons = pattern_reasons
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+def _trie_pattern(phrases, group_of):
+    """
+    Regex for a set of lowercase phrases shaped as a trie, so each position
+    costs one literal test per branch. An empty named group marks where each
+    phrase ends; the last one set is the longest phrase matched there.
+    """
+    trie = {}
+    for phrase in phrases:
+        node = trie
+        for ch in phrase:
+            node = node.setdefault(ch, {})
+        node[""] = phrase
+
+    def build(node):
+        branches = [re.escape(ch) + build(node[ch]) for ch in sorted(k for k in node if k)]
+        mark = f"(?P<{group_of[node['']]}>)" if "" in node else ""
+        if not branches:
+            return mark
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return mark + (f"(?:{body})?" if mark else body)
+
+    return build(trie)
+
+class ClaimMatcher:
+    """
+    All caption rules compiled once (at import) into two regexes: the phrase
+    lists as one trie inside a lookahead, run over the lowercased caption, so
+    a single finditer pass finds every phrase at every position (overlapping
+    ones included), and the case-sensitive sensationalism pattern. Shorter
+    phrases ending inside a longer match ("happening" in "happening now")
+    are credited from a table built with the trie.
+    """
+    def __init__(self, breaking=BREAKING_PHRASES, categories=CLAIM_CATEGORIES, current=CURRENT_PHRASES,
+                 sensational=SENSATIONAL_PATTERN, absolute=ABSOLUTE_PHRASES):
+        self.categories = list(categories)
+        roles = {}  # phrase -> [(role, argument)]
+        for i, phrase in enumerate(breaking):
+            roles.setdefault(phrase.lower(), []).append(("breaking", i))
+        for rank, name in enumerate(self.categories):
+            for phrase in categories[name]:
+                roles.setdefault(phrase.lower(), []).append(("category", rank))
+        for phrase in current:
+            roles.setdefault(phrase.lower(), []).append(("current", None))
+        for phrase in absolute:
+            roles.setdefault(phrase.lower(), []).append(("absolute", None))
+
+        phrases = sorted(roles)
+        group_of = {phrase: f"p{i}" for i, phrase in enumerate(phrases)}
+        # group -> (length, roles) of its phrase and of each phrase that prefixes it
+        def hit_table(kinds):
+            return {
+                group_of[phrase]: [
+                    (len(other), [r for r in roles[other] if r[0] in kinds])
+                    for other in phrases if phrase.startswith(other)
+                ]
+                for phrase in phrases
+            }
+
+        self._hits = hit_table(("breaking", "category", "current", "absolute"))
+        # Captions whose lowercase form has a different length ("İ" -> "i̇"):
+        # claims and absolute markers are matched in the caption ignoring case,
+        # categories and current words in its lowercase form, as the per-rule
+        # scan did
+        self._hits_cased = hit_table(("breaking", "absolute"))
+        self._hits_lowered = hit_table(("category", "current"))
+        pattern = f"(?={_trie_pattern(phrases, group_of)})"
+        self._finditer = re.compile(pattern).finditer
+        self._finditer_ignorecase = re.compile(pattern, re.IGNORECASE).finditer
+        self._sensational = re.compile(sensational).search
+
+    def scan(self, text):
+        breaking = {}  # breaking phrase index -> first occurrence, as written
+        rank = None
+        current = absolute = False
+        lowered = text.lower()
+        if len(lowered) == len(text):
+            passes = ((self._finditer(lowered), self._hits),)
+        else:
+            passes = ((self._finditer_ignorecase(text), self._hits_cased),
+                      (self._finditer(lowered), self._hits_lowered))
+        for matches, hits in passes:
+            for m in matches:
+                group = m.lastgroup
+                start = m.start()
+                for length, phrase_roles in hits[group]:
+                    for role, arg in phrase_roles:
+                        if role == "breaking":
+                            if arg not in breaking:
+                                breaking[arg] = text[start:start + length]
+                        elif role == "category":
+                            if rank is None or arg < rank:
+                                rank = arg
+                        elif role == "current":
+                            current = True
+                        else:
+                            absolute = True
+
+        score = 0.0
+        reasons = []
+        if self._sensational(text):
+            score += SENSATIONAL_SCORE
+            reasons.append("Sensationalist language patterns")
+        if absolute:
+            score += ABSOLUTE_SCORE
+            reasons.append("Suspicious absolute claim markers")
+        return CaptionScan(
+            [f"High-urgency claim: {breaking[i]}" for i in sorted(breaking)],
+            self.categories[rank] if rank is not None else "general",
+            current, score, reasons
+        )
+
+    def scan_many(self, texts):
+        """
+        scan() over many captions (backfills), as a list.
+        """
+        scan = self.scan
+        return [scan(text) for text in texts]
+
+# Compiled once per process
+CLAIM_MATCHER = ClaimMatcher()
@@ -0,0 +1,105 @@
+import sys
+import time
+
+from config import (
+    DEADLINE_FINISH_RESERVE_S, DEADLINE_EST_FRAME_S, DEADLINE_EST_CROP_S,
+    DEADLINE_LOW_DETECTION_SIDE, DEADLINE_COST_SMOOTHING
+)
+
+def _smooth(previous, observed, alpha=DEADLINE_COST_SMOOTHING):
+    return previous + alpha * (observed - previous)
+
+class StageCosts:
+    """
+    Running estimates of what the stages cost on this node, shared by the
+    requests of one process so each request starts from measured costs.
+      frame_s: one sampled frame through decode, detection and heuristics
+      crop_s:  one face crop through EfficientNet
+    """
+    def __init__(self, frame_s=DEADLINE_EST_FRAME_S, crop_s=DEADLINE_EST_CROP_S):
+        self.frame_s = frame_s
+        self.crop_s = crop_s
+
+class StageScheduler:
+    """
+    Schedules the stages of one verification against its deadline
+    (time.monotonic() timestamp). Degrades in order:
+      1. fewer frames up front when the budget cannot cover the frame budget,
+      2. lower detection resolution once the remaining frames fall behind,
+      3. no more frames once only the pending inference still fits,
+      4. partial inference (only the faces scored in time count).
+    Each step taken is listed in signals, for the report.
+    """
+    def __init__(self, deadline, costs, finish_reserve=DEADLINE_FINISH_RESERVE_S):
+        self.deadline = deadline
+        self.costs = costs
+        self.finish_reserve = finish_reserve
+        self.frame_s = costs.frame_s
+        self.crop_s = costs.crop_s
+        self.detection_side = None  # None = FaceAnalyzer default
+        self.signals = []
+        self._mark = None
+        self._inference_s = 0.0  # spent since the last frame
+
+    def remaining(self):
+        """
+        Seconds left for the stages, after the fusion/report reserve.
+        """
+        return self.deadline - time.monotonic() - self.finish_reserve
+
+    def degrade(self, signal):
+        if signal not in self.signals:
+            self.signals.append(signal)
+            print(f"[DEADLINE] {signal} ({max(0.0, self.remaining()):.2f}s left)", file=sys.stderr)
+
+    # --- Extraction ---
+    def frame_budget(self, frame_budget):
+        affordable = int(self.remaining() / (self.frame_s + self.crop_s))
+        if affordable < frame_budget:
+            self.degrade("deadline_fewer_frames")
+            return max(1, affordable)
+        return frame_budget
+
+    def decode_time_budget_ms(self, time_budget_ms, frame_budget):
+        """
+        Adaptive selection's decode window: leave room to score its frames.
+        """
+        window_ms = (self.remaining() - frame_budget * self.crop_s) * 1000
+        return max(1.0, min(time_budget_ms, window_ms))
+
+    # --- Detection ---
+    def frame_done(self):
+        now = time.monotonic()
+        if self._mark is not None:
+            self.frame_s = _smooth(self.frame_s, max(0.0, now - self._mark - self._inference_s))
+        self._mark = now
+        self._inference_s = 0.0
+
+    def next_frame(self, frames_left, pending_crops):
+        """
+        Whether another frame still fits; lowers the detection resolution
+        first when the frames left would not.
+        """
+        available = self.remaining() - pending_crops * self.crop_s
+        if available < self.frame_s:
+            self.degrade("deadline_fewer_frames")
+            return False
+        if self.detection_side is None and frames_left * (self.frame_s + self.crop_s) > available:
+            self.detection_side = DEADLINE_LOW_DETECTION_SIDE
+            self.degrade("deadline_low_res_detection")
+        return True
+
+    # --- Inference ---
+    def allow_inference(self, crops):
+        return self.remaining() >= crops * self.crop_s
+
+    def inference_done(self, crops, seconds):
+        self.crop_s = _smooth(self.crop_s, seconds / max(1, crops))
+        self._inference_s += seconds
+
+    def finish(self):
+        """
+        Hand the costs measured on this request to the next ones.
+        """
+        self.costs.frame_s = _smooth(self.costs.frame_s, self.frame_s)
+        self.costs.crop_s = _smooth(self.costs.crop_s, self.crop_s)
@@ -1,34 +1,227 @@
+import os
+import sys
 import cv2
 import numpy as np
+import threading
+
+from config import (
+    FACE_DETECTOR_BACKEND, YUNET_MODEL_PATH, DETECTION_MAX_SIDE,
+    FACE_TRACKING, TRACK_PADDING, TRACK_MIN_IOU, MAX_FACES_PER_FRAME
+)
+
+class HaarFaceDetector:
+    """
+    OpenCV Haar cascade. CPU-friendly and built in to OpenCV.
+    """
+    name = "haar"
 
-class FaceAnalyzer:
     def __init__(self):
-        # Use simple Haar Cascades for CPU-friendly face detection
-        # In a real setup, MediaPipe CPU is better, but Haar is built-in to OpenCV (easiest for now)
         self.face_cascade_path = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
-        self.face_cascade = cv2.CascadeClassifier(self.face_cascade_path)
+        # CascadeClassifier is not safe to share between threads (server mode),
+        # so each thread lazily loads its own copy.
+        self._local = threading.local()
+        self._local.face_cascade = cv2.CascadeClassifier(self.face_cascade_path)
 
-    def get_face_roi(self, frame):
+    @property
+    def face_cascade(self):
+        cascade = getattr(self._local, "face_cascade", None)
+        if cascade is None:
+            cascade = cv2.CascadeClassifier(self.face_cascade_path)
+            self._local.face_cascade = cascade
+        return cascade
+
+    def detect(self, image):
         """
-        Step 3: Face & Region Extraction
-        Returns crop of the face and key regions (eyes, mouth)
+        Returns a list of (x, y, w, h) boxes in image coordinates.
         """
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
         faces = self.face_cascade.detectMultiScale(gray, 1.1, 4)
-        
-        if len(faces) == 0:
-            return None, {}
+        return [tuple(int(v) for v in f) for f in faces]
+
+class YuNetFaceDetector:
+    """
+    OpenCV DNN face detector (YuNet), CPU backend.
+    More robust to pose and scale than Haar at a similar cost on small inputs.
+    """
+    name = "yunet"
+
+    def __init__(self, model_path=YUNET_MODEL_PATH, score_threshold=0.8):
+        self.model_path = model_path
+        self.score_threshold = score_threshold
+        self._local = threading.local()
+
+    @property
+    def net(self):
+        net = getattr(self._local, "net", None)
+        if net is None:
+            net = cv2.FaceDetectorYN.create(self.model_path, "", (320, 320), self.score_threshold, 0.3, 50)
+            self._local.net = net
+        return net
+
+    def detect(self, image):
+        h, w = image.shape[:2]
+        net = self.net
+        net.setInputSize((w, h))
+        _, faces = net.detect(image)
+        if faces is None:
+            return []
+        return [tuple(int(v) for v in f[:4]) for f in faces]
+
+def create_face_detector(backend=FACE_DETECTOR_BACKEND):
+    if backend == "yunet":
+        if os.path.exists(YUNET_MODEL_PATH):
+            return YuNetFaceDetector()
+        print(f"[FACE] WARNING: YuNet model not found at {YUNET_MODEL_PATH}, using Haar", file=sys.stderr)
+    return HaarFaceDetector()
+
+def box_iou(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    ix = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    iy = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = ix * iy
+    union = aw * ah + bw * bh - inter
+    return inter / union if union else 0.0
+
+class FaceTrack:
+    """
+    Per-request tracking state: the last face box seen in this video and,
+    for multi-face verification, the last box of every face identity.
+    """
+    def __init__(self):
+        self.box = None
+        self.full_searches = 0
+        self.window_hits = 0
+        self.identities = {}  # face_id -> last box
+        self.next_id = 0
+
+    def assign(self, boxes):
+        """
+        Greedily match boxes to known identities by IoU with their last box;
+        unmatched boxes start new identities. Returns [(face_id, box)].
+        """
+        pairs = sorted(
+            ((box_iou(box, last), i, face_id)
+             for i, box in enumerate(boxes)
+             for face_id, last in self.identities.items()),
+            reverse=True
+        )
+        assigned = {}
+        used = set()
+        for overlap, i, face_id in pairs:
+            if overlap < TRACK_MIN_IOU:
+                break
+            if i in assigned or face_id in used:
+                continue
+            assigned[i] = face_id
+            used.add(face_id)
+
+        result = []
+        for i, box in enumerate(boxes):
+            face_id = assigned.get(i)
+            if face_id is None:
+                face_id = self.next_id
+                self.next_id += 1
+            self.identities[face_id] = box
+            result.append((face_id, box))
+        return result
+
+class FaceAnalyzer:
+    def __init__(self, backend=FACE_DETECTOR_BACKEND, max_side=DETECTION_MAX_SIDE, tracking=FACE_TRACKING):
+        # Haar by default: built in to OpenCV, no extra model file.
+        # "yunet" uses the OpenCV DNN detector when its ONNX file is present.
+        self.detector = create_face_detector(backend)
+        # Detection runs on a copy whose longer side is at most max_side (0 = full resolution)
+        self.max_side = max_side
+        self.tracking = tracking
+
+    def new_track(self):
+        return FaceTrack() if self.tracking else None
+
+    def _detect_scaled(self, image, offset=(0, 0), max_side=None):
+        """
+        Detect on a downscaled copy and map boxes back to full resolution.
+        max_side overrides the analyzer's own for this call (deadline pressure).
+        """
+        h, w = image.shape[:2]
+        if max_side is None:
+            max_side = self.max_side
+        scale = 1.0
+        if max_side and max(h, w) > max_side:
+            scale = max_side / max(h, w)
+            image = cv2.resize(image, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+
+        ox, oy = offset
+        return [
+            (int(x / scale) + ox, int(y / scale) + oy, int(fw / scale), int(fh / scale))
+            for (x, y, fw, fh) in self.detector.detect(image)
+        ]
+
+    def detect(self, frame, track=None, max_side=None):
+        """
+        Largest face box (x, y, w, h) in full-resolution coordinates, or None.
+        With a track, only a padded window around the previous box is searched;
+        the full frame is scanned when there is no previous box or it was lost.
+        """
+        if track is not None and track.box is not None:
+            x, y, w, h = track.box
+            pad_x, pad_y = int(w * TRACK_PADDING), int(h * TRACK_PADDING)
+            x0, y0 = max(0, x - pad_x), max(0, y - pad_y)
+            x1, y1 = min(frame.shape[1], x + w + pad_x), min(frame.shape[0], y + h + pad_y)
+            faces = self._detect_scaled(frame[y0:y1, x0:x1], offset=(x0, y0), max_side=max_side)
+            if faces:
+                track.window_hits += 1
+                track.box = max(faces, key=lambda f: f[2] * f[3])
+                return track.box
+
+        faces = self._detect_scaled(frame, max_side=max_side)
+        box = max(faces, key=lambda f: f[2] * f[3]) if faces else None
+        if track is not None:
+            track.full_searches += 1
+            track.box = box
+        return box
+
+    def detect_faces(self, frame, track=None, max_faces=MAX_FACES_PER_FRAME, max_side=None):
+        """
+        Up to max_faces (face_id, box) pairs, largest first. face_id is stable
+        across the frames of one track. max_faces=1 is the single-face path.
+        """
+        if max_faces <= 1:
+            box = self.detect(frame, track, max_side)
+            return [] if box is None else [(0, box)]
+
+        faces = sorted(self._detect_scaled(frame, max_side=max_side), key=lambda f: f[2] * f[3], reverse=True)[:max_faces]
+        if track is None:
+            return list(enumerate(faces))
+        track.full_searches += 1
+        return track.assign(faces)
+
+    def crop_rois(self, frame, box):
+        """
+        Face crop and key regions (eyes, mouth) for a detected box.
+        """
+        (x, y, w, h) = box
+
+        # Copy so the crop does not keep the full frame alive
+        face_crop = frame[y:y+h, x:x+w].copy()
 
-        # Take the largest face
-        (x, y, w, h) = sorted(faces, key=lambda f: f[2]*f[3], reverse=True)[0]
-        
-        face_crop = frame[y:y+h, x:x+w]
-        
         # Heuristic ROIs (relative to face box)
         rois = {
             "face": face_crop,
             "eyes": face_crop[int(h*0.2):int(h*0.45), :],
             "mouth": face_crop[int(h*0.65):int(h*0.9), int(w*0.2):int(w*0.8)]
         }
-        
+
         return face_crop, rois
+
+    def get_face_roi(self, frame, track=None):
+        """
+        Step 3: Face & Region Extraction
+        Returns crop of the face and key regions (eyes, mouth)
+        """
+        box = self.detect(frame, track)
+        if box is None:
+            return None, {}
+
+        # Take the largest face
+        return self.crop_rois(frame, box)
@@ -1,42 +1,218 @@
 import cv2
 import numpy as np
 import random
-from config import MAX_FRAMES_TO_PROCESS
+import heapq
+import time
+from config import (
+    MAX_FRAMES, FRAME_SAMPLE_RATE, FRAME_SAMPLER, SEEK_ASSUMED_GOP_FRAMES,
+    FRAME_SELECTION, ADAPTIVE_FRAME_BUDGET, ADAPTIVE_TIME_BUDGET_MS,
+    ADAPTIVE_CANDIDATE_FPS, ADAPTIVE_CHANGE_THRESHOLD, ADAPTIVE_MAX_GAP_S
+)
+from core.media import MediaSource
+
+THUMB_SIZE = (32, 32)
+KEYFRAME_BONUS = 0.1
 
 class FrameExtractor:
-    def extract_frames(self, file_path):
+    def __init__(self, sampler=FRAME_SAMPLER, selection=FRAME_SELECTION):
+        # "sequential" | "seek" | "auto" (sequential, switching to seek on short GOPs)
+        self.sampler = sampler
+        # "uniform" (1 FPS + jitter) | "adaptive" (scene-change aware)
+        self.selection = selection
+
+    def frame_budget(self, frame_budget=None):
+        if frame_budget:
+            return frame_budget
+        return ADAPTIVE_FRAME_BUDGET if self.selection == "adaptive" else MAX_FRAMES
+
+    def extract_frames(self, file_path, frame_budget=None, time_budget_ms=None):
         """
         Step 2: Smart Frame Sampling
-        Rule: Never scan full video. 
-        Extract 1 FPS + random jitter, max 32 frames.
+        Rule: Never scan full video.
+        Extract 1 FPS + random jitter, max 32 frames,
+        or (adaptive) the most informative frames within a frame/time budget.
+        Collects iter_frames() into lists; the verification pipeline streams instead.
         """
-        cap = cv2.VideoCapture(file_path)
+        budget = self.frame_budget(frame_budget)
+        kept = []  # min-heap of (score, index, frame, timestamp)
+        for index, (frame, timestamp, score) in enumerate(self.iter_frames(file_path, budget, time_budget_ms)):
+            heapq.heappush(kept, (score, index, frame, timestamp))
+            if len(kept) > budget:
+                heapq.heappop(kept)
+
+        kept.sort(key=lambda item: item[1])
+        return [item[2] for item in kept], [item[3] for item in kept]
+
+    def iter_frames(self, media, frame_budget=None, time_budget_ms=None):
+        """
+        Generator over sampled frames as (frame, timestamp, score), in decode order.
+        Uniform sampling yields at most frame_budget frames with score 0.
+        Adaptive selection yields every frame that qualified when it was decoded;
+        callers keep the frame_budget highest-scoring ones.
+        media: a path, or a MediaSource (in-memory bytes are read without a temp file).
+        Yields nothing if the media cannot be opened as a video.
+        """
+        source = MediaSource.of(media)
+        cap = source.open_video()
         if not cap.isOpened():
-            print(f"Error opening video file {file_path}")
-            return []
-
-        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        duration = frame_count / fps if fps > 0 else 0
-        
-        frames = []
-        timestamps = []
-        
-        # Strategy: Sample 1 frame per second
-        for sec in range(int(duration) + 1):
-            if len(frames) >= MAX_FRAMES_TO_PROCESS:
+            print(f"Error opening video file {source.name}")
+            return
+
+        try:
+            frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            fps = cap.get(cv2.CAP_PROP_FPS)
+            duration = frame_count / fps if fps > 0 else 0
+
+            if self.selection == "adaptive":
+                yield from self._iter_adaptive(cap, fps, time_budget_ms or ADAPTIVE_TIME_BUDGET_MS)
+                return
+
+            target_times = self.sample_times(duration)[:self.frame_budget(frame_budget)]
+
+            if self.sampler == "seek":
+                frames = self._read_seek(cap, target_times)
+            else:
+                frames = self._read_sequential(cap, target_times, fps, frame_count)
+            for frame, timestamp in frames:
+                yield frame, timestamp, 0.0
+        finally:
+            cap.release()
+
+    def sample_times(self, duration):
+        """
+        Strategy: Sample 1 frame per second, max 32 frames.
+        """
+        target_times = []
+        step = 1.0 / FRAME_SAMPLE_RATE
+        for i in range(int(duration * FRAME_SAMPLE_RATE) + 1):
+            if len(target_times) >= MAX_FRAMES:
                 break
-                
             # Add small random jitter to avoid I-frame bias
             jitter = random.uniform(-0.1, 0.1)
-            target_time = max(0, sec + jitter)
-            
+            target_times.append(max(0, i * step + jitter))
+        return target_times
+
+    def _read_seek(self, cap, target_times):
+        for target_time in target_times:
             cap.set(cv2.CAP_PROP_POS_MSEC, target_time * 1000)
             ret, frame = cap.read()
-            
             if ret:
-                frames.append(frame)
-                timestamps.append(target_time)
-        
-        cap.release()
-        return frames, timestamps
+                yield frame, target_time
+
+    def _read_sequential(self, cap, target_times, fps, frame_count):
+        """
+        Walk the stream forward with grab() and only retrieve() (colour-convert
+        and copy out) the frames that were selected.
+        In "auto" mode the keyframe interval is measured on the way; on short-GOP
+        streams where a seek is cheaper than decoding the gap between samples,
+        the remaining samples are read by seeking.
+        """
+        if fps <= 0:
+            # No timing info: fall back to the first frame only
+            ret, frame = cap.read()
+            if ret:
+                yield frame, 0.0
+            return
+
+        wanted = {}
+        for target_time in target_times:
+            index = int(round(target_time * fps))
+            if frame_count > 0:
+                index = min(index, frame_count - 1)
+            wanted.setdefault(index, target_time)
+        if not wanted:
+            return
+
+        sample_gap = fps / FRAME_SAMPLE_RATE
+        measure_gop = self.sampler == "auto" and frame_count > 0
+        keyframes = []
+
+        last_index = max(wanted)
+        index = 0
+        while index <= last_index:
+            if not cap.grab():
+                break
+
+            if measure_gop:
+                frame_type = int(cap.get(cv2.CAP_PROP_FRAME_TYPE))
+                if frame_type <= 0:
+                    # Backend does not report picture types: assume the encoder default
+                    measure_gop = False
+                    gop = SEEK_ASSUMED_GOP_FRAMES
+                elif frame_type == ord("I"):
+                    keyframes.append(index)
+                    gop = keyframes[-1] - keyframes[0] if len(keyframes) >= 2 else None
+                else:
+                    gop = None
+
+                if gop is not None:
+                    measure_gop = False
+                    if gop / 2 < sample_gap:
+                        remaining = [t for i, t in sorted(wanted.items()) if i > index]
+                        if index in wanted:
+                            ret, frame = cap.retrieve()
+                            if ret:
+                                yield frame, wanted[index]
+                        yield from self._read_seek(cap, remaining)
+                        return
+
+            if index in wanted:
+                ret, frame = cap.retrieve()
+                if ret:
+                    yield frame, wanted[index]
+            index += 1
+
+    def _iter_adaptive(self, cap, fps, time_budget_ms):
+        """
+        Single forward pass over the stream. Candidates are retrieved at
+        ADAPTIVE_CANDIDATE_FPS plus every keyframe that breaks the regular GOP
+        cadence (encoders insert those at scene cuts). A candidate is kept when its
+        downscaled grey thumbnail differs enough from the last kept frame, or
+        when ADAPTIVE_MAX_GAP_S has passed without one (coverage floor).
+        Static clips therefore yield a few frames; fast-cut clips one per shot.
+        The score (thumbnail change, plus a keyframe bonus) lets the caller drop
+        the least changed frames once more than its frame budget qualify.
+        """
+        if fps <= 0:
+            fps = 1.0
+        deadline = time.monotonic() + time_budget_ms / 1000.0
+        candidate_step = max(1, int(round(fps / ADAPTIVE_CANDIDATE_FPS)))
+        max_gap = max(1, int(ADAPTIVE_MAX_GAP_S * fps))
+
+        last_thumb = None
+        last_kept_index = 0
+        last_keyframe = None
+        gop_interval = None
+        index = 0
+        while time.monotonic() < deadline:
+            if not cap.grab():
+                break
+
+            is_keyframe = False
+            if int(cap.get(cv2.CAP_PROP_FRAME_TYPE)) == ord("I"):
+                if last_keyframe is not None:
+                    interval = index - last_keyframe
+                    is_keyframe = gop_interval is not None and interval != gop_interval
+                    gop_interval = interval
+                last_keyframe = index
+
+            if index % candidate_step == 0 or is_keyframe:
+                ret, frame = cap.retrieve()
+                if not ret:
+                    break
+                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+                thumb = cv2.resize(gray, THUMB_SIZE, interpolation=cv2.INTER_AREA).astype(np.float32)
+
+                if last_thumb is None:
+                    keep, score = True, float("inf")  # Always keep the opening frame
+                else:
+                    change = float(np.mean(np.abs(thumb - last_thumb))) / 255.0
+                    threshold = ADAPTIVE_CHANGE_THRESHOLD / 2 if is_keyframe else ADAPTIVE_CHANGE_THRESHOLD
+                    keep = change >= threshold or index - last_kept_index >= max_gap
+                    score = change + (KEYFRAME_BONUS if is_keyframe else 0.0)
+
+                if keep:
+                    last_thumb = thumb
+                    last_kept_index = index
+                    yield frame, index / fps, score
+            index += 1
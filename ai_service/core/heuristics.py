@@ -1,68 +1,124 @@
 import numpy as np
 import cv2
-from scipy.fftpack import fft2, fftshift
+
+FFT_MASK_RADIUS = 20  # low frequencies (around DC) excluded from the FFT rule
+# Hard-rule thresholds (rescore.py can replay stored measurements against new ones)
+FFT_HF_MIN = 80       # Rule 1: mean high-frequency log magnitude
+LAP_VAR_MIN = 50      # Rule 2: Laplacian variance
+NOISE_LEVEL_MIN = 1.5  # Rule 4: mean |image - median blur|
 
 class ArtifactAnalyzer:
+    def __init__(self):
+        self._fft_weights = {}  # spectrum shape -> high-frequency weights
+
+    def fft_weights(self, h, w):
+        """
+        High-frequency mask for an h x w image, laid out like its rfft2 half
+        spectrum. Columns whose mirror image is not stored count twice, so a
+        weighted mean over the half spectrum equals the plain mean over the
+        full (fftshifted) spectrum outside FFT_MASK_RADIUS.
+        """
+        weights = self._fft_weights.get((h, w))
+        if weights is None:
+            fy = np.fft.ifftshift(np.arange(h) - h // 2)[:, None]  # integer frequencies, fft order
+            fx = np.arange(w // 2 + 1)[None, :]
+            weights = ((fx ** 2 + fy ** 2) > FFT_MASK_RADIUS ** 2).astype(np.float64)
+            weights[:, 1:(w + 1) // 2] *= 2
+            total = weights.sum()
+            # A crop too small to have any band outside the mask: NaN, like the
+            # mean of an empty selection, so the rule never fires
+            weights = weights / total if total else np.full_like(weights, np.nan)
+            self._fft_weights[(h, w)] = weights
+        return weights
+
+    def measure_batch(self, grays):
+        """
+        Raw measurements for a batch of grayscale face crops of any size:
+        {"hf_mean", "lap_var", "noise_level"}, one array entry per crop.
+        """
+        from scipy.fft import rfft2  # only verifications that reach a face pay the scipy import
+
+        n = len(grays)
+
+        # Rule 1 input: native resolution too (the mask radius and threshold
+        # are in native frequency units), one real FFT per group of same-sized crops
+        hf_mean = np.empty(n)
+        groups = {}
+        for i, gray in enumerate(grays):
+            groups.setdefault(gray.shape, []).append(i)
+        for (h, w), members in groups.items():
+            stack = np.stack([grays[i] for i in members]).astype(np.float64)
+            magnitude = 20 * np.log1p(np.abs(rfft2(stack, axes=(1, 2))))
+            hf_mean[members] = np.einsum("nij,ij->n", magnitude, self.fft_weights(h, w))
+
+        # Rules 2 and 4 input: native resolution, their thresholds depend on scale
+        lap_var = np.empty(n)
+        noise_level = np.empty(n)
+        for i, gray in enumerate(grays):
+            _, std = cv2.meanStdDev(cv2.Laplacian(gray, cv2.CV_32F))
+            lap_var[i] = std[0, 0] ** 2
+            noise_level[i] = cv2.mean(cv2.absdiff(gray, cv2.medianBlur(gray, 3)))[0]
+
+        return {"hf_mean": hf_mean, "lap_var": lap_var, "noise_level": noise_level}
+
+    def analyze_batch(self, rois_list, measured=False):
+        """
+        Step 5 for a batch of faces: [(score, signals)] in input order,
+        the same result analyze() gives for each.
+        measured: return (score, signals, (hf_mean, lap_var, noise_level))
+        instead; the measurements are None for a face without ROI.
+        """
+        results = [None] * len(rois_list)
+        grays = []
+        indices = []
+        for i, rois in enumerate(rois_list):
+            face = rois.get("face")
+            if face is None:
+                results[i] = (0.0, ["no_face_roi"])
+                continue
+            grays.append(cv2.cvtColor(face, cv2.COLOR_BGR2GRAY))
+            indices.append(i)
+
+        if not grays:
+            return results
+
+        measures = self.measure_batch(grays)
+        for j, i in enumerate(indices):
+            signals = []
+
+            # --- Rule 1: FFT Frequency Spikes ---
+            # Deepfakes often have specific artifacts in the frequency domain.
+            if measures["hf_mean"][j] < FFT_HF_MIN:  # Abnormally smooth (common in GANs)
+                signals.append("fft_frequency_anomaly")
+
+            # --- Rule 2: Uniform patterns / checkerboard artifacts ---
+            # Simulated by checking local variance consistency
+            if measures["lap_var"][j] < LAP_VAR_MIN:  # Extremely low variance = too smooth = fake
+                signals.append("texture_smoothing_detected")
+
+            # --- Rule 3: Repeating texture patches (Simplified) ---
+            # Full patch matching is too expensive; the FFT check above catches
+            # repeating patterns (spikes).
+
+            # --- Rule 4: Sensor Noise Analysis ---
+            # Real cameras have specific noise profiles (ISO). Synthetic images
+            # often have no noise, or uniform noise added blindly.
+            # Noise estimate: diff between image and median blur
+            if measures["noise_level"][j] < NOISE_LEVEL_MIN:  # Almost zero noise -> synthetic
+                signals.append("unnatural_silence_noise")
+
+            # Every rule is a hard fail
+            results[i] = (1.0 if signals else 0.0, signals)
+            if measured:
+                results[i] += ((
+                    float(measures["hf_mean"][j]), float(measures["lap_var"][j]), float(measures["noise_level"][j])
+                ),)
+        return results
+
     def analyze(self, rois):
         """
         Step 5: Artifact Heuristics (Classical CV)
         Checks for FFT spikes, noise consistency, etc.
         Implementing 'Hard Rules' as per architecture.
         """
-        score = 0.0
-        signals = []
-        is_hard_fail = False
-        
-        face = rois.get("face")
-        if face is None:
-            return 0.0, ["no_face_roi"]
-
-        gray = cv2.cvtColor(face, cv2.COLOR_BGR2GRAY)
-
-        # --- Rule 1: FFT Frequency Spikes ---
-        # Deepfakes often have specific artifacts in the frequency domain.
-        f = fft2(gray)
-        fshift = fftshift(f)
-        magnitude_spectrum = 20 * np.log(np.abs(fshift) + 1)
-        
-        # Check for abnormal spikes (simple variance in high freq regions)
-        h, w = magnitude_spectrum.shape
-        center_h, center_w = h // 2, w // 2
-        # Mask out low frequencies (center)
-        mask_radius = 20
-        y, x = np.ogrid[:h, :w]
-        mask = (x - center_w)**2 + (y - center_h)**2 > mask_radius**2
-        
-        high_freq_content = magnitude_spectrum[mask]
-        
-        if np.mean(high_freq_content) < 80: # Abnormally smooth (common in GANs)
-            score = 1.0
-            signals.append("fft_frequency_anomaly")
-            is_hard_fail = True
-
-        # --- Rule 2: Uniform patterns / checkerboard artifacts ---
-        # Simulated by checking local variance consistency
-        laplacian_var = cv2.Laplacian(gray, cv2.CV_64F).var()
-        if laplacian_var < 50: # Extremely low variance = too smooth = fake
-            score = 1.0
-            signals.append("texture_smoothing_detected")
-            is_hard_fail = True
-
-        # --- Rule 3: Repeating texture patches (Simplified) ---
-        # Very computationally expensive to do full patch matching. 
-        # We'll use Gray Level Co-occurrence Matrix (GLCM) proxy or simple autocorrelation.
-        # Here we rely on the FFT check above which catches repeating patterns (spikes).
-        
-        # --- Rule 4: Sensor Noise Analysis ---
-        # Real cameras have specific noise profiles (ISO). 
-        # Synthetic images often have uniform or Gaussian noise added blindly.
-        # We check if noise is "too perfect" or absent.
-        # Simple Noise Estimate: diff between image and median blur
-        noise = cv2.absdiff(gray, cv2.medianBlur(gray, 3))
-        noise_level = np.mean(noise)
-        if noise_level < 1.5: # Almost zero noise -> synthetic
-             score = 1.0
-             signals.append("unnatural_silence_noise")
-             is_hard_fail = True
-
-        return (1.0 if is_hard_fail else 0.0), signals
+        return self.analyze_batch([rois])[0]
@@ -0,0 +1,199 @@
+import os
+import sys
+import time
+import threading
+import cProfile
+from contextlib import contextmanager
+
+try:
+    import resource  # POSIX only
+except ImportError:
+    resource = None
+
+from config import PROFILE_DIR, METRICS_STAGE_BUCKETS_S, METRICS_BATCH_BUCKETS
+
+def peak_rss_mb():
+    """
+    Peak resident set size of this process in MB, or None where unavailable.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+
+class StageTimings:
+    """
+    Per-request instrumentation: wall time per stage, counters and
+    inference batch sizes. Safe to record into from the pipeline's worker
+    threads. Stages that run concurrently (decode, heuristics) are summed
+    over their calls, so stage times can add up to more than total_ms.
+    """
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.total_s = None
+        self.lock = threading.Lock()
+        self.stages = {}  # name -> [seconds, calls]
+        self.counts = {}
+        self.batch_sizes = []
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def add(self, name, seconds):
+        with self.lock:
+            entry = self.stages.setdefault(name, [0.0, 0])
+            entry[0] += seconds
+            entry[1] += 1
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counts[name] = self.counts.get(name, 0) + n
+
+    def batch(self, size):
+        with self.lock:
+            self.batch_sizes.append(size)
+
+    def finish(self):
+        self.total_s = time.perf_counter() - self.started
+
+    def summary(self):
+        """
+        The "timings" block of a report.
+        """
+        total_s = self.total_s if self.total_s is not None else time.perf_counter() - self.started
+        with self.lock:
+            return {
+                "total_ms": round(total_s * 1000, 1),
+                "stages_ms": {name: round(s * 1000, 1) for name, (s, _) in self.stages.items()},
+                "stage_calls": {name: calls for name, (_, calls) in self.stages.items()},
+                "counts": dict(self.counts),
+                "batch_sizes": list(self.batch_sizes),
+                "peak_rss_mb": peak_rss_mb()
+            }
+
+class Histogram:
+    """
+    Prometheus-style histogram (cumulative "le" buckets when rendered).
+    """
+    def __init__(self, bounds):
+        self.bounds = list(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)  # last bucket = +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.bounds):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self, name, labels=""):
+        sep = "," if labels else ""
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.bounds + ["+Inf"], self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels}{sep}le="{bound}"}} {cumulative}')
+        suffix = f"{{{labels}}}" if labels else ""
+        lines.append(f"{name}_sum{suffix} {round(self.sum, 6)}")
+        lines.append(f"{name}_count{suffix} {self.count}")
+        return lines
+
+class MetricsRegistry:
+    """
+    Server-wide aggregate of request timings, rendered in the Prometheus
+    text exposition format for GET /metrics.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.request_seconds = Histogram(METRICS_STAGE_BUCKETS_S)
+        self.stage_seconds = {}  # stage -> Histogram
+        self.batch_size = Histogram(METRICS_BATCH_BUCKETS)
+        self.counts = {}
+        self.verdicts = {}
+
+    def observe(self, timings, report):
+        summary = timings.summary()
+        with self.lock:
+            self.request_seconds.observe(summary["total_ms"] / 1000)
+            for stage, ms in summary["stages_ms"].items():
+                self.stage_seconds.setdefault(stage, Histogram(METRICS_STAGE_BUCKETS_S)).observe(ms / 1000)
+            for size in summary["batch_sizes"]:
+                self.batch_size.observe(size)
+            for name, n in summary["counts"].items():
+                self.counts[name] = self.counts.get(name, 0) + n
+            verdict = report.get("verdict", "UNKNOWN")
+            self.verdicts[verdict] = self.verdicts.get(verdict, 0) + 1
+
+    def render(self, batching=None):
+        """
+        batching: optional MicroBatcher.stats() to expose alongside.
+        """
+        lines = []
+        with self.lock:
+            lines.append("# TYPE deepfakeguard_requests_total counter")
+            for verdict, n in sorted(self.verdicts.items()):
+                lines.append(f'deepfakeguard_requests_total{{verdict="{verdict}"}} {n}')
+
+            lines.append("# TYPE deepfakeguard_request_seconds histogram")
+            lines.extend(self.request_seconds.render("deepfakeguard_request_seconds"))
+
+            lines.append("# TYPE deepfakeguard_stage_seconds histogram")
+            for stage, histogram in sorted(self.stage_seconds.items()):
+                lines.extend(histogram.render("deepfakeguard_stage_seconds", f'stage="{stage}"'))
+
+            lines.append("# TYPE deepfakeguard_inference_batch_size histogram")
+            lines.extend(self.batch_size.render("deepfakeguard_inference_batch_size"))
+
+            for name, n in sorted(self.counts.items()):
+                lines.append(f"# TYPE deepfakeguard_{name}_total counter")
+                lines.append(f"deepfakeguard_{name}_total {n}")
+
+        if batching is not None:
+            lines.append("# TYPE deepfakeguard_microbatch_batches_total counter")
+            lines.append(f"deepfakeguard_microbatch_batches_total {batching['batches_run']}")
+            lines.append("# TYPE deepfakeguard_microbatch_queue_depth gauge")
+            lines.append(f"deepfakeguard_microbatch_queue_depth {batching['queue_depth']}")
+
+        peak = peak_rss_mb()
+        if peak is not None:
+            lines.append("# TYPE deepfakeguard_peak_rss_bytes gauge")
+            lines.append(f"deepfakeguard_peak_rss_bytes {int(peak * 1024 * 1024)}")
+        return "\n".join(lines) + "\n"
+
+_profile_lock = threading.Lock()
+
+@contextmanager
+def request_profile(tag="request"):
+    """
+    cProfile the calling thread for one request and dump the stats to
+    PROFILE_DIR (open with pstats or snakeviz). Yields the .prof path, or
+    None when another request is already being profiled. Worker threads
+    (decode, heuristics) are not profiled; their time shows up as waits.
+    """
+    if not _profile_lock.acquire(blocking=False):
+        yield None
+        return
+    try:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        path = os.path.join(PROFILE_DIR, f"{tag}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.prof")
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield path
+        finally:
+            profiler.disable()
+            profiler.dump_stats(path)
+            print(f"[PROFILE] Wrote {path}", file=sys.stderr)
+    finally:
+        _profile_lock.release()
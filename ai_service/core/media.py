@@ -0,0 +1,291 @@
+import os
+import mmap
+import hashlib
+import tempfile
+from contextlib import contextmanager
+
+import cv2
+import numpy as np
+
+from config import DETECTION_MAX_SIDE, IMAGE_CROP_MIN_SIDE, DECODE_THREADS
+from core.cache import file_digest
+from core.metadata import parse_metadata
+
+SNIFF_BYTES = 32
+# JPEG frame headers (SOF0-SOF15 minus DHT, JPG and DAC)
+JPEG_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+# libjpeg scales the IDCT itself: a 1/8 decode does a fraction of the work
+REDUCED_DECODE_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+def sniff_media_type(head):
+    """
+    "image", "video" or None from the first bytes of a file (magic numbers),
+    so the matching decoder runs first instead of trying both.
+    """
+    if head.startswith(b"\xff\xd8\xff") or head.startswith(b"\x89PNG\r\n\x1a\n") \
+            or head[:6] in (b"GIF87a", b"GIF89a") or head.startswith(b"BM") \
+            or head[:4] in (b"II*\x00", b"MM\x00*"):
+        return "image"
+    if head[:4] == b"RIFF":
+        if head[8:12] == b"WEBP":
+            return "image"
+        if head[8:12] == b"AVI ":
+            return "video"
+        return None
+    if head[4:8] == b"ftyp":
+        # ISO BMFF: HEIC/AVIF stills vs MP4/MOV
+        if head[8:12] in (b"heic", b"heix", b"mif1", b"avif"):
+            return "image"
+        return "video"
+    if head[4:8] in (b"moov", b"mdat", b"wide", b"free", b"skip") \
+            or head.startswith(b"\x1a\x45\xdf\xa3") or head.startswith(b"FLV"):
+        return "video"
+    return None
+
+def jpeg_size(data):
+    """
+    (width, height) from a JPEG's frame header without decoding, or None.
+    """
+    if not data.startswith(b"\xff\xd8"):
+        return None
+    i = 2
+    while i + 4 <= len(data):
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:  # fill byte
+            i += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD8:  # no length field
+            i += 2
+            continue
+        if marker in JPEG_SOF_MARKERS:
+            if i + 9 > len(data):
+                return None
+            return int.from_bytes(data[i + 7:i + 9], "big"), int.from_bytes(data[i + 5:i + 7], "big")
+        if marker == 0xDA:  # scan data before any frame header
+            return None
+        i += 2 + int.from_bytes(data[i + 2:i + 4], "big")
+    return None
+
+def decode_reduced(data, factor):
+    return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), REDUCED_DECODE_FLAGS[factor])
+
+class ReducedImage:
+    """
+    A large JPEG held as its bytes plus a DCT-scaled preview. Hashing and
+    face detection run on the preview; face_regions() then decodes the image
+    again at the coarsest scale that keeps the faces found at least
+    IMAGE_CROP_MIN_SIDE px (reusing the preview when that is the preview's
+    scale), so the full-resolution image is only decoded for faces too small
+    for any reduction.
+    """
+    def __init__(self, data, preview, factor):
+        self.data = data
+        self.preview = preview
+        self.factor = factor
+
+    @classmethod
+    def decode(cls, source, detection_side=DETECTION_MAX_SIDE):
+        """
+        ReducedImage for a JPEG source larger than the detection resolution,
+        or None (decode the image as usual).
+        """
+        if not detection_side or source.data is None:
+            return None
+        size = jpeg_size(source.data)
+        if size is None:
+            return None
+        longer = max(size)
+        factor = max((f for f in (8, 4, 2) if -(-longer // f) >= detection_side), default=1)
+        if factor == 1:
+            return None
+        preview = decode_reduced(source.data, factor)
+        return cls(source.data, preview, factor) if preview is not None else None
+
+    def face_regions(self, boxes, min_side=IMAGE_CROP_MIN_SIDE):
+        """
+        (image, boxes mapped into it) to cut the faces at boxes (preview
+        coordinates) from.
+        """
+        smallest = min(min(w, h) for _, _, w, h in boxes) * self.factor  # full-resolution px
+        factor = 1
+        if min_side:
+            factor = max((f for f in (8, 4, 2) if f <= self.factor and smallest / f >= min_side), default=1)
+        image = self.preview if factor == self.factor else decode_reduced(self.data, factor)
+        if image is None:
+            return self.preview, list(boxes)
+        sy = image.shape[0] / self.preview.shape[0]
+        sx = image.shape[1] / self.preview.shape[1]
+        return image, [(int(x * sx), int(y * sy), int(w * sx), int(h * sy)) for x, y, w, h in boxes]
+
+def _capture(path):
+    # FFmpeg sizes its decoder pool by the core count, not cv2.setNumThreads
+    if DECODE_THREADS > 0:
+        return cv2.VideoCapture(path, cv2.CAP_ANY, [cv2.CAP_PROP_N_THREADS, DECODE_THREADS])
+    return cv2.VideoCapture(path)
+
+class MediaSource:
+    """
+    Media to verify: a path on disk, or bytes already in memory (upload
+    buffer, stdin/inherited fd, shared-memory segment). Images held in memory
+    are decoded with cv2.imdecode; videos are read from an anonymous memory
+    file (Linux), so neither touches the disk. close() releases what
+    open_video() had to create.
+    """
+    def __init__(self, path=None, data=None, name=None):
+        self.path = path
+        self.data = data
+        self.name = name or path or "<memory>"
+        self._kind = False  # not sniffed yet (None = unknown type)
+        self._metadata = None
+        self._memfd = None
+        self._spill_path = None
+
+    @classmethod
+    def of(cls, media):
+        """
+        MediaSource from a MediaSource, a path or bytes.
+        """
+        if isinstance(media, MediaSource):
+            return media
+        if isinstance(media, (bytes, bytearray, memoryview)):
+            return cls(data=bytes(media))
+        return cls(path=media)
+
+    @classmethod
+    def from_fd(cls, fd):
+        """
+        Everything readable from an inherited file descriptor or pipe (stdin = 0).
+        """
+        with os.fdopen(fd, "rb", closefd=fd != 0) as f:
+            return cls(data=f.read(), name=f"<fd {fd}>")
+
+    @classmethod
+    def from_shm(cls, name, size=None):
+        """
+        Copy of a shared-memory segment created by the caller. size is the
+        media length (segments are rounded up to whole pages).
+        """
+        from multiprocessing import shared_memory
+        try:
+            shm = shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+        except TypeError:
+            shm = shared_memory.SharedMemory(name=name)
+            if os.name == "posix":
+                # Attaching registers the segment for cleanup: the caller owns it
+                from multiprocessing import resource_tracker
+                resource_tracker.unregister(shm._name, "shared_memory")
+        try:
+            data = bytes(shm.buf[:size] if size else shm.buf)
+        finally:
+            shm.close()
+        return cls(data=data, name=f"<shm {name}>")
+
+    def head(self):
+        if self.data is not None:
+            return self.data[:SNIFF_BYTES]
+        try:
+            with open(self.path, "rb") as f:
+                return f.read(SNIFF_BYTES)
+        except OSError:
+            return b""
+
+    @property
+    def kind(self):
+        if self._kind is False:
+            self._kind = sniff_media_type(self.head())
+            if self._kind == "image" and self.data is None and self.path is not None:
+                # Images are small: read once, then digest and decode from memory
+                try:
+                    with open(self.path, "rb") as f:
+                        self.data = f.read()
+                except OSError:
+                    pass
+        return self._kind
+
+    @contextmanager
+    def view(self):
+        """
+        The media as a sliceable buffer without reading it: an mmap of the
+        file (pages are read only when touched) or the in-memory bytes.
+        """
+        if self.data is not None:
+            yield self.data
+            return
+        with open(self.path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                yield b""
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                yield view
+
+    def metadata(self):
+        """
+        MediaMetadata from the container headers, parsed on first use: the
+        deepfake and context checks of a combined call share one parse.
+        """
+        if self._metadata is None:
+            with self.view() as buf:
+                self._metadata = parse_metadata(buf)
+        return self._metadata
+
+    def exists(self):
+        return self.data is not None or os.path.exists(self.path)
+
+    def size(self):
+        return len(self.data) if self.data is not None else os.path.getsize(self.path)
+
+    def digest(self):
+        if self.data is not None:
+            return hashlib.sha256(self.data).hexdigest()
+        return file_digest(self.path)
+
+    def decode_image(self):
+        """
+        BGR image, or None if the bytes are not a decodable image.
+        """
+        if self.data is not None:
+            return cv2.imdecode(np.frombuffer(self.data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        return cv2.imread(self.path)
+
+    def open_video(self):
+        """
+        cv2.VideoCapture over the media. In-memory media goes through a
+        memfd on Linux; elsewhere it is spilled to a temp file. Either is
+        written once, shared by every capture of this source (admission probe,
+        pipeline) and released by close(). (OpenCV's Python stream reader would avoid both, but it calls
+        back into Python without the GIL and crashes next to the pipeline's
+        threads.)
+        """
+        if self.data is None:
+            return _capture(self.path)
+        if hasattr(os, "memfd_create"):
+            if self._memfd is None:
+                f = os.fdopen(os.memfd_create("deepfakeguard-media"), "w+b")
+                f.write(self.data)
+                f.flush()
+                self._memfd = f
+            # Each capture opens its own descriptor (and file offset)
+            return _capture(f"/proc/self/fd/{self._memfd.fileno()}")
+        if self._spill_path is None:
+            with tempfile.NamedTemporaryFile(prefix="deepfakeguard-", delete=False) as f:
+                f.write(self.data)
+                self._spill_path = f.name
+        return _capture(self._spill_path)
+
+    def close(self):
+        if self._memfd is not None:
+            self._memfd.close()
+            self._memfd = None
+        if self._spill_path is not None:
+            try:
+                os.remove(self._spill_path)
+            except OSError:
+                pass
+            self._spill_path = None
@@ -0,0 +1,451 @@
+import os
+import re
+import mmap
+import time
+from datetime import datetime
+
+# Container metadata, parsed in pure Python from the header ranges only:
+#   MP4/MOV  box tree (mdat is skipped by its size, never read)
+#   JPEG     APP1 EXIF/XMP, APP11 JUMBF (C2PA), up to the first scan
+#   PNG      eXIf, tEXt/iTXt (XMP), caBX (C2PA)
+#   WebP     EXIF, XMP , C2PA chunks
+# `buf` is a bytes-like object supporting len() and slicing: an mmap of the
+# file (only the touched pages are read) or the bytes of an in-memory upload.
+
+MP4_EPOCH_OFFSET = 2082844800  # seconds from 1904-01-01 to 1970-01-01
+MIN_PLAUSIBLE_TIME = 86400 * 365  # "0" timestamps decode to 1904/1970: ignore
+MAX_BOXES = 4096                  # boxes/chunks/segments/IFD entries per parse, all levels together
+MAX_SEGMENT_READ = 1 << 20        # bytes of one metadata segment/box parsed
+MAX_PARSE_BYTES = 4 << 20         # metadata payload bytes copied per parse
+BULK_MIN_SIZE = 4096              # media-data boxes/chunks this large are stepped over uncounted
+BULK_KINDS = {b"mdat", b"moof", b"free", b"skip", b"IDAT"}
+C2PA_BMFF_UUID = bytes.fromhex("d8fec3d61b0e483c92975828877ec481")
+XMP_BMFF_UUID = bytes.fromhex("be7acfcb97a942e89c71999491e3afac")
+MP4_CONTAINERS = {b"moov", b"trak", b"mdia", b"minf", b"udta", b"ilst", b"edts", b"stbl"}
+MP4_TEXT_TAGS = {
+    b"\xa9too": "encoder", b"\xa9swr": "software", b"\xa9enc": "encoder",
+    b"\xa9mak": "make", b"\xa9mod": "model", b"\xa9day": "date",
+}
+QUICKTIME_KEYS = {
+    "com.apple.quicktime.make": "make",
+    "com.apple.quicktime.model": "model",
+    "com.apple.quicktime.software": "software",
+    "com.apple.quicktime.creationdate": "date",
+}
+EXIF_TAGS = {0x010F: "make", 0x0110: "model", 0x0131: "software", 0x0132: "modify_date",
+             0x9003: "date_original", 0x9011: "offset_original"}
+EXIF_IFD_POINTER = 0x8769
+XMP_DATE_RE = re.compile(rb'(?:xmp:CreateDate|photoshop:DateCreated|exif:DateTimeOriginal)\s*(?:=\s*"|>)([^"<]+)')
+XMP_TOOL_RE = re.compile(rb'(?:xmp:CreatorTool|tiff:Software)\s*(?:=\s*"|>)([^"<]+)')
+AI_SOURCE_MARKER = b"trainedAlgorithmicMedia"  # IPTC digital source type, also used in C2PA assertions
+
+class MediaMetadata:
+    """
+    What the header parse found. Text fields are None when absent;
+    creation_time is POSIX seconds (EXIF local times are read as local).
+    """
+    def __init__(self, container=None):
+        self.container = container
+        self.make = None
+        self.model = None
+        self.software = None
+        self.encoder = None
+        self.creation_time = None
+        self.creation_source = None
+        self.has_exif = False
+        self.has_xmp = False
+        self.has_c2pa = False
+        self.ai_source_declared = False
+        self.duration_s = None  # MP4/MOV: movie header duration
+        self.width = None       # MP4/MOV: first track with a picture size
+        self.height = None
+        self.truncated = False  # structure ran past the end of the file (or the parse budget)
+        # Parse budget, shared by the whole walk so nesting cannot multiply it
+        self._boxes_left = MAX_BOXES
+        self._bytes_left = MAX_PARSE_BYTES
+
+    def set_time(self, value, source):
+        # Keep the first (most trusted) source found
+        if value is not None and value >= MIN_PLAUSIBLE_TIME and self.creation_time is None:
+            self.creation_time = value
+            self.creation_source = source
+
+    def as_dict(self):
+        return {k: v for k, v in vars(self).items() if v not in (None, False) and not k.startswith("_")}
+
+    def take_box(self, kind=None, size=0):
+        """
+        Charge one box/chunk/entry to the parse budget; False (and truncated)
+        once it is spent. Large media-data boxes are free: a file can only
+        hold len/BULK_MIN_SIZE of them, and a big PNG has thousands of IDATs.
+        """
+        if kind in BULK_KINDS and size >= BULK_MIN_SIZE:
+            return True
+        if self._boxes_left <= 0:
+            self.truncated = True
+            return False
+        self._boxes_left -= 1
+        return True
+
+    def read(self, buf, start, end):
+        """
+        bytes of buf[start:end], at most MAX_SEGMENT_READ and what is left of
+        the parse's byte budget (running out sets truncated).
+        """
+        size = max(0, min(end - start, MAX_SEGMENT_READ))
+        if size > self._bytes_left:
+            self.truncated = True
+            size = self._bytes_left
+        self._bytes_left -= size
+        return bytes(buf[start:start + size])
+
+def _u16(b, i, big=True):
+    return int.from_bytes(b[i:i + 2], "big" if big else "little")
+
+def _u32(b, i, big=True):
+    return int.from_bytes(b[i:i + 4], "big" if big else "little")
+
+def _text(raw):
+    return bytes(raw).split(b"\x00", 1)[0].decode("utf-8", "replace").strip() or None
+
+def parse_time(text):
+    """
+    POSIX seconds from EXIF ("2024:05:01 10:00:00"), ISO 8601 or QuickTime
+    date strings; None if unparseable. Times without a zone are local.
+    """
+    if not text:
+        return None
+    text = text.strip().replace("Z", "+00:00")
+    if re.match(r"^\d{4}:\d{2}:\d{2} ", text):
+        text = text.replace(":", "-", 2)
+    # 2024-05-01T10:00:00+0200 -> +02:00
+    text = re.sub(r"([+-]\d{2})(\d{2})$", r"\1:\2", text)
+    try:
+        parsed = datetime.fromisoformat(text.replace(" ", "T", 1))
+    except ValueError:
+        try:
+            parsed = datetime.strptime(text[:10], "%Y-%m-%d")
+        except ValueError:
+            return None
+    if parsed.tzinfo is None:
+        return time.mktime(parsed.timetuple())
+    return parsed.timestamp()
+
+# --- ISO BMFF (MP4/MOV/HEIC) ---
+
+def _boxes(buf, start, end, meta):
+    """
+    (type, payload start, box end) for the boxes in [start, end).
+    """
+    i = start
+    while i + 8 <= end:
+        size = _u32(buf, i)
+        kind = bytes(buf[i + 4:i + 8])
+        header = 8
+        if size == 1:
+            if i + 16 > end:
+                meta.truncated = True
+                return
+            size = int.from_bytes(buf[i + 8:i + 16], "big")
+            header = 16
+        elif size == 0:
+            size = end - i
+        if size < header:
+            meta.truncated = True
+            return
+        if i + size > end:
+            meta.truncated = True
+            size = end - i
+        if not meta.take_box(kind, size):
+            return
+        yield kind, i + header, i + size
+        i += size
+
+def _parse_mvhd(buf, start, end, meta):
+    version = buf[start]
+    if version == 1:
+        created = int.from_bytes(buf[start + 4:start + 12], "big")
+        timescale = _u32(buf, start + 20)
+        duration = int.from_bytes(buf[start + 24:start + 32], "big")
+    else:
+        created = _u32(buf, start + 4)
+        timescale = _u32(buf, start + 12)
+        duration = _u32(buf, start + 16)
+    if created:
+        meta.set_time(created - MP4_EPOCH_OFFSET, "mvhd")
+    # Fragmented files leave it 0; all ones means unknown
+    if timescale and duration and duration not in (0xFFFFFFFF, 0xFFFFFFFFFFFFFFFF):
+        meta.duration_s = duration / timescale
+
+def _parse_tkhd(buf, start, end, meta):
+    # Width/height are 16.16 fixed point after the matrix; audio tracks have 0
+    i = start + (88 if buf[start] == 1 else 76)
+    if meta.width is None and i + 8 <= end:
+        width, height = _u32(buf, i) >> 16, _u32(buf, i + 4) >> 16
+        if width and height:
+            meta.width, meta.height = width, height
+
+def _item_text(buf, start, end, meta):
+    """
+    Text of an ilst item: a "data" box (type 1 = UTF-8) or, for old
+    QuickTime udta strings, a 16-bit length + language + text.
+    """
+    if bytes(buf[start + 4:start + 8]) == b"data":
+        for kind, payload, box_end in _boxes(buf, start, end, meta):
+            if kind == b"data":
+                return _text(meta.read(buf, payload + 8, box_end))
+        return None
+    if end - start > 4:
+        length = _u16(buf, start)
+        return _text(buf[start + 4:min(end, start + 4 + length)])
+    return None
+
+def _apply_tag(meta, field, value, source):
+    if not value:
+        return
+    if field == "date":
+        meta.set_time(parse_time(value), source)
+    elif getattr(meta, field) is None:
+        setattr(meta, field, value)
+
+def _parse_meta_box(buf, start, end, meta):
+    """
+    "meta" box: iTunes-style ilst, or QuickTime keys + ilst (indexed by key).
+    """
+    # ISO meta is a full box (version/flags first); QuickTime's is not
+    if bytes(buf[start + 4:start + 8]) not in (b"hdlr", b"keys", b"ilst"):
+        start += 4
+    keys = []
+    for kind, payload, box_end in _boxes(buf, start, end, meta):
+        if kind == b"keys":
+            entries = _u32(buf, payload + 4)
+            i = payload + 8
+            for _ in range(entries):
+                size = _u32(buf, i)
+                if size < 8 or i + size > box_end or not meta.take_box():
+                    break
+                keys.append(_text(buf[i + 8:i + size]))
+                i += size
+        elif kind == b"ilst":
+            for item, item_start, item_end in _boxes(buf, payload, box_end, meta):
+                if item in MP4_TEXT_TAGS:
+                    _apply_tag(meta, MP4_TEXT_TAGS[item], _item_text(buf, item_start, item_end, meta), "mp4_tag")
+                else:
+                    index = int.from_bytes(item, "big") - 1
+                    if 0 <= index < len(keys) and keys[index] in QUICKTIME_KEYS:
+                        _apply_tag(meta, QUICKTIME_KEYS[keys[index]], _item_text(buf, item_start, item_end, meta), "quicktime")
+        elif kind == b"xml " or kind == b"XMP_":
+            _parse_xmp(meta.read(buf, payload, box_end), meta)
+
+def _parse_bmff(buf, start, end, meta, depth=0):
+    for kind, payload, box_end in _boxes(buf, start, end, meta):
+        if kind == b"mdat":
+            continue  # media data: never read
+        if kind == b"mvhd":
+            _parse_mvhd(buf, payload, box_end, meta)
+        elif kind == b"tkhd":
+            _parse_tkhd(buf, payload, box_end, meta)
+        elif kind == b"meta":
+            _parse_meta_box(buf, payload, box_end, meta)
+        elif kind in MP4_TEXT_TAGS:
+            _apply_tag(meta, MP4_TEXT_TAGS[kind], _item_text(buf, payload, box_end, meta), "mp4_tag")
+        elif kind == b"uuid":
+            uuid = bytes(buf[payload:payload + 16])
+            if uuid == C2PA_BMFF_UUID:
+                meta.has_c2pa = True
+                _scan_c2pa(buf, payload + 16, box_end, meta)
+            elif uuid == XMP_BMFF_UUID:
+                _parse_xmp(meta.read(buf, payload + 16, box_end), meta)
+        elif kind == b"jumb":
+            meta.has_c2pa = True
+            _scan_c2pa(buf, payload, box_end, meta)
+        elif kind in MP4_CONTAINERS and depth < 6:
+            _parse_bmff(buf, payload, box_end, meta, depth + 1)
+
+# --- EXIF / XMP / C2PA payloads ---
+
+def _parse_exif(tiff, meta):
+    """
+    IFD0 and the Exif IFD of a TIFF-structured EXIF block.
+    """
+    meta.has_exif = True
+    if len(tiff) < 8 or tiff[:2] not in (b"II", b"MM"):
+        return
+    big = tiff[:2] == b"MM"
+    values = {}
+
+    def read_ifd(offset, depth=0):
+        if offset + 2 > len(tiff) or depth > 2:
+            return
+        entries = _u16(tiff, offset, big)
+        for n in range(min(entries, 512)):
+            entry = offset + 2 + n * 12
+            if entry + 12 > len(tiff) or not meta.take_box():
+                return
+            tag, kind, count = _u16(tiff, entry, big), _u16(tiff, entry + 2, big), _u32(tiff, entry + 4, big)
+            if tag == EXIF_IFD_POINTER:
+                read_ifd(_u32(tiff, entry + 8, big), depth + 1)
+            elif tag in EXIF_TAGS and kind == 2:  # ASCII
+                start = entry + 8 if count <= 4 else _u32(tiff, entry + 8, big)
+                values[EXIF_TAGS[tag]] = _text(tiff[start:start + min(count, 256)])
+
+    read_ifd(_u32(tiff, 4, big))
+    for field in ("make", "model", "software"):
+        if values.get(field) and getattr(meta, field) is None:
+            setattr(meta, field, values[field])
+    original = values.get("date_original")
+    if original and values.get("offset_original"):
+        original += values["offset_original"]
+    meta.set_time(parse_time(original), "exif")
+    meta.set_time(parse_time(values.get("modify_date")), "exif_modified")
+
+def _parse_xmp(packet, meta):
+    meta.has_xmp = True
+    if AI_SOURCE_MARKER in packet:
+        meta.ai_source_declared = True
+    match = XMP_DATE_RE.search(packet)
+    if match:
+        meta.set_time(parse_time(match.group(1).decode("utf-8", "replace")), "xmp")
+    match = XMP_TOOL_RE.search(packet)
+    if match and meta.software is None:
+        meta.software = match.group(1).decode("utf-8", "replace").strip()
+
+def _scan_c2pa(buf, start, end, meta):
+    """
+    C2PA manifests are not validated here, only checked for a declared
+    AI-generated source.
+    """
+    if AI_SOURCE_MARKER in meta.read(buf, start, end):
+        meta.ai_source_declared = True
+
+# --- JPEG / PNG / WebP ---
+
+def _parse_jpeg(buf, meta):
+    i = 2
+    n = len(buf)
+    while i + 4 <= n:
+        if buf[i] != 0xFF:
+            return
+        marker = buf[i + 1]
+        if marker == 0xFF:
+            i += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD8:
+            i += 2
+            continue
+        if marker in (0xDA, 0xD9):  # start of scan / end of image: headers done
+            return
+        length = _u16(buf, i + 2)
+        if not meta.take_box():
+            return
+        if marker not in (0xE1, 0xEB):
+            i += 2 + length
+            continue
+        segment = meta.read(buf, i + 4, i + 2 + length)
+        if marker == 0xE1 and segment.startswith(b"Exif\x00\x00"):
+            _parse_exif(segment[6:], meta)
+        elif marker == 0xE1 and segment.startswith(b"http://ns.adobe.com/xap/1.0/\x00"):
+            _parse_xmp(segment, meta)
+        elif marker == 0xEB and segment.startswith(b"JP") and b"jumb" in segment[:64]:
+            meta.has_c2pa = meta.has_c2pa or b"c2pa" in segment
+            if AI_SOURCE_MARKER in segment:
+                meta.ai_source_declared = True
+        i += 2 + length
+    meta.truncated = True
+
+def _parse_png(buf, meta):
+    i = 8
+    n = len(buf)
+    while i + 8 <= n:
+        length = _u32(buf, i)
+        kind = bytes(buf[i + 4:i + 8])
+        start = i + 8
+        if kind == b"IEND":
+            return
+        if not meta.take_box(kind, length):
+            return
+        if kind in (b"eXIf", b"iTXt", b"tEXt", b"caBX"):
+            chunk = meta.read(buf, start, start + length)
+            if kind == b"eXIf":
+                _parse_exif(chunk, meta)
+            elif kind == b"iTXt" and chunk.startswith(b"XML:com.adobe.xmp\x00"):
+                _parse_xmp(chunk, meta)
+            elif kind == b"tEXt":
+                key, _, value = chunk.partition(b"\x00")
+                if key == b"Software" and meta.software is None:
+                    meta.software = _text(value)
+                elif key == b"Creation Time":
+                    meta.set_time(parse_time(_text(value)), "png_text")
+            elif kind == b"caBX":
+                meta.has_c2pa = True
+                if AI_SOURCE_MARKER in chunk:
+                    meta.ai_source_declared = True
+        i = start + length + 4  # data + CRC
+    meta.truncated = True
+
+def _parse_riff(buf, meta):
+    i = 12
+    n = min(len(buf), 8 + _u32(buf, 4, big=False))
+    while i + 8 <= n:
+        kind = bytes(buf[i:i + 4])
+        length = _u32(buf, i + 4, big=False)
+        start = i + 8
+        if not meta.take_box():
+            return
+        if kind in (b"EXIF", b"XMP ", b"C2PA"):
+            chunk = meta.read(buf, start, start + length)
+            if kind == b"EXIF":
+                _parse_exif(chunk[6:] if chunk.startswith(b"Exif\x00\x00") else chunk, meta)
+            elif kind == b"XMP ":
+                _parse_xmp(chunk, meta)
+            else:
+                meta.has_c2pa = True
+                if AI_SOURCE_MARKER in chunk:
+                    meta.ai_source_declared = True
+        i = start + length + (length & 1)  # chunks are padded to even sizes
+
+def parse_metadata(buf):
+    """
+    MediaMetadata for the media in buf (see the module notes). Never raises
+    on malformed input; structure errors set truncated.
+    """
+    head = bytes(buf[:16])
+    if head.startswith(b"\xff\xd8"):
+        meta = MediaMetadata("jpeg")
+        parse = _parse_jpeg
+    elif head.startswith(b"\x89PNG\r\n\x1a\n"):
+        meta = MediaMetadata("png")
+        parse = _parse_png
+    elif head[:4] == b"RIFF" and head[8:12] in (b"WEBP", b"AVI "):
+        meta = MediaMetadata("webp" if head[8:12] == b"WEBP" else "avi")
+        parse = _parse_riff
+    elif head[4:8] in (b"ftyp", b"moov", b"mdat", b"wide", b"free", b"skip"):
+        meta = MediaMetadata("mp4")
+        parse = lambda b, m: _parse_bmff(b, 0, len(b), m)
+    else:
+        return MediaMetadata()
+    try:
+        parse(buf, meta)
+    except (IndexError, ValueError, OverflowError):
+        meta.truncated = True
+    return meta
+
+def read_metadata(path):
+    """
+    parse_metadata over an mmap of the file at path (for callers that do not
+    hold a MediaSource, e.g. the context check).
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return MediaMetadata()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            return parse_metadata(buf)
+
+def age_hours(meta, now=None):
+    """
+    Hours since the media's embedded creation time, or None without one.
+    """
+    if meta.creation_time is None:
+        return None
+    now = time.time() if now is None else now
+    return (now - meta.creation_time) / 3600
@@ -1,29 +1,188 @@
 import os
+import sys
 import cv2
+import threading
 import numpy as np
-import onnxruntime as ort
-from PIL import Image
+
+from config import (
+    ORT_INTRA_OP_THREADS, ORT_INTER_OP_THREADS, ORT_EXECUTION_MODE,
+    ORT_GRAPH_OPT_LEVEL, ORT_CACHE_OPTIMIZED_MODEL, ORT_CACHE_DIR, ORT_WARMUP_RUNS
+)
+
+INPUT_SIZE = 224
+# ImageNet normalization: mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225]
+IMAGENET_MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32)
+IMAGENET_STD = np.array([0.229, 0.224, 0.225], dtype=np.float32)
+
+class BatchPreprocessor:
+    """
+    Writes face crops straight into a reusable float32 NCHW buffer.
+    (x / 255 - mean) / std is folded into one multiply-add per channel,
+    x * scale + bias, done by cv2.addWeighted directly into the buffer plane;
+    BGR -> RGB is a channel index swap. No per-crop float intermediates and
+    no np.concatenate. Buffers are per thread (server requests run concurrently)
+    and only grow.
+    """
+    def __init__(self, size=INPUT_SIZE):
+        self.size = size
+        self.scale = [float(v) for v in 1.0 / (255.0 * IMAGENET_STD)]
+        self.bias = [float(v) for v in -IMAGENET_MEAN / IMAGENET_STD]
+        self._local = threading.local()
+
+    def buffer(self, n):
+        buf = getattr(self._local, "buf", None)
+        if buf is None or buf.shape[0] < n:
+            capacity = 1
+            while capacity < n:
+                capacity *= 2
+            buf = np.empty((capacity, 3, self.size, self.size), dtype=np.float32)
+            self._local.buf = buf
+            self._local.resized = np.empty((self.size, self.size, 3), dtype=np.uint8)
+        # Leading-axis slice of a C-contiguous array: still contiguous, no copy
+        return buf[:n]
+
+    def fill(self, face_crops_bgr):
+        batch = self.buffer(len(face_crops_bgr))
+        resized = self._local.resized
+        for i, crop in enumerate(face_crops_bgr):
+            if crop.shape[:2] != (self.size, self.size):
+                crop = cv2.resize(crop, (self.size, self.size), dst=resized, interpolation=cv2.INTER_LINEAR)
+            planes = cv2.split(crop)  # B, G, R
+            for c in range(3):
+                plane = planes[2 - c]
+                cv2.addWeighted(plane, self.scale[c], plane, 0.0, self.bias[c], dst=batch[i, c], dtype=cv2.CV_32F)
+        return batch
+
+# ort.GraphOptimizationLevel member names (onnxruntime is imported on first session)
+GRAPH_OPT_LEVELS = {
+    "disabled": "ORT_DISABLE_ALL",
+    "basic": "ORT_ENABLE_BASIC",
+    "extended": "ORT_ENABLE_EXTENDED",
+    "all": "ORT_ENABLE_ALL",
+}
+
+def optimized_model_path(model_path, graph_opt_level, ort_version, cache_dir=ORT_CACHE_DIR):
+    """
+    Cache file of the optimised graph: keyed on the model file (mtime, size),
+    the optimisation level and the onnxruntime version, so a new model, level
+    or runtime never loads a stale graph.
+    """
+    st = os.stat(model_path)
+    root = os.path.splitext(os.path.basename(model_path))[0]
+    return os.path.join(
+        cache_dir, f"{root}.{st.st_mtime_ns:x}-{st.st_size:x}.{graph_opt_level}.ort{ort_version}.opt.onnx"
+    )
+
+def create_session(model_path, intra_op_threads=ORT_INTRA_OP_THREADS, inter_op_threads=ORT_INTER_OP_THREADS,
+                   execution_mode=ORT_EXECUTION_MODE, graph_opt_level=ORT_GRAPH_OPT_LEVEL,
+                   cache_optimized=ORT_CACHE_OPTIMIZED_MODEL, cache_dir=ORT_CACHE_DIR):
+    """
+    CPU InferenceSession with explicit thread counts and graph optimisation.
+    With cache_optimized, the optimised graph is written to cache_dir on
+    first load and later loads read it back with optimisation disabled,
+    skipping the graph rewrite. The cache is best effort: if it cannot be
+    read or written the model is loaded and optimised as usual.
+    """
+    import onnxruntime as ort
+
+    def session(path, optimize=True, optimized_path=None):
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = intra_op_threads
+        options.inter_op_num_threads = inter_op_threads
+        options.execution_mode = (
+            ort.ExecutionMode.ORT_PARALLEL if execution_mode == "parallel" else ort.ExecutionMode.ORT_SEQUENTIAL
+        )
+        options.graph_optimization_level = getattr(
+            ort.GraphOptimizationLevel,
+            GRAPH_OPT_LEVELS.get(graph_opt_level, "ORT_ENABLE_ALL") if optimize else "ORT_DISABLE_ALL"
+        )
+        if optimized_path is not None:
+            options.optimized_model_filepath = optimized_path
+            options.log_severity_level = 3  # Expected "hardware specific optimizations" warning
+        return ort.InferenceSession(path, sess_options=options, providers=['CPUExecutionProvider'])
+
+    if not cache_optimized or graph_opt_level == "disabled":
+        return session(model_path)
+
+    cached = optimized_model_path(model_path, graph_opt_level, ort.__version__, cache_dir)
+    if os.path.exists(cached):
+        try:
+            return session(cached, optimize=False)
+        except Exception as e:
+            print(f"[AI-MODEL] Ignoring unreadable optimised model {cached}: {e}", file=sys.stderr)
+            return session(model_path)
+
+    # Written to a private name first so concurrent workers never read a partial file
+    tmp_path = f"{cached}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        result = session(model_path, optimized_path=tmp_path)
+    except Exception as e:
+        # e.g. a read-only cache dir: ORT fails writing the optimised graph
+        print(f"[AI-MODEL] Could not cache optimised model in {cache_dir}: {e}", file=sys.stderr)
+        _remove_quietly(tmp_path)
+        return session(model_path)
+    try:
+        os.replace(tmp_path, cached)
+    except OSError as e:
+        print(f"[AI-MODEL] Could not cache optimised model: {e}", file=sys.stderr)
+        _remove_quietly(tmp_path)
+    return result
+
+def _remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
 
 class EfficientNetONNXDetector:
-    def __init__(self, model_path):
+    def __init__(self, model_path, lazy=False):
         """
         Load the EfficientNet ONNX model using ONNX Runtime with CPUExecutionProvider only.
+        lazy: defer the load (and the onnxruntime import) to the first
+        prediction, so CLI runs that fail closed before inference never pay it.
         """
         self.model_path = model_path
         self.session = None
-        
-        if os.path.exists(model_path):
-            try:
-                # Use CPUExecutionProvider only as per requirement
-                self.session = ort.InferenceSession(
-                    model_path, 
-                    providers=['CPUExecutionProvider']
-                )
-                print(f"[AI-MODEL] Loaded EfficientNet-B0 from {model_path}")
-            except Exception as e:
-                print(f"[AI-MODEL] Error loading ONNX model: {e}")
-        else:
-            print(f"[AI-MODEL] WARNING: Model file not found at {model_path}")
+        self.batch_preprocessor = BatchPreprocessor()
+        self._load_lock = threading.Lock()
+        self._loaded = False
+        if not lazy:
+            self.load()
+
+    def load(self):
+        """
+        Create the session on the first call; later calls return it (None if
+        the model is missing or failed to load).
+        """
+        with self._load_lock:
+            if self._loaded:
+                return self.session
+            self._loaded = True
+            if os.path.exists(self.model_path):
+                try:
+                    # Use CPUExecutionProvider only as per requirement
+                    session = create_session(self.model_path)
+                    self.input_name = session.get_inputs()[0].name
+                    self.output_name = session.get_outputs()[0].name
+                    self.session = session
+                    self.warmup()
+                    print(f"[AI-MODEL] Loaded EfficientNet-B0 from {self.model_path}")
+                except Exception as e:
+                    self.session = None
+                    print(f"[AI-MODEL] Error loading ONNX model: {e}")
+            else:
+                print(f"[AI-MODEL] WARNING: Model file not found at {self.model_path}")
+        return self.session
+
+    def warmup(self, runs=ORT_WARMUP_RUNS):
+        """
+        Run a dummy batch so arena allocation and kernel selection happen at
+        load time rather than on the first upload.
+        """
+        dummy = np.zeros((1, INPUT_SIZE, INPUT_SIZE, 3), dtype=np.uint8)
+        for _ in range(runs):
+            self.run_batch(self.batch_preprocessor.fill(list(dummy)))
 
     def preprocess(self, face_crop_bgr):
         """
@@ -34,15 +193,13 @@ class EfficientNetONNXDetector:
         img = cv2.cvtColor(face_crop_bgr, cv2.COLOR_BGR2RGB)
         
         # 2. Resize to 224x224
-        img = cv2.resize(img, (224, 224), interpolation=cv2.INTER_LINEAR)
+        img = cv2.resize(img, (INPUT_SIZE, INPUT_SIZE), interpolation=cv2.INTER_LINEAR)
         
         # 3. Normalize to [0, 1]
         img = img.astype(np.float32) / 255.0
         
-        # 4. ImageNet normalization: mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225]
-        mean = np.array([0.485, 0.456, 0.406], dtype=np.float32)
-        std = np.array([0.229, 0.224, 0.225], dtype=np.float32)
-        img = (img - mean) / std
+        # 4. ImageNet normalization
+        img = (img - IMAGENET_MEAN) / IMAGENET_STD
         
         # 5. HWC -> CHW
         img = img.transpose(2, 0, 1)
@@ -56,16 +213,15 @@ class EfficientNetONNXDetector:
         Run EfficientNet inference via ONNX Runtime (CPU).
         Return a single probability score (0-1).
         """
-        if self.session is None:
+        if self.session is None and self.load() is None:
             # FAIL-CLOSED: If model missing or error, return high risk (1.0)
             return 1.0
             
         try:
             input_tensor = self.preprocess(face_crop_bgr)
-            input_name = self.session.get_inputs()[0].name
             
             # Inference
-            outputs = self.session.run(None, {input_name: input_tensor})
+            outputs = self.session.run(None, {self.input_name: input_tensor})
             
             # The model output is a single probability score (0-1)
             # Depending on the output layer, it might be [ [score] ] or [ [logits] ]
@@ -84,20 +240,28 @@ class EfficientNetONNXDetector:
         """
         Use batch inference when processing multiple frames for efficiency.
         """
-        if not face_crops_bgr or self.session is None:
+        if not face_crops_bgr or (self.session is None and self.load() is None):
             return [1.0] * len(face_crops_bgr) if face_crops_bgr else []
             
         try:
-            # Batch preprocessing
-            batch_tensors = [self.preprocess(crop) for crop in face_crops_bgr]
-            input_batch = np.concatenate(batch_tensors, axis=0)
-            
-            input_name = self.session.get_inputs()[0].name
-            outputs = self.session.run(None, {input_name: input_batch})
+            # Batch preprocessing into the reusable NCHW buffer
+            input_batch = self.batch_preprocessor.fill(face_crops_bgr)
+            output = self.run_batch(input_batch)
             
-            scores = outputs[0].flatten().tolist()
+            scores = output.flatten().tolist()
             return [np.clip(s, 0.0, 1.0) for s in scores]
             
         except Exception as e:
             print(f"[AI-MODEL] Batch inference error: {e}")
             return [1.0] * len(face_crops_bgr)
+
+    def run_batch(self, input_batch):
+        """
+        Run a preprocessed NCHW batch through ONNX Runtime with IO binding:
+        the session reads the buffer in place instead of copying the feed.
+        """
+        binding = self.session.io_binding()
+        binding.bind_cpu_input(self.input_name, input_batch)
+        binding.bind_output(self.output_name)
+        self.session.run_with_iobinding(binding)
+        return binding.copy_outputs_to_cpu()[0]
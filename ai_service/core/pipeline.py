@@ -0,0 +1,212 @@
+import cv2
+import time
+import heapq
+import queue
+import threading
+from collections import namedtuple, deque
+from concurrent.futures import ThreadPoolExecutor, Future
+
+from config import PIPELINE_WORKERS, PIPELINE_QUEUE_SIZE, FACE_CROP_SIZE, MAX_FACES_PER_FRAME
+from core.cache import dhash
+from core.media import ReducedImage
+
+# One analysed face in one frame. Only the fixed-size crop survives; the full
+# frame and the native-resolution ROIs are dropped as soon as the worker returns.
+# Faces reused from the near-duplicate cache carry their model_score and no crop.
+# artifact_measures: the heuristics' raw (hf_mean, lap_var, noise_level), or None.
+FaceSample = namedtuple(
+    "FaceSample",
+    ["timestamp", "face_id", "crop", "artifact_score", "artifact_signals", "frame_hash", "model_score",
+     "artifact_measures"],
+    defaults=(None, None, None)
+)
+
+_END = object()
+
+def prefetch(iterable, maxsize=PIPELINE_QUEUE_SIZE, timings=None):
+    """
+    Run a generator (frame decoding) on a background thread, handing items
+    over through a bounded queue so decode overlaps the stages downstream
+    and at most maxsize undelivered frames exist at any time.
+    timings: optional StageTimings, records the generator's time as "decode".
+    """
+    items = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+
+    def produce():
+        try:
+            iterator = iter(iterable)
+            while True:
+                started = time.perf_counter()
+                item = next(iterator, _END)
+                if timings is not None:
+                    timings.add("decode", time.perf_counter() - started)
+                if item is _END or stop.is_set():
+                    break
+                items.put(item)
+        except Exception as e:
+            items.put(e)
+            return
+        finally:
+            close = getattr(iterable, "close", None)
+            if close is not None:
+                close()  # Releases the VideoCapture held by the generator
+        items.put(_END)
+
+    threading.Thread(target=produce, name="frame-decoder", daemon=True).start()
+    try:
+        while True:
+            item = items.get()
+            if item is _END:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        # Consumer stopped early: unblock and retire the producer
+        stop.set()
+        while not items.empty():
+            items.get_nowait()
+
+class FramePipeline:
+    """
+    Streaming frame -> face crop pipeline.
+    Each decoded frame is face-detected and cropped, then released; the crops'
+    ROIs are scored by the artifact heuristics (one batch per frame) and each
+    face is resized to a fixed FACE_CROP_SIZE crop. Peak memory is bounded by
+    the crops rather than by full-resolution frames.
+    Decoding (prefetch thread), detection (in frame order, so the face track
+    carries over between frames) and preprocessing (worker pool) overlap;
+    OpenCV releases the GIL for all of them.
+    """
+    def __init__(self, face_analyzer, artifact_analyzer, workers=PIPELINE_WORKERS, max_faces=MAX_FACES_PER_FRAME):
+        self.face_analyzer = face_analyzer
+        self.artifact_analyzer = artifact_analyzer
+        self.workers = workers
+        self.max_faces = max(1, max_faces)
+        # Shared by concurrent requests in server mode
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="frame-worker")
+
+    def process_frame_faces(self, timestamp, frame_hash, faces, timings=None):
+        """
+        faces: [(face_id, face_crop, rois)] from one frame.
+        ROI artifact heuristics (one batch per frame) -> fixed-size crops.
+        """
+        started = time.perf_counter()
+        artifacts = self.artifact_analyzer.analyze_batch([rois for _, _, rois in faces], measured=True)
+        resized = time.perf_counter()
+        samples = [
+            FaceSample(
+                timestamp, face_id,
+                cv2.resize(face_crop, (FACE_CROP_SIZE, FACE_CROP_SIZE), interpolation=cv2.INTER_LINEAR),
+                art_score, art_sigs, frame_hash, None, art_measures
+            )
+            for (face_id, face_crop, _), (art_score, art_sigs, art_measures) in zip(faces, artifacts)
+        ]
+        if timings is not None:
+            timings.add("heuristics", resized - started)
+            timings.add("crop_resize", time.perf_counter() - resized)
+        return samples
+
+    def iter_frame_samples(self, frames, near_dup=None, schedule=None, timings=None):
+        """
+        frames: iterable of (frame, timestamp, score) as yielded by
+        FrameExtractor.iter_frames. Generator of (order, frame score, [FaceSample])
+        for every decoded frame, in decode order ([] when it has no face).
+        Detection runs here, artifact analysis and resizing on the worker pool
+        up to workers + 1 frames ahead. Closing the generator stops decoding.
+        near_dup: optional NearDuplicateMatcher; frames it recognises skip
+        detection and analysis and reuse the stored per-face scores.
+        schedule: optional StageScheduler, whose detection_side is read per frame.
+        timings: optional StageTimings for the per-stage wall time.
+        """
+        in_flight = deque()
+        max_in_flight = self.workers + 1  # frames, each with up to max_faces crops
+        track = self.face_analyzer.new_track()
+        order = 0
+
+        for frame, timestamp, score in prefetch(frames, timings=timings):
+            order += 1
+            started = time.perf_counter()
+            # Large stills arrive as a ReducedImage: hash and detect on its preview
+            reduced = frame if isinstance(frame, ReducedImage) else None
+            if reduced is not None:
+                frame = reduced.preview
+            frame_hash = dhash(frame)
+            cached = near_dup.lookup(frame_hash) if near_dup is not None else None
+            detecting = time.perf_counter()
+            if timings is not None:
+                timings.add("frame_hash", detecting - started)
+            if cached is not None:
+                del frame, reduced
+                in_flight.append((order, score, [
+                    FaceSample(timestamp, face_id, None, art_score, art_sigs, frame_hash, model_score)
+                    for face_id, model_score, art_score, art_sigs in cached
+                ]))
+            else:
+                detection_side = schedule.detection_side if schedule is not None else None
+                detected = self.face_analyzer.detect_faces(frame, track, self.max_faces, detection_side)
+                cropping = time.perf_counter()
+                if timings is not None:
+                    timings.add("detection", cropping - detecting)
+                    timings.count("faces_detected", len(detected))
+                if reduced is not None and detected:
+                    # Cut the faces from a decode sized for them
+                    frame, boxes = reduced.face_regions([box for _, box in detected])
+                    detected = [(face_id, box) for (face_id, _), box in zip(detected, boxes)]
+                    if timings is not None:
+                        timings.add("decode", time.perf_counter() - cropping)
+                faces = [(face_id,) + self.face_analyzer.crop_rois(frame, box) for face_id, box in detected]
+                del frame, reduced
+                work = self.executor.submit(self.process_frame_faces, timestamp, frame_hash, faces, timings) if faces else []
+                in_flight.append((order, score, work))
+
+            while len(in_flight) >= max_in_flight:
+                yield _resolve(in_flight.popleft())
+
+        while in_flight:
+            yield _resolve(in_flight.popleft())
+
+    def run(self, frames, frame_budget, near_dup=None):
+        """
+        Keeps the samples of the frame_budget highest-scoring frames (up to
+        max_faces per frame) and returns (samples in timestamp order, frames_seen).
+        """
+        kept = KeptSamples(frame_budget * self.max_faces)
+        frames_seen = 0
+        for order, score, samples in self.iter_frame_samples(frames, near_dup):
+            frames_seen = order
+            kept.add(samples, score, order)
+        return kept.samples(), frames_seen
+
+def _resolve(item):
+    order, score, work = item
+    return order, score, work.result() if isinstance(work, Future) else work
+
+class KeptSamples:
+    """
+    The samples of the highest-scoring frames, at most budget of them.
+    On equal scores the earlier frame is dropped first.
+    """
+    def __init__(self, budget):
+        self.budget = budget
+        self.heap = []  # min-heap of (frame score, frame order, face_id, sample)
+
+    def add(self, samples, score, order):
+        for sample in samples:
+            heapq.heappush(self.heap, (score, order, sample.face_id, sample))
+            if len(self.heap) > self.budget:
+                heapq.heappop(self.heap)
+
+    def __len__(self):
+        return len(self.heap)
+
+    def ranked(self):
+        """
+        [(frame score, frame order, sample)], the last to be dropped first.
+        """
+        ranked = sorted(self.heap, key=lambda item: item[:3], reverse=True)
+        return [(score, order, sample) for score, order, _, sample in ranked]
+
+    def samples(self):
+        return sorted((item[-1] for item in self.heap), key=lambda s: s.timestamp)
@@ -1,37 +1,74 @@
-import os
-import subprocess
-import json
+import re
+
+from core.media import MediaSource
+
+# Software/encoder tags written by image and video generators
+GENERATOR_TAGS = re.compile(
+    r"stable.?diffusion|midjourney|dall.?e|firefly|imagen|novelai|comfyui|automatic1111|"
+    r"runway|sora|pika|kling|deepfacelab|faceswap|roop|facefusion",
+    re.IGNORECASE
+)
 
 class MetadataScanner:
-    def scan(self, file_path):
+    def read(self, media):
+        """
+        MediaMetadata parsed from the container headers (MP4/MOV atoms,
+        JPEG/PNG/WebP EXIF/XMP, C2PA presence). Pure Python over an mmap:
+        only the header ranges are touched, so multi-GB files cost the same
+        as small ones and no ffprobe subprocess is needed.
+        """
+        source = MediaSource.of(media)
+        if not source.exists():
+            raise FileNotFoundError(f"File {source.name} not found.")
+        return source.metadata()
+
+    def scan(self, media, metadata=None):
         """
         Step 1: Fast Pre-check (CPU, <50ms)
+        media: a path or a MediaSource.
         Returns a probability score (0.0 - 1.0) and a list of signals.
         """
         score = 0.0
         signals = []
+        source = MediaSource.of(media)
 
         # 1. Check file existence
-        if not os.path.exists(file_path):
-            raise FileNotFoundError(f"File {file_path} not found.")
-
-        # 2. Simulate EXIF/Metadata extraction (using ffprobe usually, mocking locally)
-        # Real implementation would use: ffprobe -v quiet -print_format json -show_format -show_streams file_path
-        
-        # Mock logic for "Suspicious encoding chains"
-        # In production, check for 'Lavf58.29.100' or other common ffmpeg default tags often used by GANs
-        
-        # Mocking a check:
-        file_size = os.path.getsize(file_path)
+        if metadata is None:
+            metadata = self.read(source)
+
+        file_size = source.size()
         if file_size < 1000: # Suspiciously small
              score += 0.2
              signals.append("abnormal_file_size")
 
-        # 3. Check for specific known bad signatures (Mock)
-        # e.g., missing specific sensor noise metadata
-        has_sensor_data = False # Mock
-        if not has_sensor_data:
+        # 2. Provenance declared in the file: IPTC digital source type in XMP,
+        # or a C2PA manifest asserting an AI-generated source
+        if metadata.ai_source_declared:
+            score += 0.6
+            signals.append("declared_ai_generated")
+
+        tags = " ".join(t for t in (metadata.software, metadata.encoder) if t)
+        if GENERATOR_TAGS.search(tags):
+            score += 0.4
+            signals.append("generator_software_tag")
+
+        # 3. Suspicious encoding chains: ffmpeg's default muxer tag (Lavf58.29.100 etc.)
+        # on media that carries no camera metadata
+        lavf = any(t and t.startswith("Lav") for t in (metadata.encoder, metadata.software))
+        if lavf and not (metadata.make or metadata.model):
+            score += 0.1
+            signals.append("ffmpeg_encoder_tag")
+
+        # 4. Camera/sensor metadata (EXIF Make/Model, QuickTime make/model)
+        if not (metadata.make or metadata.model):
             score += 0.1
             signals.append("missing_sensor_metadata")
 
+        if metadata.truncated:
+            score += 0.1
+            signals.append("malformed_container")
+
+        if metadata.has_c2pa:
+            signals.append("c2pa_manifest_present")
+
         return max(0.0, min(1.0, score)), signals
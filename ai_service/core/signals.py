@@ -0,0 +1,264 @@
+import os
+import sys
+import json
+import time
+import socket
+import threading
+
+import numpy as np
+
+from config import SIGNAL_STORE_DIR
+
+# Columnar store of per-frame raw signals (see SIGNAL STORE in config.py).
+# SIGNAL_STORE_DIR/<segment>/ holds schema.json, one raw little-endian file
+# per column ("items.<column>.bin", "frames.<column>.bin") and items.jsonl
+# (name and digest per item row). Every column file can be np.memmap'ed.
+# A verification appends its frame rows first, then its item row, so a
+# segment cut off mid-append (killed process) reads back consistently: each
+# table keeps the rows all of its columns have, frames keep a matching item.
+
+SCHEMA_VERSION = 1
+
+STATUS_SCORED = 0
+STATUS_NO_FACES = 1       # fail-closed, score 1.0 whatever the weights
+STATUS_DECODE_ERROR = 2   # fail-closed, score 1.0 whatever the weights
+
+FLAG_EARLY_EXIT = 1  # cascade stopped early: the frames are the scored subset
+FLAG_DEGRADED = 2    # deadline degraded the run (fewer frames, partial inference)
+FLAG_NEAR_DUP = 4    # some frames' scores came from the near-duplicate cache
+
+ITEM_COLUMNS = {
+    "recorded_at": "<f8",
+    "status": "u1",
+    "flags": "u1",
+    "is_video": "u1",
+    "frames_seen": "<u4",
+    "meta_score": "<f4",
+    "meta_signals": "<u4",   # bit i = META_SIGNAL_BITS[i]
+    "final_score": "<f4",    # as reported
+    "verdict": "u1",         # 0 = APPROVED, 1 = REJECTED (unsafe), 2 = REJECTED (deepfake)
+}
+FRAME_COLUMNS = {
+    "item": "<u4",           # item row in the same segment
+    "face_id": "<u2",
+    "timestamp": "<f4",
+    "model_score": "<f4",
+    "artifact_score": "<f4",
+    "artifact_signals": "u1",  # bit i = ARTIFACT_SIGNAL_BITS[i]
+    "hf_mean": "<f4",        # NaN when not measured (no ROI, near-duplicate reuse)
+    "lap_var": "<f4",
+    "noise_level": "<f4",
+}
+ARTIFACT_SIGNAL_BITS = ["fft_frequency_anomaly", "texture_smoothing_detected", "unnatural_silence_noise", "no_face_roi"]
+META_SIGNAL_BITS = [
+    "abnormal_file_size", "declared_ai_generated", "generator_software_tag", "ffmpeg_encoder_tag",
+    "missing_sensor_metadata", "malformed_container", "c2pa_manifest_present",
+]
+
+def signal_mask(signals, bits):
+    mask = 0
+    for signal in signals or ():
+        if signal in bits:
+            mask |= 1 << bits.index(signal)
+    return mask
+
+def mask_signals(mask, bits):
+    return [name for i, name in enumerate(bits) if mask >> i & 1]
+
+class SignalStore:
+    """
+    Appends verification signals to this process's segment. Thread-safe
+    (server mode); a forked or spawned worker opens its own segment.
+    """
+    def __init__(self, root=SIGNAL_STORE_DIR):
+        self.root = root
+        self._lock = threading.Lock()
+        self._segment = None
+        self._pid = None
+        self._rows = 0
+
+    def _open_segment(self):
+        name = f"{socket.gethostname()}-{os.getpid()}-{int(time.time())}-{os.urandom(2).hex()}"
+        path = os.path.join(self.root, name)
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, "schema.json"), "w") as f:
+            json.dump({
+                "version": SCHEMA_VERSION, "items": ITEM_COLUMNS, "frames": FRAME_COLUMNS,
+                "artifact_signals": ARTIFACT_SIGNAL_BITS, "meta_signals": META_SIGNAL_BITS,
+            }, f, indent=2)
+        self._segment = path
+        self._pid = os.getpid()
+        self._rows = 0
+
+    def _append(self, table, columns, values):
+        for column, dtype in columns.items():
+            with open(os.path.join(self._segment, f"{table}.{column}.bin"), "ab") as f:
+                f.write(np.asarray(values[column], dtype=dtype).tobytes())
+
+    def record(self, name, digest, status, flags, is_video, frames_seen, meta_score, meta_signals,
+               final_score, verdict, samples=(), model_scores=()):
+        """
+        One verification: its kept samples (FaceSample) with their model
+        scores, and the item-level values the fusion used.
+        """
+        nan = float("nan")
+        measures = [s.artifact_measures or (nan, nan, nan) for s in samples]
+        frames = {
+            "face_id": [s.face_id for s in samples],
+            "timestamp": [s.timestamp for s in samples],
+            "model_score": [float(m) for m in model_scores],
+            "artifact_score": [s.artifact_score for s in samples],
+            "artifact_signals": [signal_mask(s.artifact_signals, ARTIFACT_SIGNAL_BITS) for s in samples],
+            "hf_mean": [m[0] for m in measures],
+            "lap_var": [m[1] for m in measures],
+            "noise_level": [m[2] for m in measures],
+        }
+        item = {
+            "recorded_at": [time.time()], "status": [status], "flags": [flags], "is_video": [int(is_video)],
+            "frames_seen": [frames_seen], "meta_score": [meta_score],
+            "meta_signals": [signal_mask(meta_signals, META_SIGNAL_BITS)],
+            "final_score": [final_score], "verdict": [verdict],
+        }
+        try:
+            with self._lock:
+                if self._segment is None or self._pid != os.getpid():
+                    self._open_segment()
+                frames["item"] = [self._rows] * len(samples)
+                self._append("frames", FRAME_COLUMNS, frames)
+                self._append("items", ITEM_COLUMNS, item)
+                with open(os.path.join(self._segment, "items.jsonl"), "a") as f:
+                    f.write(json.dumps({"name": name, "digest": digest}) + "\n")
+                self._rows += 1
+        except OSError as e:
+            print(f"[SIGNALS] WARNING: signals not stored ({e})", file=sys.stderr)
+
+# --- Reading ---
+
+def _read_column(path, dtype):
+    dtype = np.dtype(dtype)
+    if not os.path.exists(path) or os.path.getsize(path) < dtype.itemsize:
+        return np.empty(0, dtype=dtype)
+    rows = os.path.getsize(path) // dtype.itemsize
+    return np.memmap(path, dtype=dtype, mode="r", shape=(rows,))
+
+def read_segment(path):
+    """
+    (items, frames) column dicts of one segment, memory-mapped, cut to the
+    rows complete in every column.
+    """
+    with open(os.path.join(path, "schema.json")) as f:
+        schema = json.load(f)
+    if schema.get("version") != SCHEMA_VERSION:
+        raise ValueError(f"{path}: unsupported signal store version {schema.get('version')}")
+    items = {c: _read_column(os.path.join(path, f"items.{c}.bin"), d) for c, d in schema["items"].items()}
+    frames = {c: _read_column(os.path.join(path, f"frames.{c}.bin"), d) for c, d in schema["frames"].items()}
+    n_items = min(len(v) for v in items.values())
+    n_frames = min(len(v) for v in frames.values())
+    # Frames are appended in item order, before their item row
+    n_frames = int(np.searchsorted(frames["item"][:n_frames], n_items))
+    return ({c: v[:n_items] for c, v in items.items()}, {c: v[:n_frames] for c, v in frames.items()})
+
+def segment_paths(root=SIGNAL_STORE_DIR):
+    if not os.path.isdir(root):
+        return []
+    return sorted(
+        os.path.join(root, name) for name in os.listdir(root)
+        if os.path.exists(os.path.join(root, name, "schema.json"))
+    )
+
+def load_signals(root=SIGNAL_STORE_DIR):
+    """
+    (items, frames, segments) over all segments under root. Item rows are
+    numbered across segments (frames["item"] indexes the item columns);
+    segments is [(path, first item row, item count)].
+    """
+    items, frames, segments = {c: [] for c in ITEM_COLUMNS}, {c: [] for c in FRAME_COLUMNS}, []
+    offset = 0
+    for path in segment_paths(root):
+        seg_items, seg_frames = read_segment(path)
+        count = len(seg_items["status"])
+        for c in ITEM_COLUMNS:
+            items[c].append(seg_items[c])
+        for c in FRAME_COLUMNS:
+            frames[c].append(seg_frames[c] + offset if c == "item" else seg_frames[c])
+        segments.append((path, offset, count))
+        offset += count
+
+    def join(parts, dtype):
+        if len(parts) == 1:
+            return parts[0]  # stays memory-mapped
+        return np.concatenate(parts) if parts else np.empty(0, dtype=dtype)
+
+    return (
+        {c: join(items[c], d) for c, d in ITEM_COLUMNS.items()},
+        {c: join(frames[c], d) for c, d in FRAME_COLUMNS.items()},
+        segments,
+    )
+
+def item_names(segments, rows):
+    """
+    {item row: (name, digest)} for the given rows (reads items.jsonl).
+    """
+    wanted = set(int(r) for r in rows)
+    names = {}
+    for path, offset, count in segments:
+        if not any(offset <= r < offset + count for r in wanted):
+            continue
+        with open(os.path.join(path, "items.jsonl")) as f:
+            for i, line in enumerate(f):
+                if i >= count:
+                    break
+                if offset + i in wanted:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    names[offset + i] = (entry.get("name"), entry.get("digest"))
+    return names
+
+# --- Rescoring ---
+
+def verdict_bands(final_scores, reject, unsafe):
+    return np.where(final_scores >= reject, 2, np.where(final_scores >= unsafe, 1, 0)).astype(np.uint8)
+
+def rescore(items, frames, weights, thresholds, rules=None):
+    """
+    Vectorized score fusion over stored signals, the computation of
+    DeepfakeGuardProcess._score_face (per face) and the worst face per item:
+    (final scores, verdict bands). Fail-closed items stay at 1.0.
+    weights: (model, artifact, temporal, metadata); thresholds: (reject, unsafe).
+    rules: optional (fft_hf_min, lap_var_min, noise_level_min) to re-run the
+    artifact hard rules on the stored measurements (unmeasured frames keep
+    their stored artifact score).
+    """
+    w_model, w_artifact, w_temporal, w_metadata = weights
+    n_items = len(items["status"])
+    final = np.ones(n_items)
+
+    model = np.asarray(frames["model_score"], dtype=np.float64)
+    artifact = np.asarray(frames["artifact_score"], dtype=np.float64)
+    if rules is not None:
+        hf_mean, lap_var, noise_level = (np.asarray(frames[c]) for c in ("hf_mean", "lap_var", "noise_level"))
+        fired = (hf_mean < rules[0]) | (lap_var < rules[1]) | (noise_level < rules[2])
+        artifact = np.where(np.isnan(hf_mean), artifact, fired.astype(np.float64))
+
+    if len(model):
+        # One group per (item, face); keys sort item-major
+        keys = np.asarray(frames["item"], dtype=np.int64) << 16 | np.asarray(frames["face_id"], dtype=np.int64)
+        faces, inverse = np.unique(keys, return_inverse=True)
+        count = np.bincount(inverse)
+        mean_model = np.bincount(inverse, model) / count
+        mean_artifact = np.bincount(inverse, artifact) / count
+        # Temporal risk: population std of the face's model scores (videos only)
+        variance = np.bincount(inverse, model * model) / count - mean_model ** 2
+        face_item = faces >> 16
+        temporal = np.where(np.asarray(items["is_video"])[face_item] != 0, np.sqrt(np.maximum(variance, 0.0)), 0.0)
+        face_score = (
+            w_model * mean_model + w_artifact * mean_artifact + w_temporal * temporal +
+            w_metadata * np.asarray(items["meta_score"], dtype=np.float64)[face_item]
+        )
+        scored, starts = np.unique(face_item, return_index=True)
+        final[scored] = np.maximum.reduceat(face_score, starts)
+
+    final[np.asarray(items["status"]) != STATUS_SCORED] = 1.0
+    return final, verdict_bands(final, *thresholds)
@@ -0,0 +1,208 @@
+import sys
+import os
+import json
+import time
+import threading
+import argparse
+from urllib.parse import urlsplit, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Ensure we can import from core/
+sys.path.append(os.path.dirname(__file__))
+
+from config import SERVER_HOST, SERVER_PORT, SERVER_MAX_BODY_BYTES, VERIFY_TIME_BUDGET_S, REPORT_TIMINGS, \
+    ADMISSION_ENABLED
+from main import DeepfakeGuardProcess, fail_closed_report
+from core.admission import AdmissionController
+from core.media import MediaSource
+from core.instrumentation import StageTimings, MetricsRegistry, request_profile
+
+class VerificationServer(ThreadingHTTPServer):
+    """
+    Long-lived verification server.
+    Builds one DeepfakeGuardProcess (Haar cascade + ONNX session) at startup
+    and serves concurrent requests on a thread per connection, so cold-start
+    cost is paid once per worker instead of once per upload.
+
+    Endpoints:
+      GET  /health  -> liveness (process is up)
+      GET  /ready   -> readiness (pipeline loaded), 503 until then
+      GET  /stats   -> micro-batching queue depth / batch-size histograms,
+                       admission queues, waits and sheds per job class
+      GET  /metrics -> per-stage timing histograms, Prometheus text format
+      POST /verify  -> {"file_path": "..." | "shm": name, "shm_size",
+                        "time_budget_ms", "timings", "profile", "caption": optional}
+                       or the media bytes as the body (any non-JSON Content-Type),
+                       options in the query string: /verify?time_budget_ms=..&timings=1
+                       -> same report as main.py (with "caption": plus the
+                       context check under "context", as main.py --caption)
+                       429 + fail-closed report when admission control sheds it
+    """
+    daemon_threads = True
+
+    def __init__(self, address):
+        super().__init__(address, VerificationHandler)
+        self.guard = None
+        self.load_error = None
+        self.metrics = MetricsRegistry()
+        # Cost-aware admission and shortest-job-first dispatch (see core/admission.py)
+        self.admission = AdmissionController() if ADMISSION_ENABLED else None
+
+    def load(self):
+        try:
+            self.guard = DeepfakeGuardProcess(batching=True)
+            print("[AI-SERVER] Pipeline ready", file=sys.stderr)
+        except Exception as e:
+            self.load_error = str(e)
+            print(f"[AI-SERVER] Pipeline failed to load: {e}", file=sys.stderr)
+
+def truthy(value):
+    """
+    JSON booleans and query-string flags ("1", "true").
+    """
+    if isinstance(value, str):
+        return value.lower() in ("1", "true", "yes")
+    return bool(value)
+
+class VerificationHandler(BaseHTTPRequestHandler):
+    server_version = "DeepfakeGuard/1.0"
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, {"status": "ok"})
+        elif self.path == "/ready":
+            ready = self.server.guard is not None
+            payload = {"ready": ready}
+            if self.server.load_error:
+                payload["error"] = self.server.load_error
+            self._send_json(200 if ready else 503, payload)
+        elif self.path == "/stats":
+            guard = self.server.guard
+            batcher = guard.batcher if guard is not None else None
+            admission = self.server.admission
+            self._send_json(200, {
+                "batching": batcher.stats() if batcher else None,
+                "admission": admission.stats() if admission else None,
+            })
+        elif self.path == "/metrics":
+            guard = self.server.guard
+            batcher = guard.batcher if guard is not None else None
+            body = self.server.metrics.render(batcher.stats() if batcher else None)
+            if self.server.admission is not None:
+                body += "\n".join(self.server.admission.render()) + "\n"
+            body = body.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self._send_json(404, {"error": "not_found"})
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path != "/verify":
+            self._send_json(404, {"error": "not_found"})
+            return
+
+        received = time.monotonic()
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            if length > SERVER_MAX_BODY_BYTES:
+                self._send_json(413, fail_closed_report(["media_too_large"]))
+                return
+            body = self.rfile.read(length)
+            if self.headers.get("Content-Type", "").startswith("application/json"):
+                request = json.loads(body or b"{}")
+                if "shm" in request:
+                    media = MediaSource.from_shm(request["shm"], request.get("shm_size"))
+                else:
+                    media = request["file_path"]
+            else:
+                # Raw media bytes: decoded in memory, never written to disk
+                request = {k: v[-1] for k, v in parse_qs(url.query).items()}
+                media = MediaSource(data=body, name="<request body>")
+            time_budget_s = float(request.get("time_budget_ms", VERIFY_TIME_BUDGET_S * 1000)) / 1000.0
+        except (ValueError, KeyError, TypeError, OSError):
+            self._send_json(400, fail_closed_report(["invalid_request"]))
+            return
+
+        source = MediaSource.of(media)
+        try:
+            self._verify(source, request, received + time_budget_s)
+        finally:
+            source.close()  # run() closes it too; this covers the 503/429 answers
+
+    def _verify(self, media, request, deadline):
+        guard = self.server.guard
+        if guard is None:
+            self._send_json(503, fail_closed_report(["engine_not_ready", "fail_closed"]))
+            return
+
+        ticket = None
+        admission = self.server.admission
+        if admission is not None:
+            try:
+                ticket = admission.submit(admission.costs.estimate(media), deadline)
+            except (OSError, TypeError, ValueError):
+                ticket = None  # unreadable media: run() fails closed right away
+            if ticket is not None and not admission.wait(ticket):
+                self._send_json(429, fail_closed_report([f"admission_{ticket.outcome}", "fail_closed"]))
+                return
+
+        timings = StageTimings()
+        caption = request.get("caption")
+
+        def verify():
+            if caption is not None:
+                return guard.run_with_context(media, caption, deadline, timings)
+            return guard.run(media, deadline, timings)
+
+        report = None
+        try:
+            if truthy(request.get("profile")):
+                with request_profile("server") as profile_path:
+                    report = verify()
+                report["profile"] = profile_path
+            else:
+                report = verify()
+        except Exception as e:
+            # FAIL-CLOSED
+            timings.finish()
+            report = fail_closed_report([f"engine_error: {str(e)}", "fail_closed"])
+        finally:
+            if ticket is not None:
+                # Cache hits skipped the work: they say nothing about its cost
+                admission.done(ticket, observe=report is not None and report.get("cache") != "exact")
+        self.server.metrics.observe(timings, report)
+        if not (truthy(request.get("timings")) or REPORT_TIMINGS):
+            report.pop("timings", None)
+            report.get("context", {}).pop("timings", None)
+        self._send_json(200, report)
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        print(f"[AI-SERVER] {self.address_string()} {format % args}", file=sys.stderr)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="DeepfakeGuard verification server")
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    args = parser.parse_args()
+
+    server = VerificationServer((args.host, args.port))
+    threading.Thread(target=server.load, daemon=True).start()
+    print(f"[AI-SERVER] Listening on http://{args.host}:{args.port}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
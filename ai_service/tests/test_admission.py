@@ -0,0 +1,35 @@
+import cv2
+import numpy as np
+
+from core.admission import CostModel
+from core.media import MediaSource
+
+def write_video(path, fourcc, size, frames=50, fps=25):
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*fourcc), fps, size)
+    for i in range(frames):
+        writer.write(np.full((size[1], size[0], 3), i * 5 % 255, np.uint8))
+    writer.release()
+
+def test_mp4_estimate_comes_from_the_headers(tmp_path):
+    path = tmp_path / "clip.mp4"
+    write_video(path, "mp4v", (320, 240))
+    source = MediaSource(data=path.read_bytes())
+    estimate = CostModel().estimate(source)
+    assert (estimate.job_class, estimate.width, estimate.height) == ("video", 320, 240)
+    assert abs(estimate.duration_s - 2.0) < 0.05
+    assert source._memfd is None  # no copy of the upload just to probe it
+    source.close()
+
+def test_other_containers_share_one_memfd(tmp_path):
+    path = tmp_path / "clip.avi"
+    write_video(path, "MJPG", (160, 120))
+    source = MediaSource(data=path.read_bytes())
+    estimate = CostModel().estimate(source)
+    assert (estimate.job_class, estimate.width, estimate.height) == ("video", 160, 120)
+    memfd = source._memfd
+    cap = source.open_video()
+    assert cap.read()[0]
+    cap.release()
+    assert source._memfd is memfd
+    source.close()
+    assert memfd.closed
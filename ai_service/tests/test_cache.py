@@ -0,0 +1,37 @@
+import os
+import time
+
+from core.cache import VerdictCache, config_fingerprint
+
+FRAME = 0x0F0F_3C3C_5A5A_A5A5
+
+def test_fingerprints_share_a_store_without_wiping_each_other(tmp_path):
+    path = str(tmp_path / "verdicts.sqlite3")
+    a = VerdictCache("model-a", path=path)
+    b = VerdictCache("model-b", path=path)
+    a.put_report("digest", {"verdict": "SAFE"})
+    a.put_frames("digest", {FRAME: [[0, 0.1, 0.2, {}]]})
+
+    # Opening the store under a third fingerprint must not drop a's rows
+    VerdictCache("model-c", path=path)
+    assert a.get_report("digest") == {"verdict": "SAFE"}
+    assert [media for media, _ in a.find_frames(FRAME)] == ["digest"]
+
+    # and b never sees them, nor overwrites them with its own
+    assert b.get_report("digest") is None
+    assert b.find_frames(FRAME) == []
+    b.put_report("digest", {"verdict": "REJECT"})
+    b.put_frames("digest", {FRAME: [[0, 0.9, 0.8, {}]]})
+    assert a.get_report("digest") == {"verdict": "SAFE"}
+    assert a.find_frames(FRAME)[0][1] == [[0, 0.1, 0.2, {}]]
+    assert b.get_report("digest") == {"verdict": "REJECT"}
+
+def test_config_fingerprint_follows_model_file(tmp_path):
+    model = tmp_path / "model.onnx"
+    model.write_bytes(b"weights")
+    first = config_fingerprint(str(model))
+    assert config_fingerprint(str(model)) == first
+
+    model.write_bytes(b"new weights")
+    os.utime(model, ns=(time.time_ns(), time.time_ns() + 1_000_000))
+    assert config_fingerprint(str(model)) != first
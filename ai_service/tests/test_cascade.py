@@ -0,0 +1,104 @@
+"""
+Randomized property test of the cascade's certified early exit: over random
+score sequences, a run that stops early must report bounds that contain the
+full run's fused score and sit in its verdict band.
+"""
+import math
+import random
+
+import numpy as np
+
+from config import WEIGHT_MODEL, WEIGHT_ARTIFACT, WEIGHT_TEMPORAL, WEIGHT_METADATA
+from core.cascade import CascadeScorer, verdict_band
+from core.pipeline import FaceSample, KeptSamples
+
+TRIALS = 3000
+
+class FakePipeline:
+    def __init__(self, max_faces):
+        self.max_faces = max_faces
+
+    def iter_frame_samples(self, frames, near_dup=None, schedule=None, timings=None):
+        for order, (frame_score, samples) in enumerate(frames, 1):
+            yield order, frame_score, samples
+
+class FakeScorer:
+    # The "crop" of a fake sample is the model score it gets
+    def predict_batch(self, crops):
+        return list(crops)
+
+def fused_score(samples, model_scores, meta_score):
+    """
+    Riskiest face as DeepfakeGuardProcess._score_face fuses it (video).
+    """
+    faces = {}
+    for sample, model_score in zip(samples, model_scores):
+        faces.setdefault(sample.face_id, []).append((model_score, sample.artifact_score))
+    worst = -math.inf
+    for entries in faces.values():
+        model = [m for m, _ in entries]
+        temporal = float(np.std(model)) if len(model) >= 2 else 0.0
+        worst = max(worst, WEIGHT_MODEL * float(np.mean(model)) +
+                    WEIGHT_ARTIFACT * float(np.mean([a for _, a in entries])) +
+                    WEIGHT_TEMPORAL * temporal + WEIGHT_METADATA * meta_score)
+    return worst
+
+def full_run(frames, budget, meta_score):
+    kept = KeptSamples(budget)
+    for order, (frame_score, samples) in enumerate(frames, 1):
+        kept.add(samples, frame_score, order)
+    samples = kept.samples()
+    model_scores = [s.model_score if s.model_score is not None else s.crop for s in samples]
+    return fused_score(samples, model_scores, meta_score) if samples else None
+
+def random_case(rng):
+    max_faces = rng.choice((1, 1, 2, 3))
+    frame_budget = rng.randint(1, 10)
+    bounded = rng.random() < 0.5
+    frame_count = frame_budget if bounded else rng.randint(1, 2 * frame_budget + 2)
+    # Clustered scores decide early, spread ones keep the bounds open
+    centre, spread = rng.random(), rng.choice((0.05, 0.2, 0.5))
+
+    def score():
+        return min(1.0, max(0.0, rng.gauss(centre, spread)))
+
+    frames = []
+    for order in range(frame_count):
+        frame_score = math.inf if order == 0 and rng.random() < 0.5 else rng.random()
+        samples = []
+        for face_id in rng.sample(range(max_faces), rng.randint(0, max_faces)):
+            cached = rng.random() < 0.1  # near-duplicate reuse: scored without a crop
+            model_score = score()
+            samples.append(FaceSample(
+                order, face_id, None if cached else model_score, score(), [], 0,
+                model_score if cached else None
+            ))
+        frames.append((frame_score, samples))
+    return frames, frame_budget, max_faces, bounded, rng.random()
+
+def test_early_exit_never_flips_the_full_run_verdict():
+    rng = random.Random(12)
+    early_exits = 0
+    for trial in range(TRIALS):
+        frames, frame_budget, max_faces, bounded, meta_score = random_case(rng)
+        expected = full_run(frames, frame_budget * max_faces, meta_score)
+
+        cascade = CascadeScorer(FakePipeline(max_faces), FakeScorer(), chunk=rng.randint(1, 4), early_exit=True)
+        samples, model_scores, _, bounds = cascade.run(frames, frame_budget, meta_score, bounded)
+
+        if bounds is None:
+            # No early exit: exactly the full run
+            got = fused_score(samples, model_scores, meta_score) if samples else None
+            assert got == expected or math.isclose(got, expected, abs_tol=1e-9), trial
+            continue
+        early_exits += 1
+        low, high = bounds
+        assert expected is not None, trial  # "no face" is never certified early
+        assert low - 1e-9 <= expected <= high + 1e-9, (trial, bounds, expected)
+        assert verdict_band(low) == verdict_band(high) == verdict_band(expected), (trial, bounds, expected)
+        # The report's score: the partial fusion clamped into the bounds
+        partial = min(max(fused_score(samples, model_scores, meta_score), low), high)
+        assert verdict_band(partial) == verdict_band(expected), trial
+
+    # The property is only exercised if runs actually stop early
+    assert early_exits > TRIALS // 10
@@ -0,0 +1,87 @@
+"""
+ClaimMatcher against the per-rule regex scan it replaced in context_verify
+(extract_claims, classify_claim_type, the temporal check's "current" words
+and check_patterns), over 20k generated captions.
+"""
+import re
+import random
+
+from core.claims import (
+    BREAKING_PHRASES, CLAIM_CATEGORIES, CURRENT_PHRASES, SENSATIONAL_PATTERN, ABSOLUTE_PHRASES,
+    SENSATIONAL_SCORE, ABSOLUTE_SCORE, ClaimMatcher
+)
+
+CAPTIONS = 20000
+
+def reference_scan(text):
+    claims = []
+    for phrase in BREAKING_PHRASES:
+        p = "(?i)" + re.escape(phrase)
+        if re.search(p, text):
+            claims.append(f"High-urgency claim: {re.findall(p, text)[0]}")
+
+    claim_type = "general"
+    for category, phrases in CLAIM_CATEGORIES.items():
+        if any(re.search(re.escape(p), text.lower()) for p in phrases):
+            claim_type = category
+            break
+
+    current_claim = any(x in text.lower() for x in CURRENT_PHRASES)
+
+    score = 0.0
+    reasons = []
+    if re.search(SENSATIONAL_PATTERN, text):
+        score += SENSATIONAL_SCORE
+        reasons.append("Sensationalist language patterns")
+    if any(re.search("(?i)" + re.escape(p), text) for p in ABSOLUTE_PHRASES):
+        score += ABSOLUTE_SCORE
+        reasons.append("Suspicious absolute claim markers")
+    return claims, claim_type, current_claim, score, reasons
+
+def random_caption(rng, vocabulary):
+    words = []
+    for _ in range(rng.randint(0, 25)):
+        word = rng.choice(vocabulary)
+        r = rng.random()
+        if r < 0.2:
+            word = word.upper()
+        elif r < 0.35:
+            word = word.title()
+        elif r < 0.4 and "i" in word.lower():
+            # Lowercases to two characters, inside a phrase ("BREAKİNG")
+            word = re.sub("[iI]", "İ", word.upper(), count=1)
+        elif r < 0.5 and len(word) > 3:
+            # Phrase fragments and run-ons ("happeningnow", "hurrican")
+            cut = rng.randint(1, len(word) - 1)
+            word = word[:cut] if rng.random() < 0.5 else word + rng.choice(vocabulary)
+        words.append(word)
+    return rng.choice(("", "", "!!", "!", "?")).join([" ".join(words), ""])
+
+def test_matches_the_per_rule_scan():
+    phrases = BREAKING_PHRASES + CURRENT_PHRASES + ABSOLUTE_PHRASES + [
+        p for ps in CLAIM_CATEGORIES.values() for p in ps
+    ]
+    vocabulary = phrases + [
+        "MUST WATCH", "UNBELIEVABLE", "Shocking", "SHOCKING", "the", "a", "video", "city", "crowd",
+        "downtown", "nowhere", "firefighters", "votes", "deadline", "hits", "alerted", "100%", "true",
+        "ünïcode", "café", "🔥", "İstanbul", "straße", "ΣΟΦΙΑ", "K",  # lower() changes length or letters
+    ]
+    matcher = ClaimMatcher()
+    rng = random.Random(20)
+    for _ in range(CAPTIONS):
+        caption = random_caption(rng, vocabulary)
+        scan = matcher.scan(caption)
+        got = (scan.claims, scan.claim_type, scan.current_claim, scan.pattern_score, scan.pattern_reasons)
+        assert got == reference_scan(caption), caption
+
+def test_lowercase_length_changes():
+    matcher = ClaimMatcher()
+    for caption in ["BREAKİNG news", "fİre İstanbul now", "İ fire BREAKING", "EVERYONE İ", "İİ just in İ"]:
+        scan = matcher.scan(caption)
+        got = (scan.claims, scan.claim_type, scan.current_claim, scan.pattern_score, scan.pattern_reasons)
+        assert got == reference_scan(caption), caption
+
+def test_scan_many_matches_scan():
+    captions = ["BREAKING: massive earthquake hits downtown!!", "just a cat", "Vote today, everyone"]
+    matcher = ClaimMatcher()
+    assert [s.as_dict() for s in matcher.scan_many(captions)] == [matcher.scan(c).as_dict() for c in captions]
@@ -0,0 +1,83 @@
+import json
+import time
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from client import verify_remote
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, delay_s=0.0, status=200, body=None):
+        self.delay_s = delay_s
+        self.status = status
+        self.body = body if body is not None else {"verdict": "SAFE", "signals": []}
+        super().__init__(("127.0.0.1", 0), StubHandler)
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(self.server.delay_s)
+        payload = json.dumps(self.server.body).encode()
+        self.send_response(self.server.status)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def start(**kwargs):
+        server = StubServer(**kwargs)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server.server_address[1]
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+def test_no_server_falls_back():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    assert verify_remote(data=b"x", port=port) is None
+
+def test_late_answer_fails_closed_at_the_deadline(serve, monkeypatch):
+    monkeypatch.setattr("client.SERVER_DEADLINE_GRACE_S", 0.1)
+    port = serve(delay_s=2.0)
+    started = time.monotonic()
+    report = verify_remote(data=b"x", deadline=started + 0.3, port=port)
+    assert time.monotonic() - started < 1.0
+    assert report["verdict"] == "REJECTED"
+    assert report["signals"] == ["server_timeout", "fail_closed"]
+
+def test_error_status_fails_closed(serve):
+    port = serve(status=500, body={"error": "boom"})
+    report = verify_remote(data=b"x", deadline=time.monotonic() + 5, port=port)
+    assert report["verdict"] == "REJECTED"
+    assert report["signals"] == ["server_error: HTTP 500", "fail_closed"]
+
+def test_server_without_engine_falls_back():
+    # Listening while the pipeline loads (or after its load failed)
+    from server import VerificationServer
+    server = VerificationServer(("127.0.0.1", 0))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        assert verify_remote(data=b"x", deadline=time.monotonic() + 5, port=server.server_address[1]) is None
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def test_shed_report_is_passed_through(serve):
+    shed = {"verdict": "REJECTED", "signals": ["admission_deadline", "fail_closed"]}
+    port = serve(status=429, body=shed)
+    assert verify_remote(data=b"x", deadline=time.monotonic() + 5, port=port) == shed
@@ -0,0 +1,64 @@
+"""
+ArtifactAnalyzer.analyze_batch against the per-crop analyze() it replaced
+(full complex FFT, fftshift and a boolean mask), over synthetic face crops
+of many sizes mixed in one batch.
+"""
+import random
+
+import cv2
+import numpy as np
+from scipy.fftpack import fft2, fftshift
+
+from core.heuristics import ArtifactAnalyzer
+
+def reference_analyze(rois):
+    face = rois.get("face")
+    if face is None:
+        return 0.0, ["no_face_roi"], None
+    gray = cv2.cvtColor(face, cv2.COLOR_BGR2GRAY)
+    signals = []
+
+    magnitude_spectrum = 20 * np.log(np.abs(fftshift(fft2(gray))) + 1)
+    h, w = magnitude_spectrum.shape
+    y, x = np.ogrid[:h, :w]
+    mask = (x - w // 2) ** 2 + (y - h // 2) ** 2 > 20 ** 2
+    with np.errstate(invalid="ignore", divide="ignore"):
+        hf_mean = np.mean(magnitude_spectrum[mask]) if mask.any() else np.nan
+    if hf_mean < 80:
+        signals.append("fft_frequency_anomaly")
+    if cv2.Laplacian(gray, cv2.CV_64F).var() < 50:
+        signals.append("texture_smoothing_detected")
+    if np.mean(cv2.absdiff(gray, cv2.medianBlur(gray, 3))) < 1.5:
+        signals.append("unnatural_silence_noise")
+    return (1.0 if signals else 0.0), signals, hf_mean
+
+def random_crop(rng, np_rng):
+    h = rng.randint(20, 300)
+    w = h if rng.random() < 0.5 else rng.randint(20, 300)
+    # Smooth shading plus blurred noise: spans both sides of every threshold
+    yy, xx = np.mgrid[:h, :w]
+    base = 128 + 60 * np.sin(xx / rng.uniform(5, 60)) * np.cos(yy / rng.uniform(5, 60))
+    noise = np_rng.normal(0, rng.choice((0.5, 2, 6, 20)), (h, w, 3))
+    sigma = rng.choice((0, 0, 1, 2, 4))
+    if sigma:
+        noise = cv2.GaussianBlur(noise, (0, 0), sigma)
+    return np.clip(base[..., None] + noise, 0, 255).astype(np.uint8)
+
+def test_batch_matches_the_per_crop_analysis():
+    rng = random.Random(10)
+    np_rng = np.random.default_rng(10)
+    analyzer = ArtifactAnalyzer()
+    fired = set()
+    for _ in range(12):
+        batch = [{"face": random_crop(rng, np_rng)} for _ in range(rng.randint(1, 12))]
+        shared = batch[0]["face"].shape
+        batch.append({"face": np_rng.integers(0, 256, shared, dtype=np.uint8)})  # same size as the first
+        batch.append({})
+        for rois, got in zip(batch, analyzer.analyze_batch(batch, measured=True)):
+            score, signals, hf_mean = reference_analyze(rois)
+            assert got[:2] == (score, signals), rois.get("face", np.empty(0)).shape
+            if hf_mean is not None:
+                assert np.isclose(got[2][0], hf_mean, rtol=1e-9, equal_nan=True)
+            fired.update(signals)
+    # Every rule was exercised on both sides
+    assert {"fft_frequency_anomaly", "texture_smoothing_detected", "unnatural_silence_noise"} <= fired
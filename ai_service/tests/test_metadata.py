@@ -0,0 +1,156 @@
+"""
+Container metadata parser over synthetic files: normal EXIF/XMP/QuickTime
+extraction, truncated and oversized structures, and crafted files that must
+stay within the per-parse budget.
+"""
+import struct
+import time
+from datetime import datetime, timedelta, timezone
+
+from core.metadata import (
+    MAX_BOXES, MAX_PARSE_BYTES, MAX_SEGMENT_READ, BULK_MIN_SIZE, XMP_BMFF_UUID, AI_SOURCE_MARKER,
+    parse_metadata, read_metadata
+)
+
+MAY_1 = datetime(2024, 5, 1, 10, 0, tzinfo=timezone(timedelta(hours=2))).timestamp()
+
+def box(kind, payload=b""):
+    return struct.pack(">I", 8 + len(payload)) + kind + payload
+
+def tiff(ifd0, exif):
+    """
+    Big-endian TIFF block: ASCII tags in IFD0 and an Exif IFD.
+    """
+    ifd0_size = 2 + 12 * (len(ifd0) + 1) + 4
+    exif_offset = 8 + ifd0_size
+    data_offset = exif_offset + 2 + 12 * len(exif) + 4
+    data = b""
+
+    def ifd(tags, extra=b""):
+        nonlocal data
+        out = struct.pack(">H", len(tags) + len(extra) // 12)
+        for tag, text in tags:
+            value = text.encode() + b"\x00"
+            out += struct.pack(">HHII", tag, 2, len(value), data_offset + len(data))
+            data += value
+        return out + extra + b"\x00" * 4
+
+    first = ifd(ifd0, struct.pack(">HHII", 0x8769, 4, 1, exif_offset))
+    second = ifd(exif)
+    return b"MM\x00\x2a" + struct.pack(">I", 8) + first + second + data
+
+def jpeg(*segments):
+    return b"".join([b"\xff\xd8"] + [
+        bytes((0xFF, marker)) + struct.pack(">H", len(payload) + 2) + payload for marker, payload in segments
+    ] + [b"\xff\xda\x00\x02" + b"\x00" * 64])
+
+def png(*chunks):
+    return b"".join([b"\x89PNG\r\n\x1a\n"] + [
+        struct.pack(">I", len(payload)) + kind + payload + b"\x00" * 4 for kind, payload in chunks + ((b"IEND", b""),)
+    ])
+
+def xmp(body):
+    return b'<x:xmpmeta><rdf:Description ' + body + b'/></x:xmpmeta>'
+
+def test_jpeg_exif_and_xmp():
+    exif = tiff([(0x010F, "Canon"), (0x0110, "EOS R5")],
+                [(0x9003, "2024:05:01 10:00:00"), (0x9011, "+02:00")])
+    packet = xmp(b'xmp:CreatorTool="Adobe Photoshop 25.0"')
+    meta = parse_metadata(jpeg((0xE0, b"JFIF\x00"), (0xE1, b"Exif\x00\x00" + exif),
+                               (0xE1, b"http://ns.adobe.com/xap/1.0/\x00" + packet)))
+    assert meta.container == "jpeg"
+    assert (meta.make, meta.model, meta.software) == ("Canon", "EOS R5", "Adobe Photoshop 25.0")
+    assert meta.creation_time == MAY_1 and meta.creation_source == "exif"
+    assert meta.has_exif and meta.has_xmp and not meta.ai_source_declared
+    assert not meta.truncated
+    assert "_boxes_left" not in meta.as_dict()
+
+def test_png_text_and_xmp_ai_source():
+    packet = xmp(b'Iptc4xmpExt:DigitalSourceType="http://cv.iptc.org/newscodes/digitalsourcetype/'
+                 + AI_SOURCE_MARKER + b'"')
+    meta = parse_metadata(png((b"IHDR", b"\x00" * 13), (b"iTXt", b"XML:com.adobe.xmp\x00" + packet),
+                              (b"tEXt", b"Software\x00ImageGen 2"),
+                              (b"tEXt", b"Creation Time\x002024-05-01T10:00:00+02:00")))
+    assert meta.ai_source_declared and meta.has_xmp
+    assert meta.software == "ImageGen 2"
+    assert meta.creation_time == MAY_1 and meta.creation_source == "png_text"
+    assert not meta.truncated
+
+def test_quicktime_keys_and_headers(tmp_path):
+    mvhd = box(b"mvhd", b"\x00" * 4 + struct.pack(">IIII", 0, 0, 600, 1200) + b"\x00" * 80)
+    tkhd = box(b"tkhd", b"\x00" * 76 + struct.pack(">II", 1920 << 16, 1080 << 16))
+    keys = [b"com.apple.quicktime.make", b"com.apple.quicktime.model", b"com.apple.quicktime.creationdate"]
+    values = [b"Apple", b"iPhone 15 Pro", b"2024-05-01T10:00:00+0200"]
+    meta_box = box(b"meta", box(b"hdlr", b"\x00" * 24) +
+                   box(b"keys", struct.pack(">II", 0, len(keys)) +
+                       b"".join(struct.pack(">I", 8 + len(k)) + b"mdta" + k for k in keys)) +
+                   box(b"ilst", b"".join(box(struct.pack(">I", n), box(b"data", struct.pack(">II", 1, 0) + v))
+                                         for n, v in enumerate(values, 1))))
+    data = box(b"ftyp", b"qt  \x00\x00\x00\x00") + box(b"moov", mvhd + box(b"trak", tkhd) + meta_box) + \
+        box(b"mdat", b"\x00" * 64)
+    path = tmp_path / "clip.mov"
+    path.write_bytes(data)
+
+    meta = read_metadata(str(path))
+    assert meta.container == "mp4"
+    assert (meta.make, meta.model) == ("Apple", "iPhone 15 Pro")
+    assert meta.creation_time == MAY_1 and meta.creation_source == "quicktime"
+    assert meta.duration_s == 2.0 and (meta.width, meta.height) == (1920, 1080)
+    assert not meta.truncated
+
+def test_truncated_boxes():
+    moov = box(b"moov", box(b"udta", box(b"\xa9too", struct.pack(">HH", 5, 0) + b"Lavf6")))
+    assert parse_metadata(moov).encoder == "Lavf6"
+    # Declared past the end of the file
+    meta = parse_metadata(moov[:-3])
+    assert meta.truncated
+    # Size smaller than its own header, and a 64-bit size cut off
+    assert parse_metadata(box(b"ftyp", b"isom") + struct.pack(">I", 4) + b"moov").truncated
+    assert parse_metadata(box(b"ftyp", b"isom") + struct.pack(">I", 1) + b"moov\x00\x00").truncated
+    # JPEG without a scan, PNG without IEND
+    assert parse_metadata(jpeg((0xE0, b"JFIF\x00"))[:-68]).truncated
+    assert parse_metadata(png((b"IHDR", b"\x00" * 13))[:-12]).truncated
+
+def test_oversized_segment_is_read_up_to_the_cap():
+    # An XMP box larger than MAX_SEGMENT_READ: only its head is parsed
+    packet = xmp(b'xmp:CreatorTool="Editor"') + b" " * MAX_SEGMENT_READ + AI_SOURCE_MARKER
+    meta = parse_metadata(box(b"ftyp", b"isom") + box(b"uuid", XMP_BMFF_UUID + packet))
+    assert meta.has_xmp and meta.software == "Editor"
+    assert not meta.ai_source_declared and not meta.truncated
+
+def test_byte_budget_is_per_parse():
+    packet = b" " * MAX_SEGMENT_READ
+    count = MAX_PARSE_BYTES // MAX_SEGMENT_READ + 2
+    meta = parse_metadata(box(b"ftyp", b"isom") + box(b"uuid", XMP_BMFF_UUID + packet) * count)
+    assert meta.truncated
+
+def test_nested_box_bomb():
+    # 1024 moov boxes of 4096 empty children each: 4M boxes if every
+    # level had its own budget
+    moov = box(b"moov", box(b"trak") * 4096)
+    data = box(b"ftyp", b"isom") + moov * 1024
+    started = time.perf_counter()
+    meta = parse_metadata(data)
+    assert time.perf_counter() - started < 0.5
+    assert meta.truncated
+
+def test_keys_and_exif_bombs():
+    keys = box(b"keys", struct.pack(">II", 0, 1 << 30) + (struct.pack(">I", 12) + b"mdta" + b"k\x00\x00\x00") * 4096)
+    segment = (0xE1, b"Exif\x00\x00" + tiff([(0x010F, "x")] * 500, []))
+    for data in (box(b"moov", box(b"meta", keys) * 256), jpeg(*[segment] * 2000)):
+        started = time.perf_counter()
+        meta = parse_metadata(data)
+        assert time.perf_counter() - started < 0.5
+        assert meta.truncated
+
+def test_png_with_many_idat_chunks():
+    idat = (b"IDAT", b"\x00" * BULK_MIN_SIZE)
+    chunks = (b"IHDR", b"\x00" * 13), *[idat] * (MAX_BOXES + 100), (b"tEXt", b"Software\x00Encoder")
+    meta = parse_metadata(png(*chunks))
+    assert not meta.truncated and meta.software == "Encoder"
+    # Tiny chunks are still charged
+    data = png((b"IHDR", b"\x00" * 13), *[(b"IDAT", b"\x00")] * 200000)
+    started = time.perf_counter()
+    meta = parse_metadata(data)
+    assert time.perf_counter() - started < 0.5
+    assert meta.truncated
@@ -0,0 +1,25 @@
+from core.media import MediaSource
+from core.metadata import MediaMetadata
+from core.precheck import MetadataScanner
+
+def scan(tmp_path, **tags):
+    path = tmp_path / "clip.mp4"
+    path.write_bytes(b"\0" * 2000)
+    metadata = MediaMetadata("mp4")
+    for name, value in tags.items():
+        setattr(metadata, name, value)
+    return MetadataScanner().scan(MediaSource(path=str(path)), metadata)[1]
+
+def test_ffmpeg_encoder_tag_with_software_tag_set(tmp_path):
+    # The software tag comes first in the joined string: the encoder must still count
+    assert "ffmpeg_encoder_tag" in scan(tmp_path, software="HandBrake 1.6.1", encoder="Lavf60.3.100")
+
+def test_ffmpeg_tag_in_either_field(tmp_path):
+    assert "ffmpeg_encoder_tag" in scan(tmp_path, encoder="Lavf58.29.100")
+    assert "ffmpeg_encoder_tag" in scan(tmp_path, software="Lavc60.3.100")
+
+def test_ffmpeg_tag_ignored_with_camera_metadata(tmp_path):
+    assert "ffmpeg_encoder_tag" not in scan(tmp_path, software="HandBrake", encoder="Lavf60.3.100", make="Apple")
+
+def test_no_ffmpeg_tag(tmp_path):
+    assert "ffmpeg_encoder_tag" not in scan(tmp_path, software="Adobe Premiere", encoder="Apple ProRes")
@@ -0,0 +1,96 @@
+"""
+Trusted-bulletin feed for the context source check (see TRUSTED BULLETINS in
+config.py). Reports are JSONL files in BULLETIN_FEED_DIR, one per line:
+
+  {"id": "usgs-2024-0412", "published": "2024-04-12T08:14:00Z", "source": "earthquake.gov",
+   "title": "M6.1 earthquake near Izmir", "text": "...", "locations": ["Izmir", "Turkey"],
+   "url": "https://..."}
+
+Any process can append to (or drop new) files; the verifiers ingest new lines
+on their next lookup. Commands:
+  standin   append synthetic reports (local stand-in for a real news/bulletin feed)
+  ingest    ingest the feed now and print index statistics
+  query     match a caption against the index, with the lookup time
+
+Usage:
+  python tools/bulletin_feed.py standin [--count 500] [--hours 72] [--seed 0] [--out FILE]
+  python tools/bulletin_feed.py ingest
+  python tools/bulletin_feed.py query "Massive earthquake hits Izmir right now" [--recent]
+"""
+import sys
+import os
+import json
+import time
+import random
+import argparse
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from config import BULLETIN_FEED_DIR
+from core.bulletins import BulletinIndex
+
+STANDIN_SOURCES = ["earthquake.gov", "weather.service", "official.news", "confirmed.report"]
+STANDIN_EVENTS = {
+    "earthquake.gov": ["M{mag} earthquake near {city}", "Aftershocks continue near {city} after M{mag} quake"],
+    "weather.service": ["Flood warning issued for {city}", "Severe storm hits {city}", "Hurricane approaching {city}",
+                        "Wildfire spreading north of {city}"],
+    "official.news": ["Protest gathers thousands in central {city}", "Election results announced in {city}",
+                      "Fire at warehouse in {city} under control"],
+    "confirmed.report": ["Power outage affects {city} after storm", "Evacuations ordered in {city} as floods rise"],
+}
+STANDIN_PLACES = [
+    ("Izmir", "Turkey"), ("Valparaiso", "Chile"), ("Osaka", "Japan"), ("New Orleans", "United States"),
+    ("Lagos", "Nigeria"), ("Manila", "Philippines"), ("Naples", "Italy"), ("Dhaka", "Bangladesh"),
+    ("Quito", "Ecuador"), ("Vancouver", "Canada"), ("San Francisco", "United States"), ("Kathmandu", "Nepal"),
+]
+
+def standin_reports(count, hours, seed, now=None):
+    rng = random.Random(seed)
+    now = time.time() if now is None else now
+    for i in range(count):
+        source = rng.choice(STANDIN_SOURCES)
+        city, country = rng.choice(STANDIN_PLACES)
+        title = rng.choice(STANDIN_EVENTS[source]).format(city=city, mag=round(rng.uniform(4.5, 7.5), 1))
+        published = now - rng.uniform(0, hours * 3600)
+        yield {
+            "id": f"standin-{seed}-{i}",
+            "published": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(published)),
+            "source": source,
+            "title": title,
+            "text": f"{title}. Authorities in {city}, {country} are monitoring the situation.",
+            "locations": [city, country],
+            "url": f"https://{source}/reports/standin-{seed}-{i}",
+        }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="DeepfakeGuard trusted-bulletin feed")
+    commands = parser.add_subparsers(dest="command", required=True)
+    standin = commands.add_parser("standin", help="Append synthetic reports to the feed")
+    standin.add_argument("--count", type=int, default=500)
+    standin.add_argument("--hours", type=float, default=72, help="Spread publication times over the last N hours")
+    standin.add_argument("--seed", type=int, default=0)
+    standin.add_argument("--out", default=os.path.join(BULLETIN_FEED_DIR, "standin.jsonl"))
+    commands.add_parser("ingest", help="Ingest new feed lines now")
+    query = commands.add_parser("query", help="Match a caption")
+    query.add_argument("caption")
+    query.add_argument("--recent", action="store_true", help="Breaking claim: recent reports only")
+    args = parser.parse_args()
+
+    if args.command == "standin":
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "a", encoding="utf-8") as f:
+            for report in standin_reports(args.count, args.hours, args.seed):
+                f.write(json.dumps(report) + "\n")
+        print(f"[BULLETINS] Appended {args.count} stand-in reports to {args.out}")
+        sys.exit(0)
+
+    index = BulletinIndex()
+    started = time.perf_counter()
+    added = index.refresh(force=True)
+    if args.command == "ingest":
+        print(f"[BULLETINS] Ingested {added} reports in {time.perf_counter() - started:.2f}s: {json.dumps(index.stats())}")
+    else:
+        started = time.perf_counter()
+        matches = index.find(args.caption, recent=args.recent)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        print(json.dumps({"matches": matches, "lookup_ms": round(elapsed_ms, 3)}, indent=2))
@@ -0,0 +1,186 @@
+"""
+INT8 quantisation for the EfficientNet-B0 detector, with calibration and an
+accuracy-vs-latency report against the FP32 model.
+
+  dynamic: int8 weights, activations quantised at run time (no calibration data)
+  static:  int8 weights and activations (QDQ), calibrated on face crops taken
+           from --calibration (images or videos, faces found with FaceAnalyzer)
+
+Usage:
+  python tools/quantize_model.py --mode static --calibration data/calib/ [--eval data/eval/]
+      [--labels labels.csv] [--output models/efficientnet_b0_v1.int8.onnx] [--report report.json]
+
+labels.csv (optional): "path,label" rows, label 1 = fake, to report accuracy at
+a 0.5 model-score threshold; without it accuracy is agreement with FP32.
+Serve the result on CPU-only nodes with AI_USE_INT8=1.
+"""
+import sys
+import os
+import csv
+import time
+import json
+import glob
+import argparse
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from config import MODEL_PATH, QUANTIZED_MODEL_PATH
+from core.extractor import FrameExtractor
+from core.detector import FaceAnalyzer
+from core.models import EfficientNetONNXDetector, BatchPreprocessor, create_session
+
+MEDIA_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".bmp", ".mp4", ".mov", ".avi", ".mkv", ".webm")
+
+def list_media(location):
+    if os.path.isdir(location):
+        paths = sorted(glob.glob(os.path.join(location, "**", "*"), recursive=True))
+    else:
+        paths = sorted(glob.glob(location))
+    return [p for p in paths if p.lower().endswith(MEDIA_EXTENSIONS)]
+
+def load_face_crops(paths, max_per_file=4):
+    """
+    (path, face crop) pairs: sampled frames for videos, the image itself otherwise.
+    """
+    extractor = FrameExtractor(selection="uniform")
+    analyzer = FaceAnalyzer()
+    crops = []
+    for path in paths:
+        frames, _ = extractor.extract_frames(path, frame_budget=max_per_file)
+        if not frames:
+            img = cv2.imread(path)
+            frames = [img] if img is not None else []
+        for frame in frames:
+            face_crop, _ = analyzer.get_face_roi(frame)
+            if face_crop is not None:
+                crops.append((path, face_crop))
+    return crops
+
+class CropCalibrationReader:
+    """
+    onnxruntime.quantization CalibrationDataReader over preprocessed crops.
+    """
+    def __init__(self, input_name, crops, batch_size=8):
+        preprocessor = BatchPreprocessor()
+        self.batches = [
+            {input_name: preprocessor.fill([c for _, c in crops[i:i + batch_size]]).copy()}
+            for i in range(0, len(crops), batch_size)
+        ]
+        self.index = 0
+
+    def get_next(self):
+        if self.index >= len(self.batches):
+            return None
+        self.index += 1
+        return self.batches[self.index - 1]
+
+    def rewind(self):
+        self.index = 0
+
+def quantize(mode, model_path, output_path, calibration_crops):
+    from onnxruntime.quantization import quantize_dynamic, quantize_static, QuantType, QuantFormat
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    # Shape inference + graph cleanup recommended before quantisation
+    prepared_path = output_path + ".prep.onnx"
+    quant_pre_process(model_path, prepared_path, skip_symbolic_shape=True)
+    try:
+        if mode == "dynamic":
+            quantize_dynamic(prepared_path, output_path, weight_type=QuantType.QInt8)
+        else:
+            input_name = create_session(prepared_path, cache_optimized=False).get_inputs()[0].name
+            reader = CropCalibrationReader(input_name, calibration_crops)
+            quantize_static(
+                prepared_path, output_path, reader,
+                quant_format=QuantFormat.QDQ, per_channel=True,
+                activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8
+            )
+    finally:
+        if os.path.exists(prepared_path):
+            os.remove(prepared_path)
+
+def latency_ms(detector, crops, batch_size, repeats=10):
+    batch = [c for _, c in crops[:batch_size]]
+    while len(batch) < batch_size:
+        batch += batch[:batch_size - len(batch)]
+    detector.predict_batch(batch)
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        detector.predict_batch(batch)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return round(timings[len(timings) // 2], 3)
+
+def build_report(fp32_path, int8_path, eval_crops, labels):
+    # Compare graphs as stored: no cached optimised copies
+    fp32 = EfficientNetONNXDetector(fp32_path)
+    int8 = EfficientNetONNXDetector(int8_path)
+    crops = [c for _, c in eval_crops]
+    fp32_scores = np.array(fp32.predict_batch(crops), dtype=np.float32)
+    int8_scores = np.array(int8.predict_batch(crops), dtype=np.float32)
+    diff = np.abs(fp32_scores - int8_scores)
+
+    report = {
+        "fp32_model": fp32_path,
+        "int8_model": int8_path,
+        "fp32_size_mb": round(os.path.getsize(fp32_path) / 1e6, 2),
+        "int8_size_mb": round(os.path.getsize(int8_path) / 1e6, 2),
+        "eval_crops": len(crops),
+        "score_mean_abs_diff": round(float(diff.mean()), 5),
+        "score_max_abs_diff": round(float(diff.max()), 5),
+        "decision_agreement_at_0.5": round(float(np.mean((fp32_scores >= 0.5) == (int8_scores >= 0.5))), 4),
+        "latency_ms": {}
+    }
+
+    if labels:
+        truth = np.array([labels.get(os.path.abspath(p), -1) for p, _ in eval_crops])
+        known = truth >= 0
+        if known.any():
+            report["labelled_crops"] = int(known.sum())
+            report["fp32_accuracy"] = round(float(np.mean((fp32_scores[known] >= 0.5) == truth[known])), 4)
+            report["int8_accuracy"] = round(float(np.mean((int8_scores[known] >= 0.5) == truth[known])), 4)
+
+    for batch_size in (1, 8, 32):
+        report["latency_ms"][f"batch_{batch_size}"] = {
+            "fp32": latency_ms(fp32, eval_crops, batch_size),
+            "int8": latency_ms(int8, eval_crops, batch_size)
+        }
+    return report
+
+def load_labels(path):
+    if not path:
+        return {}
+    with open(path, newline="") as f:
+        return {os.path.abspath(row["path"]): int(row["label"]) for row in csv.DictReader(f)}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--mode", choices=["dynamic", "static"], default="static")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--output", default=QUANTIZED_MODEL_PATH)
+    parser.add_argument("--calibration", required=True, help="Directory or glob of calibration images/videos")
+    parser.add_argument("--eval", help="Directory or glob for the report (defaults to --calibration)")
+    parser.add_argument("--labels", help="CSV of path,label (1 = fake) for accuracy")
+    parser.add_argument("--report", help="Write the JSON report here as well")
+    args = parser.parse_args()
+
+    calibration_crops = load_face_crops(list_media(args.calibration))
+    if not calibration_crops:
+        print(json.dumps({"error": "no faces found in calibration media"}))
+        sys.exit(1)
+
+    quantize(args.mode, args.model, args.output, calibration_crops)
+
+    eval_crops = load_face_crops(list_media(args.eval)) if args.eval else calibration_crops
+    report = build_report(args.model, args.output, eval_crops, load_labels(args.labels))
+    report["mode"] = args.mode
+    report["calibration_crops"] = len(calibration_crops)
+
+    print(json.dumps(report, indent=2))
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
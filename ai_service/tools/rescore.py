@@ -0,0 +1,136 @@
+"""
+Replays new fusion weights and decision thresholds over the signal store
+(AI_SIGNAL_STORE=1, see config.py) and reports how many verdicts would flip,
+without rerunning the pipeline. Everything is vectorized NumPy over the
+memory-mapped columns: millions of stored items take seconds.
+
+Defaults are the current config.py values; pass the ones to try:
+  python tools/rescore.py --weight-model 0.5 --weight-artifact 0.2 --reject 0.65
+  python tools/rescore.py --lap-var-min 40 --show 20      (re-run artifact rules too)
+
+The first line checks the store against the current config: stored verdicts
+that the current weights do not reproduce come from runs under other
+settings, cascade early exits (the frames are the scored subset) or deadline
+degradation; the line counts the latter two.
+
+Usage: python tools/rescore.py [--store DIR] [weights/thresholds] [--show N] [--json]
+"""
+import sys
+import os
+import json
+import time
+import argparse
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from config import (
+    SIGNAL_STORE_DIR, WEIGHT_MODEL, WEIGHT_ARTIFACT, WEIGHT_TEMPORAL, WEIGHT_METADATA,
+    THRESHOLD_REJECT, THRESHOLD_UNSAFE
+)
+from core.heuristics import FFT_HF_MIN, LAP_VAR_MIN, NOISE_LEVEL_MIN
+from core.signals import load_signals, rescore, item_names, FLAG_EARLY_EXIT, FLAG_DEGRADED, FLAG_NEAR_DUP
+
+BANDS = ["APPROVED", "REJECTED (unsafe)", "REJECTED (deepfake)"]
+
+def transitions(before, after):
+    """
+    3x3 counts, [band before][band after].
+    """
+    return np.bincount(before.astype(np.int64) * 3 + after, minlength=9).reshape(3, 3)
+
+def summarize(items, frames, before, after, load_s, rescore_s, reproduced):
+    matrix = transitions(before, after)
+    flags = np.asarray(items["flags"])
+    return {
+        "items": int(len(before)),
+        "frames": int(len(frames["item"])),
+        "load_s": round(load_s, 3),
+        "rescore_s": round(rescore_s, 3),
+        "reproduced_by_current_config": int(reproduced),
+        "flags": {
+            "early_exit": int(np.count_nonzero(flags & FLAG_EARLY_EXIT)),
+            "degraded": int(np.count_nonzero(flags & FLAG_DEGRADED)),
+            "near_duplicate": int(np.count_nonzero(flags & FLAG_NEAR_DUP)),
+        },
+        "approved_to_rejected": int(matrix[0, 1:].sum()),
+        "rejected_to_approved": int(matrix[1:, 0].sum()),
+        "unsafe_deepfake_changes": int(matrix[1, 2] + matrix[2, 1]),
+        "transitions": {BANDS[i]: {BANDS[j]: int(matrix[i, j]) for j in range(3)} for i in range(3)},
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rescore stored signals with new fusion weights/thresholds")
+    parser.add_argument("--store", default=SIGNAL_STORE_DIR)
+    parser.add_argument("--weight-model", type=float, default=WEIGHT_MODEL)
+    parser.add_argument("--weight-artifact", type=float, default=WEIGHT_ARTIFACT)
+    parser.add_argument("--weight-temporal", type=float, default=WEIGHT_TEMPORAL)
+    parser.add_argument("--weight-metadata", type=float, default=WEIGHT_METADATA)
+    parser.add_argument("--reject", type=float, default=THRESHOLD_REJECT, help="THRESHOLD_REJECT")
+    parser.add_argument("--unsafe", type=float, default=THRESHOLD_UNSAFE, help="THRESHOLD_UNSAFE")
+    parser.add_argument("--fft-hf-min", type=float, help=f"artifact rule 1 (default {FFT_HF_MIN})")
+    parser.add_argument("--lap-var-min", type=float, help=f"artifact rule 2 (default {LAP_VAR_MIN})")
+    parser.add_argument("--noise-level-min", type=float, help=f"artifact rule 4 (default {NOISE_LEVEL_MIN})")
+    parser.add_argument("--show", type=int, default=0, help="List up to N items whose verdict flips")
+    parser.add_argument("--json", action="store_true", help="Print the summary as JSON")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    items, frames, segments = load_signals(args.store)
+    load_s = time.perf_counter() - started
+    if not len(items["status"]):
+        print(f"[RESCORE] No signals in {args.store} (record them with AI_SIGNAL_STORE=1)", file=sys.stderr)
+        sys.exit(1)
+
+    rules = None
+    if args.fft_hf_min is not None or args.lap_var_min is not None or args.noise_level_min is not None:
+        rules = (
+            FFT_HF_MIN if args.fft_hf_min is None else args.fft_hf_min,
+            LAP_VAR_MIN if args.lap_var_min is None else args.lap_var_min,
+            NOISE_LEVEL_MIN if args.noise_level_min is None else args.noise_level_min,
+        )
+
+    before = np.asarray(items["verdict"])
+    _, current = rescore(items, frames, (WEIGHT_MODEL, WEIGHT_ARTIFACT, WEIGHT_TEMPORAL, WEIGHT_METADATA),
+                         (THRESHOLD_REJECT, THRESHOLD_UNSAFE))
+    started = time.perf_counter()
+    _, after = rescore(
+        items, frames,
+        (args.weight_model, args.weight_artifact, args.weight_temporal, args.weight_metadata),
+        (args.reject, args.unsafe), rules
+    )
+    rescore_s = time.perf_counter() - started
+
+    summary = summarize(items, frames, before, after, load_s, rescore_s, np.count_nonzero(current == before))
+    flipped = np.flatnonzero((before > 0) != (after > 0))
+    if args.show:
+        names = item_names(segments, flipped[:args.show])
+        summary["flipped"] = [
+            {"name": names.get(i, (None, None))[0], "before": BANDS[before[i]], "after": BANDS[after[i]]}
+            for i in flipped[:args.show]
+        ]
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        sys.exit(0)
+
+    print(f"[RESCORE] {summary['items']} items ({summary['frames']} frames) from {len(segments)} segments, "
+          f"loaded in {load_s:.2f}s, rescored in {rescore_s:.2f}s")
+    print(f"[RESCORE] Current config reproduces {summary['reproduced_by_current_config']}/{summary['items']} "
+          f"stored verdicts (early exit: {summary['flags']['early_exit']}, degraded: {summary['flags']['degraded']}, "
+          f"near-duplicate: {summary['flags']['near_duplicate']})")
+    print(f"[RESCORE] Weights model={args.weight_model} artifact={args.weight_artifact} "
+          f"temporal={args.weight_temporal} metadata={args.weight_metadata}, "
+          f"reject>={args.reject} unsafe>={args.unsafe}" + (f", artifact rules {rules}" if rules else ""))
+    print(f"[RESCORE] Verdict flips: {len(flipped)} "
+          f"(APPROVED -> REJECTED: {summary['approved_to_rejected']}, "
+          f"REJECTED -> APPROVED: {summary['rejected_to_approved']}); "
+          f"unsafe <-> deepfake: {summary['unsafe_deepfake_changes']}")
+    width = max(len(b) for b in BANDS)
+    corner = "before \\ after"
+    print(f"{corner:<{width}}  " + "  ".join(f"{b:>{width}}" for b in BANDS))
+    for i, band in enumerate(BANDS):
+        print(f"{band:<{width}}  " + "  ".join(f"{v:>{width}}" for v in summary["transitions"][band].values()))
+    for entry in summary.get("flipped", []):
+        print(f"  {entry['before']} -> {entry['after']}: {entry['name']}")
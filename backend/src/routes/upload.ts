@@ -2,13 +2,13 @@ import { FastifyInstance, FastifyRequest } from 'fastify';
 import '@fastify/multipart';
 import { spawn } from 'child_process';
 import { createHash } from 'crypto';
-import { createReadStream, createWriteStream, unlinkSync, existsSync } from 'fs';
 import { join } from 'path';
-import { promisify } from 'util';
-import { pipeline } from 'stream';
 import { supabase } from '../supabase.js';
 
-const pump = promisify(pipeline);
+// The verifier is killed (fail-closed) after AI_TIMEOUT_MS; it schedules its
+// stages to answer within AI_TIME_BUDGET_MS, leaving room for spawn and I/O.
+const AI_TIMEOUT_MS = 15000;
+const AI_TIME_BUDGET_MS = AI_TIMEOUT_MS - 2000;
 
 export async function uploadRoutes(fastify: FastifyInstance) {
   // Ensure storage buckets exist
@@ -35,8 +35,6 @@ export async function uploadRoutes(fastify: FastifyInstance) {
    */
   fastify.post('/verify-upload', async (request, reply) => {
     const startTime = Date.now();
-    const tempDir = join(process.cwd(), 'tmp', 'uploads');
-    let tempPath = '';
     let mediaHash = '';
     let userId = '';
     // State to track verdicts
@@ -64,16 +62,12 @@ export async function uploadRoutes(fastify: FastifyInstance) {
         caption = (data.fields as any).caption.value;
       }
 
-      // Save Temp
-      const fs = await import('fs/promises');
-      await fs.mkdir(tempDir, { recursive: true });
-      const filename = `${Date.now()}-${data.filename}`;
-      tempPath = join(tempDir, filename);
-      await pump(data.file, createWriteStream(tempPath));
+      // Keep the upload in memory: the verifier reads it from stdin, so
+      // neither check needs a temp file
+      const fileBuffer = await data.toBuffer();
 
       // Hash
       const hash = createHash('sha256');
-      const fileBuffer = await fs.readFile(tempPath);
       hash.update(fileBuffer);
       mediaHash = hash.digest('hex');
 
@@ -89,15 +83,16 @@ export async function uploadRoutes(fastify: FastifyInstance) {
         });
       }
 
-      // --- 2. DEEPFAKE DETECTION ---
+      // --- 2. DEEPFAKE + CONTEXT DETECTION ---
+      // One verifier call: the context check runs alongside the deepfake check
+      // (sharing the parsed metadata) and comes back as mediaResult.context
       const aiEnginePath = join(process.cwd(), '..', 'ai_service', 'main.py');
       let mediaResult;
       try {
-        mediaResult = await runAIVerification(aiEnginePath, tempPath);
+        mediaResult = await runAIVerification(aiEnginePath, fileBuffer, caption);
       } catch (e: any) {
         await logVerification(userId, mediaHash, 'REJECTED', 'SKIPPED', 'REJECTED', 1.0, 1.0, `Engine Error: ${e.message}`);
         await updateProfileTrustScore(userId);
-        if (existsSync(tempPath)) unlinkSync(tempPath);
         return reply.code(400).send({ verified: false, reason: 'Deepfake service error' });
       }
 
@@ -117,25 +112,22 @@ export async function uploadRoutes(fastify: FastifyInstance) {
 
       // --- 3. FAKE NEWS DETECTION (If Media Passed) ---
       if (deepfakeVerdict === 'APPROVED') {
-        const contextEnginePath = join(process.cwd(), '..', 'ai_service', 'context_verify.py');
-        let contextResult;
-        try {
-          contextResult = await runContextVerification(contextEnginePath, caption, tempPath);
-          if (contextResult.verdict === 'ALLOW') {
-            fakeNewsVerdict = 'APPROVED';
-          } else {
-            fakeNewsVerdict = 'REJECTED';
-            finalReason = contextResult.verdict === 'BLOCK_FAKE'
-              ? 'Misleading factual claim detected'
-              : 'Unverified content blocked';
-            if (contextResult.reasons) finalReason += `: ${contextResult.reasons.join(', ')}`;
-          }
-        } catch (e: any) {
-          await logVerification(userId, mediaHash, 'APPROVED', 'REJECTED', 'REJECTED', 1.0, 1.0, `Context Engine Error: ${e.message}`);
+        const contextResult = mediaResult.context;
+        if (!contextResult || contextResult.verdict === 'ERROR') {
+          const error = contextResult?.reasons?.join(', ') || 'no context result';
+          await logVerification(userId, mediaHash, 'APPROVED', 'REJECTED', 'REJECTED', 1.0, 1.0, `Context Engine Error: ${error}`);
           await updateProfileTrustScore(userId);
-          if (existsSync(tempPath)) unlinkSync(tempPath);
           return reply.code(400).send({ verified: false, reason: 'Context service error' });
         }
+        if (contextResult.verdict === 'ALLOW') {
+          fakeNewsVerdict = 'APPROVED';
+        } else {
+          fakeNewsVerdict = 'REJECTED';
+          finalReason = contextResult.verdict === 'BLOCK_FAKE'
+            ? 'Misleading factual claim detected'
+            : 'Unverified content blocked';
+          if (contextResult.reasons) finalReason += `: ${contextResult.reasons.join(', ')}`;
+        }
       }
 
       // --- 4. COMPUTE FINAL VERDICT ---
@@ -174,10 +166,8 @@ export async function uploadRoutes(fastify: FastifyInstance) {
           media_hash_check: mediaHash
         });
 
-        if (existsSync(tempPath)) unlinkSync(tempPath);
         return { verified: true, fakeNews: false, score: finalScore, mediaUrl: publicUrl };
       } else {
-        if (existsSync(tempPath)) unlinkSync(tempPath);
         return reply.code(400).send({
           verified: false,
           fakeNews: fakeNewsVerdict === 'REJECTED',
@@ -192,16 +182,20 @@ export async function uploadRoutes(fastify: FastifyInstance) {
         await logVerification(userId, mediaHash, 'REJECTED', 'SKIPPED', 'REJECTED', 1.0, 1.0, `System Error: ${error.message}`);
         await updateProfileTrustScore(userId);
       }
-      if (tempPath && existsSync(tempPath)) unlinkSync(tempPath);
       return reply.code(500).send({ verified: false, reason: 'Internal Server Error' });
     }
   });
 }
 
-async function runAIVerification(scriptPath: string, filePath: string): Promise<any> {
+async function runAIVerification(scriptPath: string, media: Buffer, caption: string): Promise<any> {
   const pythonCmd = await getPythonCommand();
   return new Promise((resolve, reject) => {
-    const python = spawn(pythonCmd, [scriptPath, filePath]);
+    // '-': the media is piped to stdin; --caption adds the context check
+    const python = spawn(pythonCmd, [
+      scriptPath, '-', '--caption', caption, '--time-budget-ms', String(AI_TIME_BUDGET_MS)
+    ]);
+    python.stdin.on('error', () => { /* verifier exited early; reported via 'close' */ });
+    python.stdin.end(media);
     let stdout = '';
     let stderr = '';
     python.stdout.on('data', (d) => stdout += d.toString());
@@ -214,27 +208,7 @@ async function runAIVerification(scriptPath: string, filePath: string): Promise<
         else reject(new Error('Invalid AI output'));
       } catch (e) { reject(e); }
     });
-    setTimeout(() => { python.kill(); reject(new Error('AI Timeout')); }, 15000);
-  });
-}
-
-async function runContextVerification(scriptPath: string, caption: string, filePath: string): Promise<any> {
-  const pythonCmd = await getPythonCommand();
-  return new Promise((resolve, reject) => {
-    const python = spawn(pythonCmd, [scriptPath, caption, filePath]);
-    let stdout = '';
-    let stderr = '';
-    python.stdout.on('data', (d) => stdout += d.toString());
-    python.stderr.on('data', (d) => stderr += d.toString());
-    python.on('close', (code) => {
-      if (code !== 0) return reject(new Error(`Context Error ${code}: ${stderr}`));
-      try {
-        const jsonMatch = stdout.match(/\{[\s\S]*\}/);
-        if (jsonMatch) resolve(JSON.parse(jsonMatch[0]));
-        else reject(new Error('Invalid Context output'));
-      } catch (e) { reject(e); }
-    });
-    setTimeout(() => { python.kill(); reject(new Error('Context Timeout')); }, 5000);
+    setTimeout(() => { python.kill(); reject(new Error('AI Timeout')); }, AI_TIMEOUT_MS);
   });
 }
 
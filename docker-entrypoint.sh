@@ -0,0 +1,21 @@
+#!/bin/sh
+# Container entrypoint: the warm verification server (ai_service/server.py)
+# next to the backend. main.py forwards each upload to the server when it is
+# up and verifies in-process when it is not, so the backend keeps answering
+# (slower) if the server is still loading or has died.
+
+(cd /app/ai_service && exec "${PYTHON_PATH:-python3}" server.py) &
+SERVER_PID=$!
+
+cd /app/backend
+node dist/index.js &
+NODE_PID=$!
+
+# docker stop: pass the signal on to both
+trap 'kill -TERM "$NODE_PID" "$SERVER_PID" 2>/dev/null' INT TERM
+
+wait "$NODE_PID"
+STATUS=$?
+kill -TERM "$SERVER_PID" 2>/dev/null
+wait "$SERVER_PID" 2>/dev/null
+exit "$STATUS"